@@ -1,39 +1,13 @@
 import os
 from run_togt_planner.RaceVisualizer.RacePlotter import RacePlotter
-import subprocess
+from run_togt_planner.RacePlanner.PlannerCache import PlannerCache
+from run_togt_planner.RacePlanner.PlannerPool import run_planner
 import matplotlib.pyplot as plt
 import numpy as np
 import yaml
 
 ROOTPATH = os.path.abspath(__file__).split("Run-TOGT-Planner/", 1)[0]
-
-def run_traj_planner(config_path, quad_name, track_path, traj_path, wpt_path):
-    # get the path to c++ program    
-    cpp_program_path = os.path.join(ROOTPATH, 'build', 'planners')
-
-    # make sure the path exists
-    if not os.path.isfile(cpp_program_path):
-        print(f"Error: {cpp_program_path} does not exist.")
-        return
-
-    # construct the command
-    command = [
-        cpp_program_path,  # path to the C++ program
-        config_path,
-        quad_name,
-        track_path,
-        traj_path,
-        wpt_path
-    ]
-
-    # run the command
-    result = subprocess.run(command, capture_output=True, text=True)
-
-    # check if the command was successful
-    if result.returncode != 0:
-        print(f"Error running traj_planner_togt: {result.stderr}")
-    else:
-        print(f"{result.stdout}")
+PLANNER_PATH = os.path.join(ROOTPATH, 'build', 'planners')
 
 def main():
     # input parameters
@@ -53,7 +27,7 @@ def main():
     wpt_path = os.path.join(ROOTPATH, wpt_path, 'figure8.yaml')
     fig_path = os.path.join(ROOTPATH, fig_path)
 
-    run_traj_planner(config_path, quad_name, track_path, traj_path, wpt_path)
+    run_planner(PLANNER_PATH, config_path, quad_name, track_path, traj_path, wpt_path, cache=PlannerCache())
 
     radius = 0.25
     alpha = 0.01
@@ -127,7 +101,7 @@ def main():
     wpt_path = os.path.join(ROOTPATH, wpt_path, 'race_uzh_19g.yaml')
     fig_path = os.path.join(ROOTPATH, fig_path)
 
-    run_traj_planner(config_path, quad_name, track_path, traj_path, wpt_path)
+    run_planner(PLANNER_PATH, config_path, quad_name, track_path, traj_path, wpt_path, cache=PlannerCache())
 
     radius = 1.0
     alpha = 0.04
@@ -3,9 +3,11 @@ from run_togt_planner.RaceGenerator.GenerationTools import create_state, create_
 from run_togt_planner.RaceGenerator.GateShape import SingleBall, TrianglePrisma, RectanglePrisma, PentagonPrisma, HexagonPrisma
 from run_togt_planner.RaceGenerator.RaceTrack import RaceTrack
 from run_togt_planner.RaceVisualizer.RacePlotter import RacePlotter
-import subprocess
+from run_togt_planner.RacePlanner.PlannerCache import PlannerCache
+from run_togt_planner.RacePlanner.PlannerPool import run_planner
 
 ROOTPATH = os.path.abspath(__file__).split("Run-TOGT-Planner/", 1)[0]
+PLANNER_PATH = os.path.join(ROOTPATH, 'build', 'planners')
 
 def create_racetrack():
     # Define gate parameters
@@ -90,34 +92,6 @@ def read_racetrack():
     read_race.load_from_yaml(load_dir=os.path.join(ROOTPATH, "Run-TOGT-Planner/resources/racetrack/example.yaml"))
     return read_race
 
-def run_traj_planner(config_path, quad_name, track_path, traj_path, wpt_path):
-    # get the path to c++ program    
-    cpp_program_path = os.path.join(ROOTPATH, 'build', 'planners')
-
-    # make sure the path exists
-    if not os.path.isfile(cpp_program_path):
-        print(f"Error: {cpp_program_path} does not exist.")
-        return
-
-    # construct the command
-    command = [
-        cpp_program_path,  # path to the C++ program
-        config_path,
-        quad_name,
-        track_path,
-        traj_path,
-        wpt_path
-    ]
-
-    # run the command
-    result = subprocess.run(command, capture_output=True, text=True)
-
-    # check if the command was successful
-    if result.returncode != 0:
-        print(f"Error running traj_planner_togt: {result.stderr}")
-    else:
-        print(f"{result.stdout}")
-
 def plot_traj(traj_path, track_path, wpt_path):
     togt_plotter = RacePlotter(traj_path, track_path, wpt_path)
     togt_plotter.plot(save_fig=True, fig_name="example_2d", save_path=os.path.join(ROOTPATH, "Run-TOGT-Planner/resources/figure/"), 
@@ -150,7 +124,7 @@ if __name__ == "__main__":
     print(examplt_racetrack.to_dict())  # output the racetrack
 
     # Step 3: Run the trajectory planner
-    run_traj_planner(config_path, quad_name, track_path, traj_path, wpt_path)
+    run_planner(PLANNER_PATH, config_path, quad_name, track_path, traj_path, wpt_path, cache=PlannerCache())
 
     # Step 4: Plot the trajectory
     plot_traj(traj_path, track_path, wpt_path)
\ No newline at end of file
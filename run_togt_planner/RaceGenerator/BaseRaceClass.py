@@ -28,6 +28,8 @@ class BaseRaceClass:
         return data
 
 class State(BaseRaceClass):
+    ORDERED_KEYS = ['pos', 'vel', 'acc', 'jer', 'rot', 'cthrustmass', 'euler']
+
     def __init__(self, 
                  pos: Union[List[float], np.ndarray],                   # (3,) - position [x, y, z]
                  vel: Optional[Union[List[float], np.ndarray]] = None,  # (3,) - velocity [vx, vy, vz]
@@ -49,11 +51,19 @@ class State(BaseRaceClass):
         return vars(self)
     
     def to_ordered_dict(self) -> CommentedMap:
-        ordered_keys = ['pos', 'vel', 'acc', 'jer', 'rot', 'cthrustmass', 'euler']
-        return super().to_ordered_dict(ordered_keys = ordered_keys,
+        return super().to_ordered_dict(ordered_keys = self.ORDERED_KEYS,
                                        dict = self.to_dict())
 
 class Gate(BaseRaceClass):
+    # shared by all gates, never modify it in place
+    SHAPE_ORDER_KEYS = {
+        'SingleBall': ['type', 'name', 'position', 'radius', 'margin', 'stationary'],
+        'TrianglePrisma': ['type', 'name', 'position', 'rpy', 'width', 'height', 'margin', 'length', 'midpoints', 'stationary'],
+        'RectanglePrisma': ['type', 'name', 'position', 'rpy', 'width', 'height', 'marginW', 'marginH', 'length', 'midpoints', 'stationary'],
+        'PentagonPrisma': ['type', 'name', 'position', 'rpy', 'radius', 'margin', 'length', 'midpoints', 'stationary'],
+        'HexagonPrisma': ['type', 'name', 'position', 'rpy', 'side', 'margin', 'length', 'midpoints', 'stationary'],
+    }
+
     def __init__(self, 
                  gate_shape: BaseShape, 
                  position: Union[List[float], np.ndarray], 
@@ -63,13 +73,6 @@ class Gate(BaseRaceClass):
         self.name = name
         self.position = position if isinstance(position, list) else position.tolist()
         self.stationary = stationary
-        self.SHAPE_ORDER_KEYS = {
-            'SingleBall': ['type', 'name', 'position', 'radius', 'margin', 'stationary'],
-            'TrianglePrisma': ['type', 'name', 'position', 'rpy', 'width', 'height', 'margin', 'length', 'midpoints', 'stationary'],
-            'RectanglePrisma': ['type', 'name', 'position', 'rpy', 'width', 'height', 'marginW', 'marginH', 'length', 'midpoints', 'stationary'],
-            'PentagonPrisma': ['type', 'name', 'position', 'rpy', 'radius', 'margin', 'length', 'midpoints', 'stationary'],
-            'HexagonPrisma': ['type', 'name', 'position', 'rpy', 'side', 'margin', 'length', 'midpoints', 'stationary'],
-        }
 
     def to_dict(self) -> dict:
         data = {
@@ -82,7 +85,7 @@ class Gate(BaseRaceClass):
         return data
 
     def to_ordered_dict(self) -> CommentedMap:
-        ordered_keys = self.SHAPE_ORDER_KEYS[self.shape.type]
+        ordered_keys = list(self.SHAPE_ORDER_KEYS[self.shape.type])
         if self.name is None:
             ordered_keys.remove('name')
         return super().to_ordered_dict(ordered_keys = ordered_keys, 
@@ -0,0 +1,373 @@
+import numpy as np
+from typing import List, Optional, Tuple, Union
+
+GATE_TYPES = ['SingleBall', 'TrianglePrisma', 'RectanglePrisma', 'PentagonPrisma', 'HexagonPrisma']
+PARAM_KEYS = ['radius', 'margin', 'width', 'height', 'marginW', 'marginH', 'side', 'length', 'midpoints']
+MAX_POLYGON_VERTICES = 7
+
+########################################
+########## BATCHED ROTATIONS ###########
+########################################
+
+def rpy_to_rotation_matrices(rpy: Union[List[List[float]], np.ndarray]) -> np.ndarray:
+    # (N, 3) roll, pitch, yaw in degrees -> (N, 3, 3) rotation matrices
+    r, p, y = (np.asarray(rpy, dtype=float).reshape(-1, 3) * np.pi/180).T
+    cr, sr, cp, sp, cy, sy = np.cos(r), np.sin(r), np.cos(p), np.sin(p), np.cos(y), np.sin(y)
+    R = np.empty((len(r), 3, 3))
+    R[:, 0, 0] = cy * cp
+    R[:, 1, 0] = sy * cp
+    R[:, 2, 0] = -sp
+    R[:, 0, 1] = cy * sp * sr - sy * cr
+    R[:, 1, 1] = sy * sp * sr + cy * cr
+    R[:, 2, 1] = cp * sr
+    R[:, 0, 2] = cy * sp * cr + sy * sr
+    R[:, 1, 2] = sy * sp * cr - cy * sr
+    R[:, 2, 2] = cp * cr
+    return R
+
+def rpy_to_rotation_matrix(rpy: Union[List[float], np.ndarray]) -> np.ndarray:
+    return rpy_to_rotation_matrices([rpy])[0]
+
+########################################
+########## GATE PARAMETERS #############
+########################################
+
+class GateParams:
+    def __init__(self,
+                 names: List[str],
+                 types: List[str],
+                 positions: np.ndarray,    # (N, 3)
+                 rpy: np.ndarray,          # (N, 3) - zeros for SingleBall
+                 params: dict):            # shape parameter -> (N,) column, NaN where unused
+        self.names = names
+        self.types = types
+        self.type_codes = np.array([GATE_TYPES.index(t) for t in types], dtype=np.int8)
+        self.positions = positions
+        self.rpy = rpy
+        self.params = params
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+def get_gate_params(track) -> GateParams:
+    # accepts a RaceTrack or the parsed YAML of a track
+    if hasattr(track, 'gates'):
+        # array backed track, no per-gate dicts needed
+        store = track.gates
+        rows = np.array([store.rows[name] for name in track.orders], dtype=int)
+        params = {key: store.get_param(key)[rows] for key in PARAM_KEYS}
+        return GateParams(list(track.orders), [GATE_TYPES[c] for c in store.type_codes[rows]],
+                          store.positions[rows], store.rpy[rows], params)
+    if hasattr(track, 'to_dict'):
+        track = track.to_dict()
+
+    names = list(track['orders'])
+    gates = [track[name] for name in names]
+    types = [g['type'] for g in gates]
+    for gate_type in types:
+        if gate_type == 'FreeCorridor':
+            raise NotImplementedError("Not support FreeCorridor gate")
+        if gate_type not in GATE_TYPES:
+            raise ValueError('Unrecognized gate: ' + gate_type)
+
+    positions = np.array([g['position'] for g in gates], dtype=float).reshape(-1, 3)
+    rpy = np.array([g.get('rpy', [0.0, 0.0, 0.0]) for g in gates], dtype=float).reshape(-1, 3)
+    params = {key: np.array([g.get(key, np.nan) for g in gates], dtype=float) for key in PARAM_KEYS}
+    return GateParams(names, types, positions, rpy, params)
+
+########################################
+########### GATE GEOMETRY ##############
+########################################
+
+class GateGeometry:
+    def __init__(self,
+                 params: GateParams,
+                 polygons: np.ndarray,      # (N, MAX_POLYGON_VERTICES, 3) - closed opening polygons, NaN padded
+                 num_vertices: np.ndarray,  # (N,) - 0 for SingleBall
+                 radii: np.ndarray,         # (N,) - ball radius, NaN for prismas
+                 normals: np.ndarray,       # (N, 3) - opening normal, NaN for SingleBall
+                 bboxes: np.ndarray):       # (N, 2, 3) - [min, max] corners
+        self.params = params
+        self.names = params.names
+        self.types = params.types
+        self.type_codes = params.type_codes
+        self.centers = params.positions
+        self.polygons = polygons
+        self.num_vertices = num_vertices
+        self.radii = radii
+        self.normals = normals
+        self.bboxes = bboxes
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_polygon(self, index: int) -> np.ndarray:
+        return self.polygons[index, :self.num_vertices[index]]
+
+def get_local_polygons(params: GateParams,
+                       set_radius: Optional[float] = None,
+                       set_width: Optional[float] = None,
+                       set_height: Optional[float] = None,
+                       set_margin: float = 0) -> np.ndarray:
+    num_gates = len(params)
+    p = params.params
+    codes = params.type_codes
+    polygons = np.full((num_gates, MAX_POLYGON_VERTICES, 3), np.nan)
+
+    def sizes(values, override):
+        return np.full(len(values), override) if override is not None else values
+
+    # TrianglePrisma
+    idx = np.flatnonzero(codes == GATE_TYPES.index('TrianglePrisma'))
+    if len(idx):
+        hw = sizes(0.5*(p['width'][idx] - p['margin'][idx]), None if set_width is None else 0.5*(set_width - set_margin))
+        hh = sizes(0.5*(p['height'][idx] - p['margin'][idx]), None if set_height is None else 0.5*(set_height - set_margin))
+        x = np.stack((-hh, hh, -hh, -hh), axis=1)
+        y = np.stack((hw, 0*hw, -hw, hw), axis=1)
+        polygons[idx, :4, 0], polygons[idx, :4, 1], polygons[idx, :4, 2] = x, y, 0.0
+
+    # RectanglePrisma
+    idx = np.flatnonzero(codes == GATE_TYPES.index('RectanglePrisma'))
+    if len(idx):
+        hw = sizes(0.5*(p['width'][idx] - p['marginW'][idx]), None if set_width is None else 0.5*(set_width - set_margin))
+        hh = sizes(0.5*(p['height'][idx] - p['marginH'][idx]), None if set_height is None else 0.5*(set_height - set_margin))
+        x = np.stack((-hh, -hh, hh, hh, -hh), axis=1)
+        y = np.stack((hw, -hw, -hw, hw, hw), axis=1)
+        polygons[idx, :5, 0], polygons[idx, :5, 1], polygons[idx, :5, 2] = x, y, 0.0
+
+    # PentagonPrisma
+    idx = np.flatnonzero(codes == GATE_TYPES.index('PentagonPrisma'))
+    if len(idx):
+        ar = sizes(p['radius'][idx] - p['margin'][idx], None if set_radius is None else set_radius - set_margin)
+        cos54 = np.cos(0.3*np.pi)
+        sin54 = np.sin(0.3*np.pi)
+        nd, on = ar * cos54, ar * sin54
+        bc = 2 * nd
+        fc = bc * sin54
+        of = ar - bc * cos54
+        x = np.stack((-on, of, ar, of, -on, -on), axis=1)
+        y = np.stack((nd, fc, 0*ar, -fc, -nd, nd), axis=1)
+        polygons[idx, :6, 0], polygons[idx, :6, 1], polygons[idx, :6, 2] = x, y, 0.0
+
+    # HexagonPrisma
+    idx = np.flatnonzero(codes == GATE_TYPES.index('HexagonPrisma'))
+    if len(idx):
+        aside = sizes(p['side'][idx] - p['margin'][idx], None if set_radius is None else set_radius - set_margin)
+        hside = 0.5 * aside
+        height = hside * np.tan(np.pi/3.0)
+        x = np.stack((-height, 0*aside, height, height, 0*aside, -height, -height), axis=1)
+        y = np.stack((hside, aside, hside, -hside, -aside, -hside, hside), axis=1)
+        polygons[idx, :7, 0], polygons[idx, :7, 1], polygons[idx, :7, 2] = x, y, 0.0
+
+    return polygons
+
+def get_gate_geometry(track_or_params,
+                      set_radius: Optional[float] = None,
+                      set_width: Optional[float] = None,
+                      set_height: Optional[float] = None,
+                      set_margin: float = 0) -> GateGeometry:
+    params = track_or_params if isinstance(track_or_params, GateParams) else get_gate_params(track_or_params)
+    codes = params.type_codes
+    is_ball = codes == GATE_TYPES.index('SingleBall')
+
+    # rotate and translate the opening polygons of all gates at once
+    R = rpy_to_rotation_matrices(params.rpy)
+    local_polygons = get_local_polygons(params, set_radius, set_width, set_height, set_margin)
+    polygons = np.einsum('nij,nkj->nki', R, local_polygons) + params.positions[:, None, :]
+    num_vertices = np.array([0, 4, 5, 6, 7], dtype=int)[codes]
+
+    radii = np.full(len(params), np.nan)
+    if np.any(is_ball):
+        ball_radii = params.params['radius'][is_ball] - params.params['margin'][is_ball]
+        radii[is_ball] = ball_radii if set_radius is None else set_radius - set_margin
+
+    # the opening lies in the local xy-plane, so the normal is the local z-axis
+    normals = R[:, :, 2].copy()
+    normals[is_ball] = np.nan
+
+    bboxes = np.empty((len(params), 2, 3))
+    bboxes[~is_ball, 0] = np.nanmin(polygons[~is_ball], axis=1)
+    bboxes[~is_ball, 1] = np.nanmax(polygons[~is_ball], axis=1)
+    bboxes[is_ball, 0] = params.positions[is_ball] - radii[is_ball, None]
+    bboxes[is_ball, 1] = params.positions[is_ball] + radii[is_ball, None]
+
+    return GateGeometry(params, polygons, num_vertices, radii, normals, bboxes)
+
+########################################
+########## GATE DISTANCE FIELD #########
+########################################
+
+def get_polygon_distances(points: np.ndarray,
+                          polygons: np.ndarray,
+                          normals: np.ndarray) -> np.ndarray:
+    # (M, 3) points to the filled, convex (M, MAX_POLYGON_VERTICES, 3) openings paired with them
+    a, b = polygons[:, :-1], polygons[:, 1:]
+    ab = b - a
+    ap = points[:, None, :] - a
+    with np.errstate(invalid='ignore'):
+        # distance to the closest edge, padded edges are NaN
+        lengths = np.sum(ab * ab, axis=2)
+        t = np.clip(np.sum(ap * ab, axis=2) / np.where(lengths > 0, lengths, 1.0), 0.0, 1.0)
+        edge_distances = np.linalg.norm(ap - t[..., None] * ab, axis=2)
+        edge_distances = np.min(np.where(np.isnan(edge_distances), np.inf, edge_distances), axis=1)
+
+        # inside when the point lies on the same side of every edge, openings shrunk to a point have no inside
+        sides = np.einsum('mkj,mj->mk', np.cross(ab, ap), normals)
+        valid = ~np.isnan(sides)
+        inside = np.all((sides >= 0) | ~valid, axis=1) | np.all((sides <= 0) | ~valid, axis=1)
+        inside &= np.any(valid & (sides != 0), axis=1)
+    plane_distances = np.abs(np.sum((points - polygons[:, 0]) * normals, axis=1))
+    return np.where(inside, plane_distances, edge_distances)
+
+class GateTree:
+    def __init__(self,
+                 lower: np.ndarray,         # (K, 3) - node box corners
+                 upper: np.ndarray,         # (K, 3)
+                 children: np.ndarray,      # (K, 2) - -1 for leaves
+                 leaf_gates: np.ndarray,    # (K, leaf_size) - gate indices of the leaves, -1 padded
+                 depth: int):
+        self.lower = lower
+        self.upper = upper
+        self.children = children
+        self.leaf_gates = leaf_gates
+        self.depth = depth
+
+    def get_box_distances(self,
+                          points: np.ndarray,
+                          nodes: np.ndarray) -> np.ndarray:
+        # lower bound of the distance to every gate below the nodes paired with the points
+        gaps = np.maximum(np.maximum(self.lower[nodes] - points, points - self.upper[nodes]), 0.0)
+        return np.linalg.norm(gaps, axis=-1)
+
+def get_gate_tree(bboxes: np.ndarray,
+                  leaf_size: int = 8) -> GateTree:
+    # bounding volume hierarchy of the gate boxes, split at the median center along the widest axis
+    lower, upper = np.minimum(bboxes[:, 0], bboxes[:, 1]), np.maximum(bboxes[:, 0], bboxes[:, 1])
+    # padded so that rounding of the exact distances never falls below the box distance
+    pad = 1e-9 * max(1.0, float(np.max(np.abs(bboxes)))) if len(bboxes) else 0.0
+    lower, upper = lower - pad, upper + pad
+    centers = 0.5 * (lower + upper)
+
+    node_lower, node_upper, children, leaf_gates = [], [], [], []
+    depth = 0
+    # gates, parent, child slot and depth of the nodes to build, no node without gates
+    stack = [(np.arange(len(bboxes)), -1, 0, 1)] if len(bboxes) else []
+    while stack:
+        gates, parent, slot, level = stack.pop()
+        node = len(children)
+        if parent >= 0:
+            children[parent][slot] = node
+        node_lower.append(lower[gates].min(axis=0))
+        node_upper.append(upper[gates].max(axis=0))
+        children.append([-1, -1])
+        depth = max(depth, level)
+        if len(gates) <= leaf_size:
+            leaf_gates.append(np.pad(gates, (0, leaf_size - len(gates)), constant_values=-1))
+            continue
+        leaf_gates.append(np.full(leaf_size, -1))
+        axis = np.argmax(np.ptp(centers[gates], axis=0))
+        half = len(gates) // 2
+        gates = gates[np.argpartition(centers[gates, axis], half)]
+        stack.append((gates[half:], node, 1, level + 1))
+        stack.append((gates[:half], node, 0, level + 1))
+    return GateTree(np.array(node_lower).reshape(-1, 3), np.array(node_upper).reshape(-1, 3),
+                    np.array(children, dtype=int).reshape(-1, 2), np.array(leaf_gates, dtype=int).reshape(-1, leaf_size),
+                    depth)
+
+class GateDistanceField:
+    def __init__(self,
+                 geometry: GateGeometry,
+                 chunk_size: int = 65536,
+                 leaf_size: int = 8):
+        self.geometry = geometry
+        self.chunk_size = chunk_size
+        self.is_ball = geometry.num_vertices == 0
+        # the memory of a query grows with chunk_size and the tree depth, not with the number of gates
+        self.tree = get_gate_tree(geometry.bboxes, leaf_size)
+
+    def get_exact_distances(self,
+                            points: np.ndarray,
+                            gate_indices: np.ndarray) -> np.ndarray:
+        # distance of every point to the gate paired with it, 0 inside the opening
+        distances = np.empty(len(points))
+        is_ball = self.is_ball[gate_indices]
+        if np.any(is_ball):
+            balls = gate_indices[is_ball]
+            center_distances = np.linalg.norm(points[is_ball] - self.geometry.centers[balls], axis=1)
+            distances[is_ball] = np.maximum(center_distances - self.geometry.radii[balls], 0.0)
+        if not np.all(is_ball):
+            prismas = gate_indices[~is_ball]
+            distances[~is_ball] = get_polygon_distances(points[~is_ball], self.geometry.polygons[prismas],
+                                                        self.geometry.normals[prismas])
+        return distances
+
+    def query_chunk(self,
+                    points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        tree = self.tree
+        num_points = len(points)
+        min_distances = np.full(num_points, np.inf)
+        gate_indices = np.full(num_points, -1, dtype=int)
+
+        # depth-first search of all points in lockstep, every step pops one node per point
+        # the nearer child is pushed last, nodes that cannot hold a closer gate are skipped
+        stacks = np.empty((num_points, tree.depth + 1), dtype=int)
+        stacks[:, 0] = 0
+        sizes = np.ones(num_points, dtype=int)
+        while True:
+            active = np.flatnonzero(sizes)
+            if not len(active):
+                break
+            sizes[active] -= 1
+            nodes = stacks[active, sizes[active]]
+            keep = tree.get_box_distances(points[active], nodes) < min_distances[active]
+            active, nodes = active[keep], nodes[keep]
+            is_leaf = tree.children[nodes, 0] < 0
+
+            # exact distances to the gates of the leaves
+            rows, leaves = active[is_leaf], nodes[is_leaf]
+            if len(rows):
+                candidates = tree.leaf_gates[leaves]
+                valid = candidates >= 0
+                distances = np.full(candidates.shape, np.inf)
+                distances[valid] = self.get_exact_distances(points[np.broadcast_to(rows[:, None], candidates.shape)[valid]],
+                                                            candidates[valid])
+                nearest = np.argmin(distances, axis=1)
+                distances = distances[np.arange(len(rows)), nearest]
+                closer = distances < min_distances[rows]
+                min_distances[rows[closer]] = distances[closer]
+                gate_indices[rows[closer]] = candidates[np.arange(len(rows)), nearest][closer]
+
+            # far child first, then the near one
+            rows, children = active[~is_leaf], tree.children[nodes[~is_leaf]]
+            bounds = tree.get_box_distances(points[rows][:, None, :], children)
+            near = np.argmin(bounds, axis=1)
+            for side in (1 - near, near):
+                child, bound = children[np.arange(len(rows)), side], bounds[np.arange(len(rows)), side]
+                push = bound < min_distances[rows]
+                stacks[rows[push], sizes[rows[push]]] = child[push]
+                sizes[rows[push]] += 1
+        return min_distances, gate_indices
+
+    def query(self,
+              points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # (M, 3) points -> distance to the closest gate and its index
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if len(self.geometry) == 0:
+            return np.full(len(points), np.inf), np.full(len(points), -1, dtype=int)
+        distances, gate_indices = np.empty(len(points)), np.empty(len(points), dtype=int)
+        for start in range(0, len(points), self.chunk_size):
+            end = start + self.chunk_size
+            distances[start:end], gate_indices[start:end] = self.query_chunk(points[start:end])
+        return distances, gate_indices
+
+def get_gate_distances(track_or_geometry,
+                       points: np.ndarray,
+                       set_radius: Optional[float] = None,
+                       set_width: Optional[float] = None,
+                       set_height: Optional[float] = None,
+                       set_margin: float = 0) -> np.ndarray:
+    if isinstance(track_or_geometry, GateGeometry):
+        geometry = track_or_geometry
+    else:
+        geometry = get_gate_geometry(track_or_geometry, set_radius, set_width, set_height, set_margin)
+    return GateDistanceField(geometry).query(points)[0]
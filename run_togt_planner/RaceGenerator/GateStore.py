@@ -0,0 +1,344 @@
+import numpy as np
+from typing import Iterator, List, Optional, Union
+from run_togt_planner.RaceGenerator.BaseRaceClass import BaseRaceClass, Gate
+from run_togt_planner.RaceGenerator.GateShape import BaseShape
+from run_togt_planner.RaceGenerator.GateGeometry import GATE_TYPES, PARAM_KEYS
+from run_togt_planner.RaceGenerator.GenerationTools import get_shape_class
+from ruamel.yaml.comments import CommentedMap
+
+PARAM_COLUMNS = {key: i for i, key in enumerate(PARAM_KEYS)}
+# shape keys in the order of the shape constructors, as returned by get_shape_info()
+SHAPE_KEYS = {
+    'SingleBall': ['radius', 'margin'],
+    'TrianglePrisma': ['rpy', 'length', 'midpoints', 'width', 'height', 'margin'],
+    'RectanglePrisma': ['rpy', 'length', 'midpoints', 'width', 'height', 'marginW', 'marginH'],
+    'PentagonPrisma': ['rpy', 'length', 'midpoints', 'radius', 'margin'],
+    'HexagonPrisma': ['rpy', 'length', 'midpoints', 'side', 'margin'],
+}
+
+# per-gate columns, all of them are resized and moved together
+COLUMN_KEYS = ['position_data', 'rpy_data', 'type_code_data', 'param_data', 'stationary_data', 'int_flag_data']
+
+# bits of int_flags, set where the value was given as int so it is written back as int
+POSITION_BIT = 0
+RPY_BIT = 3
+PARAM_BIT = 6
+
+########################################
+############## GATE VIEW ###############
+########################################
+
+class GateView:
+    __slots__ = ('store', 'gate_name', 'row', 'generation')
+
+    def __init__(self,
+                 store: 'GateStore',
+                 gate_name: str):
+        self.store = store
+        self.gate_name = gate_name
+        self.row = store.rows[gate_name]
+        self.generation = store.generation
+
+    @property
+    def index(self) -> int:
+        # the row is looked up again by gate name once rows have moved, a removed gate raises a KeyError
+        if self.generation != self.store.generation:
+            if self.gate_name not in self.store.rows:
+                raise KeyError(f"Gate {self.gate_name} was removed.")
+            self.row = self.store.rows[self.gate_name]
+            self.generation = self.store.generation
+        return self.row
+
+    @property
+    def type(self) -> str:
+        return GATE_TYPES[self.store.type_codes[self.index]]
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.store.names[self.index]
+
+    @property
+    def position(self) -> List[float]:
+        return self.store.get_values(self.index, 'position')
+
+    @position.setter
+    def position(self, position: Union[List[float], np.ndarray]):
+        self.store.set_values(self.index, 'position', position)
+
+    @property
+    def stationary(self) -> bool:
+        return bool(self.store.stationary[self.index])
+
+    @stationary.setter
+    def stationary(self, stationary: bool):
+        self.store.stationary[self.index] = stationary
+
+    @property
+    def shape(self) -> BaseShape:
+        # a new shape object, changing it does not change the store
+        return get_shape_class(self.type)(**self.get_shape_kwargs())
+
+    def get_shape_kwargs(self) -> dict:
+        return {key: self.store.get_values(self.index, key) for key in SHAPE_KEYS[self.type]}
+
+    def get_source_values(self,
+                          source: Optional[dict] = None) -> dict:
+        # stored values, replaced by the ones of the loaded gate in source that still match,
+        # so the file formatting survives a round trip
+        values = {key: self.store.get_values(self.index, key) for key in SHAPE_KEYS[self.type] + ['position']}
+        if source is not None:
+            for key, value in values.items():
+                if key in source and is_same_value(source[key], value):
+                    values[key] = source[key]
+        return values
+
+    def to_gate(self) -> Gate:
+        return Gate(gate_shape=self.shape, position=self.position, stationary=self.stationary, name=self.name)
+
+    def to_dict(self,
+                source: Optional[dict] = None) -> dict:
+        values = self.get_source_values(source)
+        data = {
+            'type': self.type,
+            **{key: values[key] for key in SHAPE_KEYS[self.type]},
+            'position': values['position'],
+            'stationary': self.stationary
+        }
+        if self.name is not None:
+            data['name'] = self.name
+        return data
+
+    def to_ordered_dict(self,
+                        source: Optional[dict] = None) -> CommentedMap:
+        ordered_keys = [key for key in Gate.SHAPE_ORDER_KEYS[self.type] if key != 'name' or self.name is not None]
+        return BaseRaceClass.to_ordered_dict(self, ordered_keys=ordered_keys, dict=self.to_dict(source))
+
+    def __repr__(self) -> str:
+        return f"GateView({self.gate_name}, {self.type})"
+
+########################################
+############## GATE STORE ##############
+########################################
+
+class GateStore:
+    def __init__(self,
+                 capacity: int = 16):
+        self.size = 0
+        self.generation = 0    # changes whenever rows move or are dropped, see GateView.index
+        self.rows = {}         # gate name -> row
+        self.gate_names = []   # keys of the gates in the track
+        self.names = []        # 'name' field of the gates, None if unset
+        self.position_data = np.empty((capacity, 3))
+        self.rpy_data = np.zeros((capacity, 3))
+        self.type_code_data = np.empty(capacity, dtype=np.int8)
+        self.param_data = np.full((capacity, len(PARAM_KEYS)), np.nan)
+        self.stationary_data = np.empty(capacity, dtype=bool)
+        self.int_flag_data = np.zeros(capacity, dtype=np.uint16)
+
+    # views of the filled rows
+    @property
+    def positions(self) -> np.ndarray:
+        return self.position_data[:self.size]
+
+    @property
+    def rpy(self) -> np.ndarray:
+        return self.rpy_data[:self.size]
+
+    @property
+    def type_codes(self) -> np.ndarray:
+        return self.type_code_data[:self.size]
+
+    @property
+    def params(self) -> np.ndarray:
+        return self.param_data[:self.size]
+
+    @property
+    def stationary(self) -> np.ndarray:
+        return self.stationary_data[:self.size]
+
+    @property
+    def int_flags(self) -> np.ndarray:
+        return self.int_flag_data[:self.size]
+
+    @property
+    def types(self) -> List[str]:
+        return [GATE_TYPES[code] for code in self.type_codes]
+
+    def get_param(self,
+                  key: str) -> np.ndarray:
+        return self.params[:, PARAM_COLUMNS[key]]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> GateView:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("gate index out of range")
+        return GateView(self, self.gate_names[index])
+
+    def __iter__(self) -> Iterator[GateView]:
+        return (GateView(self, gate_name) for gate_name in list(self.gate_names))
+
+    def __getstate__(self) -> dict:
+        # only the filled rows are pickled
+        state = dict(self.__dict__)
+        for key in COLUMN_KEYS:
+            state[key] = state[key][:self.size].copy()
+        return state
+
+    def reserve(self,
+                capacity: int):
+        if capacity <= len(self.type_code_data):
+            return
+        capacity = max(capacity, 2 * len(self.type_code_data))
+        for key in COLUMN_KEYS:
+            old = getattr(self, key)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, key, new)
+        self.param_data[self.size:] = np.nan
+
+    def get_values(self,
+                   index: int,
+                   key: str) -> Union[List[float], float]:
+        # python values of one gate, ints stay ints
+        flags = int(self.int_flag_data[index])
+        if key in ('position', 'rpy'):
+            row, bit = (self.position_data, POSITION_BIT) if key == 'position' else (self.rpy_data, RPY_BIT)
+            return [int(v) if flags >> (bit + i) & 1 else v for i, v in enumerate(row[index].tolist())]
+        column = PARAM_COLUMNS[key]
+        value = self.param_data[index, column].item()
+        return int(value) if flags >> (PARAM_BIT + column) & 1 else value
+
+    def set_values(self,
+                   index: int,
+                   key: str,
+                   values: Union[List[float], np.ndarray, float]):
+        flags = int(self.int_flag_data[index])
+        if key in ('position', 'rpy'):
+            row, bit = (self.position_data, POSITION_BIT) if key == 'position' else (self.rpy_data, RPY_BIT)
+            values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+            row[index] = values
+            for i, v in enumerate(values):
+                flags = flags | (1 << (bit + i)) if is_int(v) else flags & ~(1 << (bit + i))
+        else:
+            column = PARAM_COLUMNS[key]
+            self.param_data[index, column] = values
+            flags = flags | (1 << (PARAM_BIT + column)) if is_int(values) else flags & ~(1 << (PARAM_BIT + column))
+        self.int_flag_data[index] = flags
+
+    def set_row(self,
+                index: int,
+                gate: Union[Gate, GateView]):
+        if isinstance(gate, GateView):
+            # copy the row without going through python values
+            source, row = gate.store, gate.index
+            for key in COLUMN_KEYS:
+                getattr(self, key)[index] = getattr(source, key)[row]
+        else:
+            shape = gate.shape.get_shape_info()
+            if shape['type'] not in GATE_TYPES:
+                raise ValueError('Unrecognized gate: ' + shape['type'])
+            # fill a whole row at once, this runs for every gate of a track
+            position = list(gate.position)
+            rpy = list(shape.get('rpy', [0.0, 0.0, 0.0]))
+            params = [np.nan] * len(PARAM_KEYS)
+            flags = 0
+            for i, v in enumerate(position):
+                flags |= is_int(v) << (POSITION_BIT + i)
+            for i, v in enumerate(rpy):
+                flags |= is_int(v) << (RPY_BIT + i)
+            for key in SHAPE_KEYS[shape['type']]:
+                if key != 'rpy':
+                    column = PARAM_COLUMNS[key]
+                    params[column] = shape[key]
+                    flags |= is_int(shape[key]) << (PARAM_BIT + column)
+            self.type_code_data[index] = GATE_TYPES.index(shape['type'])
+            self.stationary_data[index] = gate.stationary
+            self.position_data[index] = position
+            self.rpy_data[index] = rpy
+            self.param_data[index] = params
+            self.int_flag_data[index] = flags
+
+    def append(self,
+               gate_name: str,
+               gate: Union[Gate, GateView]):
+        # a gate name that is already stored is replaced, like in a dict
+        if gate_name in self.rows:
+            self.replace(gate_name, gate)
+            return
+        index = self.size
+        self.reserve(index + 1)
+        self.set_row(index, gate)
+        self.gate_names.append(gate_name)
+        self.names.append(gate.name)
+        self.rows[gate_name] = index
+        self.size += 1
+
+    def replace(self,
+                gate_name: str,
+                gate: Union[Gate, GateView]):
+        index = self.rows[gate_name]
+        self.set_row(index, gate)
+        self.names[index] = gate.name
+
+    def remove(self,
+               gate_name: str):
+        # the last row fills the gap, views find their gate again by name
+        index = self.rows.pop(gate_name)
+        self.generation += 1
+        last = self.size - 1
+        if index != last:
+            for key in COLUMN_KEYS:
+                column = getattr(self, key)
+                column[index] = column[last]
+            self.gate_names[index] = self.gate_names[last]
+            self.names[index] = self.names[last]
+            self.rows[self.gate_names[index]] = index
+        self.gate_names.pop()
+        self.names.pop()
+        self.param_data[last] = np.nan
+        self.size -= 1
+
+    def get(self,
+            gate_name: str) -> GateView:
+        return GateView(self, gate_name)
+
+    def __contains__(self, gate_name: str) -> bool:
+        return gate_name in self.rows
+
+    def get_columns(self) -> dict:
+        # filled rows of every column, e.g. for binary serialization
+        return {key: getattr(self, key)[:self.size] for key in COLUMN_KEYS}
+
+    def set_columns(self,
+                    gate_names: List[str],
+                    names: List[Optional[str]],
+                    columns: dict):
+        # replaces all gates, the columns are given as returned by get_columns()
+        generation = self.generation + 1
+        self.__init__(capacity=max(len(gate_names), 1))
+        self.generation = generation
+        for key in COLUMN_KEYS:
+            getattr(self, key)[:len(gate_names)] = columns[key]
+        self.size = len(gate_names)
+        self.gate_names = list(gate_names)
+        self.names = list(names)
+        self.rows = {gate_name: i for i, gate_name in enumerate(self.gate_names)}
+
+    def clear(self):
+        generation = self.generation + 1
+        self.__init__()
+        self.generation = generation
+
+def is_int(value) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+def is_same_value(source: Union[list, float],
+                  value: Union[list, float]) -> bool:
+    # the stored columns may have been changed after loading, then the source is stale
+    if isinstance(value, list):
+        return isinstance(source, list) and len(source) == len(value) and all(map(is_same_value, source, value))
+    return not isinstance(source, list) and source == value and is_int(source) == is_int(value)
@@ -1,4 +1,6 @@
 import numpy as np
+import os
+import tempfile
 from typing import List, Optional, Union, Type
 from run_togt_planner.RaceGenerator.GateShape import BaseShape, SingleBall, TrianglePrisma, RectanglePrisma, PentagonPrisma, HexagonPrisma
 from run_togt_planner.RaceGenerator.BaseRaceClass import State, Gate
@@ -63,4 +65,44 @@ def create_gate(gate_type: Union[Type[BaseShape], str],
     return Gate(gate_shape=gate_type(**shape_kwargs), 
                 position=position, 
                 stationary=stationary, 
-                name=name)
\ No newline at end of file
+                name=name)
+
+def get_umask() -> int:
+    # /proc avoids changing the umask of the process, which other threads may rely on
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+def set_new_file_mode(tmp_file: str,
+                      save_file: str):
+    # mkstemp creates 0600 files, give the result the mode of the file it replaces or of a plain open()
+    try:
+        mode = os.stat(save_file).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~get_umask()
+    os.chmod(tmp_file, mode)
+
+def write_file_atomic(save_file: Union[os.PathLike, str],
+                      data: Union[str, bytes]):
+    # readers see the old file or the complete new one, never a partial write
+    save_file = os.fspath(save_file)
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(save_file) or '.',
+                                    prefix='.' + os.path.basename(save_file) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+        set_new_file_mode(tmp_file, save_file)
+        os.replace(tmp_file, save_file)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
@@ -1,15 +1,29 @@
 from typing import List, Optional, Union
 from run_togt_planner.RaceGenerator.BaseRaceClass import BaseRaceClass, State, Gate
-from run_togt_planner.RaceGenerator.GenerationTools import create_state, create_gate, quote_specific_keys
+from run_togt_planner.RaceGenerator.GateStore import GateStore, GateView
+from run_togt_planner.RaceGenerator.GenerationTools import create_state, create_gate, get_shape_class, quote_specific_keys, write_file_atomic
+from run_togt_planner.RaceGenerator.TrackBinary import save_npz, load_npz
+from run_togt_planner.RaceGenerator.TrackLoader import load_track_data
+from run_togt_planner.RaceGenerator.YamlEmitter import emit_standard_yaml
+import io
+import itertools
 import os
+import threading
 
 from ruamel.yaml import YAML
 from ruamel.yaml.comments import CommentedMap, CommentedSeq
 
-yaml = YAML()
-yaml.indent(mapping=2, sequence=4, offset=2)
-yaml.width = 4096
-yaml.default_flow_style = False
+_yaml_local = threading.local()
+
+def get_yaml() -> YAML:
+    # ruamel instances keep state between calls, every thread gets its own
+    if not hasattr(_yaml_local, 'yaml'):
+        yaml = YAML()
+        yaml.indent(mapping=2, sequence=4, offset=2)
+        yaml.width = 4096
+        yaml.default_flow_style = False
+        _yaml_local.yaml = yaml
+    return _yaml_local.yaml
 
 class RaceTrack(BaseRaceClass):
     def __init__(self,
@@ -20,31 +34,88 @@ class RaceTrack(BaseRaceClass):
         self.endState = end_state
         self.race_name = race_name
         self.orders = []
-        self.gate_sequence = []
+        self.gates = GateStore()
         self.gate_num = 0
+        # the document of load_from_yaml(fast=False), unchanged gate values are written with its formatting
+        self.yaml_source = None
 
-    def add_gate(self,
-                 gate: Gate,
-                 gate_name: Optional[str] = None):
+    @property
+    def gate_sequence(self) -> List[list]:
+        # [gate_name, gate] pairs, the gates are views into the array storage
+        return [[gate_name, self.gates.get(gate_name)] for gate_name in self.get_gate_names()]
+
+    def get_gate_names(self) -> List[str]:
+        # gates in race order, then gates that are not part of orders
+        gate_names = itertools.chain(self.orders, self.gates.gate_names)
+        return [gate_name for gate_name in dict.fromkeys(gate_names) if gate_name in self.gates]
+
+    def get_gate_name(self,
+                      gate_name: Optional[str] = None) -> str:
         if gate_name is None:
             self.gate_num += 1
             gate_name = 'Gate' + str(self.gate_num)
+        return gate_name
+
+    def add_gate(self,
+                 gate: Union[Gate, GateView],
+                 gate_name: Optional[str] = None):
+        gate_name = self.get_gate_name(gate_name)
         self.orders.append(gate_name)
-        self.gate_sequence.append([gate_name, gate])
+        self.gates.append(gate_name, gate)
+
+    def insert_gate(self,
+                    index: int,
+                    gate: Union[Gate, GateView],
+                    gate_name: Optional[str] = None):
+        gate_name = self.get_gate_name(gate_name)
+        if gate_name in self.gates:
+            raise KeyError(f"Gate {gate_name} already exists.")
+        self.orders.insert(index, gate_name)
+        self.gates.append(gate_name, gate)
+
+    def remove_gate(self,
+                    gate_name: str):
+        self.gates.remove(gate_name)
+        while gate_name in self.orders:
+            self.orders.remove(gate_name)
+
+    def replace_gate(self,
+                     gate_name: str,
+                     gate: Union[Gate, GateView]):
+        # keeps the position of the gate in orders
+        self.gates.replace(gate_name, gate)
+
+    def move_gate(self,
+                  gate_name: str,
+                  index: int):
+        if gate_name not in self.gates:
+            raise KeyError(gate_name)
+        self.orders.remove(gate_name)
+        self.orders.insert(index, gate_name)
+
+    def get_gate(self,
+                 gate_name: str) -> GateView:
+        return self.gates.get(gate_name)
+
+    def get_gate_source(self,
+                        gate_name: str) -> Optional[dict]:
+        # the loaded values of the gate, None unless the track was loaded with fast=False
+        if self.yaml_source is None:
+            return None
+        source = self.yaml_source.get(gate_name)
+        return source if isinstance(source, dict) else None
 
     def clear_gates(self):
         self.orders = []
-        self.gate_sequence = []
+        self.gates.clear()
         self.gate_num = 0
 
     def get_gate_dict(self,
                       ordered: bool = False) -> Union[dict, CommentedMap]:
         gate_dict = CommentedMap() if ordered else {}
-        for gate_info in self.gate_sequence:
-            if ordered:
-                gate_dict[gate_info[0]] = gate_info[1].to_ordered_dict()
-            else:
-                gate_dict[gate_info[0]] = gate_info[1].to_dict()
+        for gate_name in self.get_gate_names():
+            gate, source = self.gates.get(gate_name), self.get_gate_source(gate_name)
+            gate_dict[gate_name] = gate.to_ordered_dict(source) if ordered else gate.to_dict(source)
         return gate_dict
 
     def to_dict(self) -> dict:
@@ -63,20 +134,15 @@ class RaceTrack(BaseRaceClass):
         Seq_orders = CommentedSeq(self.orders)
         Seq_orders.fa.set_flow_style()
         data['orders'] = Seq_orders
-        ordered_gate_dict = self.get_gate_dict(ordered=True)
         for gate_name in self.orders:
-            data[gate_name] = ordered_gate_dict[gate_name]
+            if gate_name not in data:
+                data[gate_name] = self.gates.get(gate_name).to_ordered_dict(self.get_gate_source(gate_name))
         return data
 
-    def save_to_yaml(self,
-                     save_dir: Optional[Union[os.PathLike, str]] = None,
-                     overwrite: bool = False,
-                     standard: bool = True,
-                     save_output: bool = True,) -> bool:
-        if self.gate_sequence == []:
-            Warning("No gate has been added! The race track will not be saved.")
-            return False
-
+    def get_save_file(self,
+                      save_dir: Optional[Union[os.PathLike, str]],
+                      extension: str,
+                      overwrite: bool) -> str:
         if save_dir is None:
             save_path = os.path.join(os.getcwd(), 'resources/racetrack')
         else:
@@ -84,59 +150,91 @@ class RaceTrack(BaseRaceClass):
         os.makedirs(save_path, exist_ok=True)
 
         file_name = self.race_name if self.race_name is not None else "racetrack"
-        save_file = os.path.join(save_path, file_name + '.yaml')
+        save_file = os.path.join(save_path, file_name + extension)
 
         if not overwrite:
             base_name = file_name
             counter = 1
             while os.path.exists(save_file):
                 file_name = f"{base_name}_{counter}"
-                save_file = os.path.join(save_path, file_name + '.yaml')
+                save_file = os.path.join(save_path, file_name + extension)
                 counter += 1
+        return save_file
 
+    def save_to_yaml(self,
+                     save_dir: Optional[Union[os.PathLike, str]] = None,
+                     overwrite: bool = False,
+                     standard: bool = True,
+                     save_output: bool = True,
+                     fast: bool = True) -> bool:
+        if len(self.gates) == 0:
+            Warning("No gate has been added! The race track will not be saved.")
+            return False
+
+        save_file = self.get_save_file(save_dir, '.yaml', overwrite)
+        try:
+            # written to a temporary file and renamed, a failed save never leaves a truncated file
+            write_file_atomic(save_file, self.to_yaml_text(standard=standard, fast=fast))
+            if save_output:
+                print(f"Success to save to: {save_file}")
+            return True
+        except Exception as e:
+            if save_output:
+                print(f"Error saving to YAML: {e}")
+            return False
+
+    def to_yaml_text(self,
+                     standard: bool = True,
+                     fast: bool = True) -> str:
+        # the content of save_to_yaml
+        yaml = get_yaml()
+        stream = io.StringIO()
         if standard:
+            # the template emitter writes the same bytes as ruamel, without building the node tree
+            text = emit_standard_yaml(self) if fast else None
+            if text is not None:
+                return text
             save_data = self.to_ordered_dict()
             quote_specific_keys(save_data)
-            try:
-                with open(file=save_file, mode="w") as f:
-                    pass
-                with open(file=save_file, mode="a") as f:
-                    for key in save_data.keys():
-                        yaml.dump({key : save_data[key]}, f)
-                        f.write('\n')
-                if save_output:
-                    print(f"Success to save to: {save_file}")
-                return True
-            except Exception as e:
-                if save_output:
-                    print(f"Error saving to YAML: {e}")
-                return False
+            for key in save_data.keys():
+                yaml.dump({key : save_data[key]}, stream)
+                stream.write('\n')
         else:
-            save_data = self.to_dict()
-            try:
-                with open(file=save_file, mode="w") as f:
-                    yaml.dump(save_data, f)
-                if save_output:
-                    print(f"Success to save to: {save_file}")
-                return True
-            except Exception as e:
-                if save_output:
-                    print(f"Error saving to YAML: {e}")
-                return False
-            
+            yaml.dump(self.to_dict(), stream)
+        return stream.getvalue()
+
     def load_from_yaml(self,
-                       load_dir: Optional[Union[os.PathLike, str]]):
+                       load_dir: Optional[Union[os.PathLike, str]],
+                       fast: bool = True):
         gate_param_list = ['type', 'name', 'position', 'stationary']
         load_dir = os.fspath(load_dir)
         self.race_name = os.path.splitext(os.path.basename(load_dir))[0]
 
+        if fast:
+            # validated plain python data, the gates can be built without further checks
+            data = load_track_data(load_dir)
+            self.initState = State(**data['initState'])
+            self.endState = State(**data['endState'])
+            self.clear_gates()
+            self.yaml_source = None
+            for gate_name in data['orders']:
+                gate_params = data[gate_name]
+                shape_kwarg = {k: v for k, v in gate_params.items() if k not in gate_param_list}
+                gate = Gate(gate_shape=get_shape_class(gate_params['type'])(**shape_kwarg),
+                            position=gate_params['position'],
+                            stationary=gate_params['stationary'],
+                            name=gate_params.get('name', None))
+                self.add_gate(gate, gate_name)
+            return
+
         with open(file=load_dir, mode="r") as f:
-            data = yaml.load(f)
+            data = get_yaml().load(f)
 
         self.initState = create_state(data['initState'])
         self.endState = create_state(data['endState'])
         
         self.clear_gates()
+        self.yaml_source = data
         for gate_name in data['orders']:
             gate_params = data[gate_name]
             shape_kwarg = {k: v for k, v in gate_params.items() if k not in gate_param_list}
@@ -146,4 +244,32 @@ class RaceTrack(BaseRaceClass):
                           'shape_kwargs': shape_kwarg,
                           'name': gate_params.get('name', None)}
             gate = create_gate(**gate_kwarg)
-            self.add_gate(gate, gate_name)
\ No newline at end of file
+            self.add_gate(gate, gate_name)
+
+    def save_to_npz(self,
+                    save_dir: Optional[Union[os.PathLike, str]] = None,
+                    overwrite: bool = False,
+                    save_output: bool = True,
+                    compress: bool = False) -> bool:
+        # binary counterpart of save_to_yaml, converts to YAML and back without loss
+        if len(self.gates) == 0:
+            Warning("No gate has been added! The race track will not be saved.")
+            return False
+
+        save_file = self.get_save_file(save_dir, '.npz', overwrite)
+        try:
+            save_npz(self, save_file, compress=compress)
+            if save_output:
+                print(f"Success to save to: {save_file}")
+            return True
+        except Exception as e:
+            if save_output:
+                print(f"Error saving to NPZ: {e}")
+            return False
+
+    def load_from_npz(self,
+                      load_dir: Optional[Union[os.PathLike, str]]):
+        load_dir = os.fspath(load_dir)
+        self.race_name = os.path.splitext(os.path.basename(load_dir))[0]
+        self.yaml_source = None
+        load_npz(self, load_dir)
@@ -0,0 +1,232 @@
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from run_togt_planner.RaceGenerator.BaseRaceClass import State, Gate
+from run_togt_planner.RaceGenerator.GenerationTools import create_state, create_gate, get_shape_class
+from run_togt_planner.RaceGenerator.RaceTrack import RaceTrack
+
+DEFAULT_LOWER = [-8.0, -8.0, 0.0]
+DEFAULT_UPPER = [8.0, 8.0, 16.0]
+
+########################################
+######## POISSON-DISK SAMPLING #########
+########################################
+
+class PoissonDiskSampler:
+    def __init__(self,
+                 lower: Union[List[float], np.ndarray],
+                 upper: Union[List[float], np.ndarray],
+                 min_distance: float,
+                 max_attempts: int = 1000,
+                 seed: Optional[Union[int, np.random.Generator]] = None):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        if np.any(self.upper < self.lower):
+            raise ValueError("upper bounds must not be smaller than lower bounds.")
+        if min_distance <= 0:
+            raise ValueError("min_distance must be positive.")
+        self.min_distance = min_distance
+        self.max_attempts = max_attempts
+        self.rng = np.random.default_rng(seed)
+
+        # a cell diagonal equals min_distance, so a cell holds at most one point
+        # and all conflicts lie within two cells, the grid is padded by two cells
+        self.cell_size = min_distance / np.sqrt(3)
+        self.grid_shape = tuple(np.floor((self.upper - self.lower) / self.cell_size).astype(int) + 5)
+
+    def get_cell(self,
+                 point: np.ndarray) -> tuple:
+        cell = np.floor((point - self.lower) / self.cell_size).astype(int)
+        return tuple(np.minimum(cell, np.array(self.grid_shape) - 5) + 2)
+
+    def sample(self,
+               num_points: int,
+               fixed_points: Optional[Union[List[List[float]], np.ndarray]] = None) -> np.ndarray:
+        # (num_points, 3) points at least min_distance apart and from the fixed points
+        grid = np.full(self.grid_shape, -1, dtype=int)
+        points = np.empty((num_points, 3))
+        # fixed points, e.g. the initial and end states, are obstacles only and may be close to each other
+        fixed_points = np.empty((0, 3)) if fixed_points is None else np.asarray(fixed_points, dtype=float).reshape(-1, 3)
+        min_distance_sq = self.min_distance**2
+
+        num_accepted = 0
+        num_attempts = 0
+        max_attempts = self.max_attempts * max(num_points, 1)
+        while num_accepted < num_points:
+            # draw candidates in batches, the fixed points are checked for the whole batch at once
+            candidates = self.rng.uniform(self.lower, self.upper, (64, 3))
+            if len(fixed_points):
+                fixed_distances = np.sum((candidates[:, None, :] - fixed_points[None])**2, axis=2)
+                candidates = candidates[np.all(fixed_distances >= min_distance_sq, axis=1)]
+            num_attempts += 64 - len(candidates)
+
+            # the remaining candidates are checked against the points in its 5x5x5 neighbour cells
+            for candidate in candidates:
+                num_attempts += 1
+                cell = self.get_cell(candidate)
+                neighbours = grid[tuple(slice(c - 2, c + 3) for c in cell)]
+                neighbours = neighbours[neighbours >= 0]
+                if len(neighbours) and np.min(np.sum((points[neighbours] - candidate)**2, axis=1)) < min_distance_sq:
+                    continue
+                points[num_accepted] = candidate
+                grid[cell] = num_accepted
+                num_accepted += 1
+                if num_accepted == num_points:
+                    break
+
+            if num_accepted < num_points and num_attempts >= max_attempts:
+                raise RuntimeError(f"Failed to place {num_points} points with min_distance {self.min_distance} "
+                                   f"after {num_attempts} attempts, only {num_accepted} were placed.")
+        return points
+
+########################################
+######### RANDOM RACE TRACKS ###########
+########################################
+
+def create_random_racetrack(gate_num: int,
+                            shape_kwargs: dict,
+                            gate_type: str = 'SingleBall',
+                            lower: Union[List[float], np.ndarray] = DEFAULT_LOWER,
+                            upper: Union[List[float], np.ndarray] = DEFAULT_UPPER,
+                            min_distance: float = 2.0,
+                            init_pos: Optional[Union[List[float], np.ndarray]] = None,
+                            end_pos: Optional[Union[List[float], np.ndarray]] = None,
+                            name: Optional[str] = None,
+                            seed: Optional[Union[int, np.random.Generator]] = None,
+                            sampler: Optional[PoissonDiskSampler] = None) -> RaceTrack:
+    if gate_num <= 0:
+        raise ValueError("gate_num must be a positive integer.")
+    if sampler is None:
+        sampler = PoissonDiskSampler(lower, upper, min_distance, seed=seed)
+
+    # missing initial and end positions are sampled together with the gates
+    fixed_points = [pos for pos in (init_pos, end_pos) if pos is not None]
+    num_free = (init_pos is None) + (end_pos is None)
+    points = sampler.sample(gate_num + num_free, fixed_points=fixed_points)
+    if init_pos is None:
+        init_pos, points = points[0], points[1:]
+    if end_pos is None:
+        end_pos, points = points[0], points[1:]
+
+    race_track = RaceTrack(init_state=create_state({'pos': np.asarray(init_pos, dtype=float)}),
+                           end_state=create_state({'pos': np.asarray(end_pos, dtype=float)}),
+                           race_name=name or "RandomRace")
+    for i, position in enumerate(points):
+        gate = create_gate(gate_type=gate_type,
+                           position=position.tolist(),
+                           stationary=True,
+                           shape_kwargs=shape_kwargs,
+                           name=f"{name}_Gate_{i+1}" if name else f"Gate_{i+1}")
+        race_track.add_gate(gate, gate.name)
+    return race_track
+
+########################################
+######### BULK RANDOM TRACKS ###########
+########################################
+
+def spawn_seeds(seed: Optional[Union[int, np.random.SeedSequence]],
+                num_workers: int) -> List[np.random.SeedSequence]:
+    # independent streams for parallel workers, pass one to each generate_random_racetracks call
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return seed_sequence.spawn(num_workers)
+
+def get_crowded_tracks(positions: np.ndarray,
+                       min_distance: float,
+                       fixed_points: np.ndarray) -> np.ndarray:
+    # (num_tracks, num_points, 3) -> (num_tracks,) whether two points of a track are closer than min_distance
+    # every point is compared with the ones before it, so only (num_tracks, num_points) distances exist at a time
+    min_distance_sq = min_distance**2
+    crowded = np.zeros(len(positions), dtype=bool)
+    for j in range(1, positions.shape[1]):
+        distances = np.sum((positions[:, :j] - positions[:, j:j+1])**2, axis=2)
+        crowded |= np.any(distances < min_distance_sq, axis=1)
+    for fixed_point in fixed_points:
+        crowded |= np.any(np.sum((positions - fixed_point)**2, axis=2) < min_distance_sq, axis=1)
+    return crowded
+
+def sample_separated_positions(rngs: List[np.random.Generator],
+                               num_points: int,
+                               lower: Union[List[float], np.ndarray],
+                               upper: Union[List[float], np.ndarray],
+                               min_distance: Optional[float] = None,
+                               fixed_points: Optional[np.ndarray] = None,
+                               max_rounds: int = 10) -> np.ndarray:
+    # (len(rngs), num_points, 3) positions, one generator per track
+    # tracks violating min_distance are redrawn as a whole from their own generator
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    positions = np.array([rng.uniform(lower, upper, (num_points, 3)) for rng in rngs]).reshape(len(rngs), num_points, 3)
+    if not min_distance:
+        return positions
+    fixed_points = np.empty((0, 3)) if fixed_points is None else np.asarray(fixed_points, dtype=float).reshape(-1, 3)
+
+    pending = np.arange(len(rngs))
+    for i in range(max_rounds + 1):
+        pending = pending[get_crowded_tracks(positions[pending], min_distance, fixed_points)]
+        if not len(pending) or i == max_rounds:
+            break
+        for index in pending:
+            positions[index] = rngs[index].uniform(lower, upper, (num_points, 3))
+
+    # dense settings rarely succeed by chance, finish them with the grid sampler
+    for index in pending:
+        positions[index] = PoissonDiskSampler(lower, upper, min_distance, seed=rngs[index]).sample(num_points, fixed_points=fixed_points)
+    return positions
+
+def generate_random_racetracks(num_tracks: int,
+                               gate_num: int,
+                               shape_kwargs: dict,
+                               gate_type: str = 'SingleBall',
+                               lower: Union[List[float], np.ndarray] = DEFAULT_LOWER,
+                               upper: Union[List[float], np.ndarray] = DEFAULT_UPPER,
+                               min_distance: Optional[float] = 2.0,
+                               init_pos: Optional[Union[List[float], np.ndarray]] = None,
+                               end_pos: Optional[Union[List[float], np.ndarray]] = None,
+                               rpy_range: Optional[Tuple[List[float], List[float]]] = None,
+                               shape_ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+                               name: str = "RandomRace",
+                               start_index: int = 0,
+                               seed: Optional[Union[int, np.random.SeedSequence, np.random.Generator]] = None,
+                               batch_size: int = 1024) -> Iterator[RaceTrack]:
+    # the same arguments and seed always give the same tracks, only one batch is held in memory
+    if gate_num <= 0:
+        raise ValueError("gate_num must be a positive integer.")
+    shape_ranges = {} if shape_ranges is None else shape_ranges
+    if rpy_range is not None and 'rpy' not in shape_kwargs:
+        raise ValueError(f"{gate_type} gates have no rpy to sample.")
+
+    # validate the shape parameters once instead of for every gate
+    shape_class = get_shape_class(gate_type) if isinstance(gate_type, str) else gate_type
+    create_gate(shape_class, [0.0, 0.0, 0.0], True, {**shape_kwargs, **{k: v[0] for k, v in shape_ranges.items()}})
+
+    # every track draws from its own child of the seed, so the tracks do not depend on batch_size
+    if isinstance(seed, np.random.Generator):
+        seed = np.random.SeedSequence(seed.integers(0, 2**32, size=4))
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    fixed_points = [pos for pos in (init_pos, end_pos) if pos is not None]
+    num_points = gate_num + (init_pos is None) + (end_pos is None)
+    for start in range(0, num_tracks, batch_size):
+        num_batch = min(batch_size, num_tracks - start)
+        rngs = [np.random.default_rng(child) for child in seed_sequence.spawn(num_batch)]
+
+        # draw everything of the batch, then convert to python floats for the yaml output
+        positions = sample_separated_positions(rngs, num_points, lower, upper, min_distance,
+                                               fixed_points=np.array(fixed_points).reshape(-1, 3)).tolist()
+        rpys = [rng.uniform(rpy_range[0], rpy_range[1], (gate_num, 3)).tolist() for rng in rngs] if rpy_range is not None else None
+        shape_values = {key: [rng.uniform(low, high, gate_num).tolist() for rng in rngs] for key, (low, high) in shape_ranges.items()}
+
+        for b in range(num_batch):
+            points = positions[b]
+            track_init = list(init_pos) if init_pos is not None else points.pop(0)
+            track_end = list(end_pos) if end_pos is not None else points.pop(0)
+            track_name = f"{name}_{start_index + start + b}"
+            race_track = RaceTrack(init_state=State(pos=track_init),
+                                   end_state=State(pos=track_end),
+                                   race_name=track_name)
+            for i, position in enumerate(points):
+                kwargs = dict(shape_kwargs)
+                if 'rpy' in kwargs:
+                    kwargs['rpy'] = rpys[b][i] if rpys is not None else list(kwargs['rpy'])
+                for key, values in shape_values.items():
+                    kwargs[key] = values[b][i]
+                gate_name = f"{track_name}_Gate_{i+1}"
+                race_track.add_gate(Gate(shape_class(**kwargs), position, True, gate_name), gate_name)
+            yield race_track
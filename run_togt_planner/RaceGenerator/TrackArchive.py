@@ -0,0 +1,168 @@
+import io
+import json
+import os
+import struct
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from run_togt_planner.RaceGenerator.BaseRaceClass import State
+from run_togt_planner.RaceGenerator.RaceTrack import RaceTrack
+from run_togt_planner.RaceGenerator.TrackBinary import to_npz_bytes, track_from_arrays
+
+# file layout:
+#   header  ARCHIVE_MAGIC
+#   records RECORD_MAGIC, name length (u4), data length (u8), utf-8 name, npz data of track_to_arrays
+#   index   json {name: [data offset, data length]}
+#   footer  index offset (u8), INDEX_MAGIC
+ARCHIVE_MAGIC = b'TOGTARC\x01'
+RECORD_MAGIC = b'TREC'
+INDEX_MAGIC = b'TOGTIDX\x01'
+RECORD_HEADER = struct.Struct('<4sIQ')
+FOOTER = struct.Struct('<Q8s')
+
+class TrackArchive:
+    def __init__(self,
+                 archive_file: Union[os.PathLike, str],
+                 mode: str = 'r'):
+        # 'r' reads, 'a' appends to an existing or new archive, 'w' starts a new archive
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError(f"Unsupported mode {mode!r}, expected 'r', 'a' or 'w'.")
+        self.archive_file = os.fspath(archive_file)
+        self.mode = mode
+        self.index = {}     # track name -> (data offset, data length)
+        self.modified = False
+
+        if mode == 'w' or mode == 'a' and not os.path.exists(self.archive_file):
+            self.file = open(self.archive_file, 'w+b')
+            self.file.write(ARCHIVE_MAGIC)
+            self.end = len(ARCHIVE_MAGIC)
+            self.modified = True
+            return
+
+        self.file = open(self.archive_file, 'rb' if mode == 'r' else 'r+b')
+        if self.file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            self.file.close()
+            raise ValueError(f"{self.archive_file} is not a track archive.")
+        self.index, self.end = self.read_index()
+        if mode == 'a':
+            # new records overwrite the old index, it is written again on close
+            self.file.truncate(self.end)
+            self.modified = True
+
+    ########################################
+    ################ INDEX #################
+    ########################################
+
+    def read_index(self) -> Tuple[Dict[str, Tuple[int, int]], int]:
+        # the index at the end of the file, or a scan of the records if it was never written
+        file_size = self.file.seek(0, os.SEEK_END)
+        if file_size >= len(ARCHIVE_MAGIC) + FOOTER.size:
+            self.file.seek(file_size - FOOTER.size)
+            index_offset, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+            if magic == INDEX_MAGIC and index_offset <= file_size - FOOTER.size:
+                self.file.seek(index_offset)
+                index = json.loads(self.file.read(file_size - FOOTER.size - index_offset).decode())
+                return {name: tuple(entry) for name, entry in index.items()}, index_offset
+        return self.scan_records()
+
+    def scan_records(self) -> Tuple[Dict[str, Tuple[int, int]], int]:
+        # recovers an archive that was not closed, an incomplete last record is dropped
+        index = {}
+        file_size = self.file.seek(0, os.SEEK_END)
+        offset = len(ARCHIVE_MAGIC)
+        while offset + RECORD_HEADER.size <= file_size:
+            self.file.seek(offset)
+            magic, name_length, data_length = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+            data_offset = offset + RECORD_HEADER.size + name_length
+            if magic != RECORD_MAGIC or data_offset + data_length > file_size:
+                break
+            index[self.file.read(name_length).decode()] = (data_offset, data_length)
+            offset = data_offset + data_length
+        return index, offset
+
+    def write_index(self):
+        index = json.dumps(self.index, separators=(',', ':')).encode()
+        self.file.seek(self.end)
+        self.file.write(index)
+        self.file.write(FOOTER.pack(self.end, INDEX_MAGIC))
+        self.file.truncate()
+        self.file.flush()
+
+    ########################################
+    ############### TRACKS #################
+    ########################################
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.index))
+
+    def get_free_name(self,
+                      name: str) -> str:
+        # same _N suffixes as save_to_yaml, looked up in the index instead of the file system
+        if name not in self.index:
+            return name
+        counter = 1
+        while f"{name}_{counter}" in self.index:
+            counter += 1
+        return f"{name}_{counter}"
+
+    def append(self,
+               race_track: RaceTrack,
+               name: Optional[str] = None,
+               overwrite: bool = False) -> str:
+        # returns the name the track is stored under, a replaced track keeps its space in the file
+        if self.mode == 'r':
+            raise ValueError("The archive is opened read-only.")
+        name = name or race_track.race_name or "racetrack"
+        if not overwrite:
+            name = self.get_free_name(name)
+
+        data = to_npz_bytes(race_track)
+        name_bytes = name.encode()
+
+        self.file.seek(self.end)
+        self.file.write(RECORD_HEADER.pack(RECORD_MAGIC, len(name_bytes), len(data)))
+        self.file.write(name_bytes)
+        self.file.write(data)
+        data_offset = self.end + RECORD_HEADER.size + len(name_bytes)
+        self.index[name] = (data_offset, len(data))
+        self.end = data_offset + len(data)
+        return name
+
+    def load(self,
+             name: str) -> RaceTrack:
+        # reads only the record of this track
+        data_offset, data_length = self.index[name]
+        self.file.seek(data_offset)
+        race_track = RaceTrack(init_state=State(pos=[0.0, 0.0, 0.0]),
+                               end_state=State(pos=[0.0, 0.0, 0.0]),
+                               race_name=name)
+        with np.load(io.BytesIO(self.file.read(data_length)), allow_pickle=False) as data:
+            track_from_arrays(race_track, {key: data[key] for key in data.files})
+        return race_track
+
+    def iter_tracks(self) -> Iterator[RaceTrack]:
+        # in file order, which reads the archive sequentially
+        for name, _ in sorted(self.index.items(), key=lambda item: item[1][0]):
+            yield self.load(name)
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.modified:
+            self.write_index()
+        self.file.close()
+
+    def __enter__(self) -> 'TrackArchive':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
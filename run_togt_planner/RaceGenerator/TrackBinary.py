@@ -0,0 +1,112 @@
+import numpy as np
+from typing import Dict, Union
+from run_togt_planner.RaceGenerator.BaseRaceClass import State
+from run_togt_planner.RaceGenerator.GateGeometry import PARAM_KEYS
+from run_togt_planner.RaceGenerator.GateStore import COLUMN_KEYS
+from run_togt_planner.RaceGenerator.GenerationTools import write_file_atomic
+import io
+import os
+
+TRACK_FORMAT_VERSION = 1
+
+# lengths of the state fields, in the order of State.ORDERED_KEYS
+STATE_LENGTHS = {'pos': 3, 'vel': 3, 'acc': 3, 'jer': 3, 'rot': 4, 'cthrustmass': 1, 'euler': 3}
+STATE_SIZE = sum(STATE_LENGTHS.values())
+
+# one record per state and per gate, reading an array from an npz costs more than its size
+STATE_DTYPE = np.dtype([('values', np.float64, STATE_SIZE), ('int_flags', bool, STATE_SIZE)])
+GATE_DTYPE = np.dtype([('position_data', np.float64, 3),
+                       ('rpy_data', np.float64, 3),
+                       ('type_code_data', np.int8),
+                       ('param_data', np.float64, len(PARAM_KEYS)),
+                       ('stationary_data', bool),
+                       ('int_flag_data', np.uint16),
+                       ('has_name', bool)])
+
+########################################
+############ TRACK ARRAYS ##############
+########################################
+
+def state_to_row(state: State) -> tuple:
+    values = []
+    for key in State.ORDERED_KEYS:
+        value = getattr(state, key)
+        values += value if isinstance(value, list) else [value]
+    # ints are flagged so they are written back to YAML as ints
+    int_flags = [isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values]
+    return values, int_flags
+
+def row_to_state(values: np.ndarray,
+                 int_flags: np.ndarray) -> State:
+    values = [int(v) if is_int else v for v, is_int in zip(values.tolist(), int_flags.tolist())]
+    kwargs = {}
+    start = 0
+    for key in State.ORDERED_KEYS:
+        length = STATE_LENGTHS[key]
+        kwargs[key] = values[start] if key == 'cthrustmass' else values[start:start + length]
+        start += length
+    return State(**kwargs)
+
+def track_to_arrays(race_track) -> Dict[str, np.ndarray]:
+    # typed arrays of the whole track, no pickled objects
+    states = np.zeros(2, dtype=STATE_DTYPE)
+    states[0] = state_to_row(race_track.initState)
+    states[1] = state_to_row(race_track.endState)
+
+    store = race_track.gates
+    gates = np.zeros(len(store), dtype=GATE_DTYPE)
+    for key, column in store.get_columns().items():
+        gates[key] = column
+    gates['has_name'] = [name is not None for name in store.names]
+    # gate keys and 'name' fields as utf-8, one byte per ascii character
+    labels = np.array([[gate_name.encode() for gate_name in store.gate_names],
+                       [(name or '').encode() for name in store.names]], dtype=bytes).reshape(2, len(store))
+    return {
+        'format_version': np.array(TRACK_FORMAT_VERSION),
+        'states': states,
+        # orders are rows of the gate store, a gate may appear several times
+        'orders': np.array([store.rows[gate_name] for gate_name in race_track.orders], dtype=np.int32),
+        'gates': gates,
+        'labels': labels,
+    }
+
+def track_from_arrays(race_track,
+                      arrays: Dict[str, np.ndarray]):
+    # fills race_track like load_from_yaml does
+    version = int(arrays['format_version'])
+    if version > TRACK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported track format version {version}, expected at most {TRACK_FORMAT_VERSION}")
+    states = arrays['states']
+    race_track.initState = row_to_state(states[0]['values'], states[0]['int_flags'])
+    race_track.endState = row_to_state(states[1]['values'], states[1]['int_flags'])
+
+    race_track.clear_gates()
+    gates = arrays['gates']
+    gate_names = [label.decode() for label in arrays['labels'][0].tolist()]
+    names = [label.decode() if has_name else None
+             for label, has_name in zip(arrays['labels'][1].tolist(), gates['has_name'].tolist())]
+    race_track.gates.set_columns(gate_names, names, {key: gates[key] for key in COLUMN_KEYS})
+    race_track.orders = [gate_names[i] for i in arrays['orders'].tolist()]
+
+########################################
+############### NPZ FILES ##############
+########################################
+
+def to_npz_bytes(race_track,
+                 compress: bool = False) -> bytes:
+    buffer = io.BytesIO()
+    if compress:
+        np.savez_compressed(buffer, **track_to_arrays(race_track))
+    else:
+        np.savez(buffer, **track_to_arrays(race_track))
+    return buffer.getvalue()
+
+def save_npz(race_track,
+             save_file: Union[os.PathLike, str],
+             compress: bool = False):
+    write_file_atomic(save_file, to_npz_bytes(race_track, compress=compress))
+
+def load_npz(race_track,
+             load_file: Union[os.PathLike, str]):
+    with np.load(load_file, allow_pickle=False) as data:
+        track_from_arrays(race_track, {key: data[key] for key in data.files})
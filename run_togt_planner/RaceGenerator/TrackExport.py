@@ -0,0 +1,120 @@
+import itertools
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, List, Optional, Set, Union
+from run_togt_planner.RaceGenerator.GenerationTools import write_file_atomic
+from run_togt_planner.RaceGenerator.RaceTrack import RaceTrack
+from run_togt_planner.RaceGenerator.TrackBinary import to_npz_bytes
+
+FILE_FORMATS = {'yaml': '.yaml', 'npz': '.npz'}
+
+class SaveResult:
+    def __init__(self,
+                 name: str,
+                 save_file: str,
+                 success: bool,
+                 error: Optional[str] = None):
+        self.name = name
+        self.save_file = save_file
+        self.success = success
+        self.error = error
+
+    def __repr__(self) -> str:
+        status = 'ok' if self.success else 'failed'
+        return f"SaveResult({self.save_file}, {status})"
+
+def get_free_file_name(file_name: str,
+                       extension: str,
+                       taken: Set[str]) -> str:
+    # same _N suffixes as RaceTrack.get_save_file, checked against a set instead of the file system
+    if file_name + extension not in taken:
+        return file_name + extension
+    counter = 1
+    while f"{file_name}_{counter}{extension}" in taken:
+        counter += 1
+    return f"{file_name}_{counter}{extension}"
+
+def save_track_file(race_track: RaceTrack,
+                    save_file: str,
+                    file_format: str = 'yaml',
+                    standard: bool = True,
+                    fast: bool = True,
+                    compress: bool = False) -> SaveResult:
+    # runs in the workers, every thread serializes with its own ruamel instance
+    name = race_track.race_name or "racetrack"
+    try:
+        if len(race_track.gates) == 0:
+            raise ValueError("No gate has been added! The race track will not be saved.")
+        if file_format == 'yaml':
+            data = race_track.to_yaml_text(standard=standard, fast=fast)
+        else:
+            data = to_npz_bytes(race_track, compress=compress)
+        write_file_atomic(save_file, data)
+        return SaveResult(name, save_file, True)
+    except Exception:
+        return SaveResult(name, save_file, False, error=traceback.format_exc())
+
+def save_many(race_tracks: Iterable[RaceTrack],
+              save_dir: Optional[Union[os.PathLike, str]] = None,
+              overwrite: bool = False,
+              file_format: str = 'yaml',
+              standard: bool = True,
+              fast: bool = True,
+              compress: bool = False,
+              num_workers: Optional[int] = None,
+              use_processes: bool = True,
+              chunk_size: int = 1024,
+              save_output: bool = True) -> List[SaveResult]:
+    # race_tracks may be a generator, only chunk_size tracks are held at once
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file format {file_format!r}, expected one of {', '.join(FILE_FORMATS)}")
+    extension = FILE_FORMATS[file_format]
+    save_path = os.path.join(os.getcwd(), 'resources/racetrack') if save_dir is None else os.fspath(save_dir)
+    os.makedirs(save_path, exist_ok=True)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    # file names are assigned up front, two workers never pick the same free name
+    taken = set() if overwrite else set(os.listdir(save_path))
+    assigned = set()
+    race_tracks = iter(race_tracks)
+    results = []
+    executor = None
+    if num_workers > 1:
+        executor = (ProcessPoolExecutor if use_processes else ThreadPoolExecutor)(max_workers=num_workers)
+    try:
+        while True:
+            chunk = list(itertools.islice(race_tracks, chunk_size))
+            if not chunk:
+                break
+            save_files = []
+            for race_track in chunk:
+                file_name = race_track.race_name if race_track.race_name is not None else "racetrack"
+                if overwrite:
+                    # tracks with the same name in one call still get separate files
+                    file_name = get_free_file_name(file_name, extension, assigned)
+                else:
+                    file_name = get_free_file_name(file_name, extension, taken)
+                    taken.add(file_name)
+                assigned.add(file_name)
+                save_files.append(os.path.join(save_path, file_name))
+
+            args = (chunk, save_files, itertools.repeat(file_format), itertools.repeat(standard),
+                    itertools.repeat(fast), itertools.repeat(compress))
+            if executor is None:
+                results += map(save_track_file, *args)
+            else:
+                chunksize = max(1, len(chunk) // (4 * num_workers)) if use_processes else 1
+                results += executor.map(save_track_file, *args, chunksize=chunksize)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if save_output:
+        num_failed = sum(not result.success for result in results)
+        for result in results:
+            if not result.success:
+                print(f"Error saving {result.save_file}:\n{result.error}")
+        print(f"Saved {len(results) - num_failed} of {len(results)} tracks to: {save_path}")
+    return results
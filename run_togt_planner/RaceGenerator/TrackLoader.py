@@ -0,0 +1,141 @@
+import os
+import re
+import yaml
+from typing import List, Union
+from run_togt_planner.RaceGenerator.BaseRaceClass import State
+from run_togt_planner.RaceGenerator.GateGeometry import GATE_TYPES
+from run_togt_planner.RaceGenerator.GateStore import SHAPE_KEYS
+
+# libyaml parser when pyyaml was built with it, the pure python one otherwise
+BaseLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+STATE_LENGTHS = {'pos': 3, 'vel': 3, 'acc': 3, 'jer': 3, 'rot': 4, 'euler': 3}
+GATE_KEYS = ['type', 'name', 'position', 'stationary']
+
+class TrackLoader(BaseLoader):
+    pass
+
+# pyyaml resolves scalars by YAML 1.1, where 1e-5 is a string and yes is a bool,
+# floats and bools are resolved like ruamel does by YAML 1.2
+TrackLoader.yaml_implicit_resolvers = {
+    first: [(tag, regexp) for tag, regexp in resolvers if tag not in ('tag:yaml.org,2002:float', 'tag:yaml.org,2002:bool')]
+    for first, resolvers in BaseLoader.yaml_implicit_resolvers.items()
+}
+TrackLoader.add_implicit_resolver(
+    'tag:yaml.org,2002:bool',
+    re.compile(r'^(?:true|True|TRUE|false|False|FALSE)$'),
+    list('tTfF'))
+TrackLoader.add_implicit_resolver(
+    'tag:yaml.org,2002:float',
+    re.compile(r'''^(?:[-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+                    |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+                    |\.[0-9_]+(?:[eE][-+]?[0-9]+)?
+                    |[-+]?\.(?:inf|Inf|INF)
+                    |\.(?:nan|NaN|NAN))$''', re.X),
+    list('-+0123456789.'))
+
+class TrackSchemaError(ValueError):
+    pass
+
+########################################
+############### SCHEMA #################
+########################################
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def check_vector(errors: List[str],
+                 path: str,
+                 value,
+                 length: int):
+    if not isinstance(value, list) or len(value) != length or not all(is_number(v) for v in value):
+        errors.append(f"{path}: expected a list of {length} numbers, got {value!r}")
+
+def check_state(errors: List[str],
+                path: str,
+                state):
+    if not isinstance(state, dict):
+        errors.append(f"{path}: expected a mapping, got {state!r}")
+        return
+    if 'pos' not in state:
+        errors.append(f"{path}: missing pos")
+    for key, value in state.items():
+        if key in STATE_LENGTHS:
+            check_vector(errors, f"{path}.{key}", value, STATE_LENGTHS[key])
+        elif key == 'cthrustmass':
+            if not is_number(value):
+                errors.append(f"{path}.cthrustmass: expected a number, got {value!r}")
+        else:
+            errors.append(f"{path}: unknown key {key!r}, expected one of {', '.join(State.ORDERED_KEYS)}")
+
+def check_gate(errors: List[str],
+               path: str,
+               gate):
+    if not isinstance(gate, dict):
+        errors.append(f"{path}: expected a mapping, got {gate!r}")
+        return
+    gate_type = gate.get('type')
+    if gate_type not in GATE_TYPES:
+        errors.append(f"{path}.type: expected one of {', '.join(GATE_TYPES)}, got {gate_type!r}")
+        return
+    if 'position' in gate:
+        check_vector(errors, f"{path}.position", gate['position'], 3)
+    else:
+        errors.append(f"{path}: missing position")
+    if not isinstance(gate.get('stationary'), bool):
+        errors.append(f"{path}.stationary: expected true or false, got {gate.get('stationary')!r}")
+    if gate.get('name') is not None and not isinstance(gate['name'], str):
+        errors.append(f"{path}.name: expected a string, got {gate['name']!r}")
+
+    shape_keys = SHAPE_KEYS[gate_type]
+    missing = [key for key in shape_keys if key not in gate]
+    if missing:
+        errors.append(f"{path}: missing parameters for {gate_type}: {', '.join(missing)}")
+    for key, value in gate.items():
+        if key in GATE_KEYS:
+            continue
+        if key not in shape_keys:
+            errors.append(f"{path}: unknown key {key!r} for {gate_type}")
+        elif key == 'rpy':
+            check_vector(errors, f"{path}.rpy", value, 3)
+        elif not is_number(value):
+            errors.append(f"{path}.{key}: expected a number, got {value!r}")
+
+def validate_track_data(data,
+                        source: str = 'track'):
+    # every problem of the file at once, before any gate is constructed
+    errors = []
+    if not isinstance(data, dict):
+        raise TrackSchemaError(f"Invalid {source}: expected a mapping at the top level, got {type(data).__name__}")
+    for key in ('initState', 'endState'):
+        if key in data:
+            check_state(errors, key, data[key])
+        else:
+            errors.append(f"missing {key}")
+
+    orders = data.get('orders')
+    if not isinstance(orders, list):
+        errors.append(f"orders: expected a list of gate names, got {orders!r}")
+        orders = []
+    for i, gate_name in enumerate(orders):
+        if not isinstance(gate_name, str):
+            errors.append(f"orders[{i}]: expected a gate name, got {gate_name!r}")
+        elif gate_name not in data:
+            errors.append(f"orders[{i}]: gate {gate_name!r} is not defined")
+    for gate_name in dict.fromkeys(g for g in orders if isinstance(g, str) and g in data):
+        check_gate(errors, gate_name, data[gate_name])
+
+    if errors:
+        raise TrackSchemaError(f"Invalid {source}:\n  " + "\n  ".join(errors))
+
+########################################
+############### LOADING ################
+########################################
+
+def load_track_data(load_dir: Union[os.PathLike, str]) -> dict:
+    # plain python data of a validated track file
+    load_dir = os.fspath(load_dir)
+    with open(file=load_dir, mode="r") as f:
+        data = yaml.load(f, Loader=TrackLoader)
+    validate_track_data(data, source=load_dir)
+    return data
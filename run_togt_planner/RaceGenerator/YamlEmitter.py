@@ -0,0 +1,73 @@
+import re
+from typing import List, Optional
+from run_togt_planner.RaceGenerator.BaseRaceClass import State, Gate
+
+# keys the standard layout writes in single quotes, see GenerationTools.KEYS_TO_QUOTE
+QUOTED_KEYS = ['type', 'name']
+# ruamel wraps longer flow sequences, those tracks take the ruamel path
+MAX_LINE_WIDTH = 4000
+
+PLAIN_KEY = re.compile(r'^[A-Za-z_][A-Za-z0-9_\-]*$')
+RESERVED_WORDS = {'true', 'false', 'null', 'yes', 'no', 'on', 'off', 'y', 'n'}
+PRINTABLE_STR = re.compile(r'^[\x20-\x7e]*$')
+
+class UnsupportedValue(Exception):
+    pass
+
+def format_scalar(value,
+                  quoted: bool = False) -> str:
+    # same text as ruamel's representer for plain python scalars
+    value_type = type(value)
+    if value_type is bool:
+        return 'true' if value else 'false'
+    if value_type is int:
+        return str(value)
+    if value_type is float:
+        if value != value:
+            return '.nan'
+        if value in (float('inf'), float('-inf')):
+            return '.inf' if value > 0 else '-.inf'
+        return repr(value).lower()
+    if value_type is str and quoted and PRINTABLE_STR.match(value):
+        return "'" + value.replace("'", "''") + "'"
+    # ruamel scalar types keep their source formatting, numpy scalars and the rest are not covered
+    raise UnsupportedValue(value)
+
+def format_value(value,
+                 quoted: bool = False) -> str:
+    if isinstance(value, list):
+        # flow style, strings in lists are quoted like quote_specific_keys does
+        return '[' + ', '.join(format_scalar(v, quoted=True) for v in value) + ']'
+    return format_scalar(value, quoted)
+
+def format_key(key) -> str:
+    if type(key) is not str or not PLAIN_KEY.match(key) or key.lower() in RESERVED_WORDS:
+        raise UnsupportedValue(key)
+    return key
+
+def format_block(key: str,
+                 items: List[tuple]) -> str:
+    lines = [format_key(key) + ':']
+    lines += [f"  {format_key(k)}: {format_value(v, k in QUOTED_KEYS)}" for k, v in items]
+    return '\n'.join(lines) + '\n\n'
+
+def emit_standard_yaml(race_track) -> Optional[str]:
+    # text of save_to_yaml(standard=True), None if only the ruamel path can reproduce it
+    try:
+        blocks = []
+        for key, state in (('initState', race_track.initState), ('endState', race_track.endState)):
+            state_dict = state.to_dict()
+            blocks.append(format_block(key, [(k, state_dict[k]) for k in State.ORDERED_KEYS]))
+        blocks.append(f"orders: {format_value(list(race_track.orders))}\n\n")
+        for gate_name in dict.fromkeys(race_track.orders):
+            gate = race_track.gates.get(gate_name)
+            gate_dict = gate.to_dict(race_track.get_gate_source(gate_name))
+            ordered_keys = [k for k in Gate.SHAPE_ORDER_KEYS[gate_dict['type']] if k != 'name' or gate.name is not None]
+            blocks.append(format_block(gate_name, [(k, gate_dict[k]) for k in ordered_keys]))
+    except UnsupportedValue:
+        return None
+
+    text = ''.join(blocks)
+    if any(len(line) > MAX_LINE_WIDTH for line in text.splitlines()):
+        return None
+    return text
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import yaml
+from typing import List, Optional, Tuple, Union
+from run_togt_planner.RaceGenerator.GenerationTools import set_new_file_mode
+from run_togt_planner.RaceGenerator.TrackLoader import TrackSchemaError, load_track_data
+
+PLANNER_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'run_togt_planner', 'planner')
+PLANNER_CACHE_VERSION = 1
+PLANNER_CACHE_SIZE = 1024 * 1024 * 1024     # bytes
+
+# files of an entry, the last one is written and touched on every hit, its mtime orders the LRU
+TRAJ_FILE = 'traj.csv'
+WPT_FILE = 'wpt.yaml'
+STDOUT_FILE = 'stdout.txt'
+META_FILE = 'meta.json'
+
+def hash_track(track_file: Union[os.PathLike, str]) -> str:
+    # formatting, comments and key order do not change the hash
+    try:
+        # default=str covers values json has no type for, e.g. dates in extra keys
+        data = json.dumps(load_track_data(track_file), sort_keys=True, default=str)
+    except (TrackSchemaError, yaml.YAMLError, ValueError, TypeError):
+        # files the schema rejects or that are not utf-8 are hashed as they are, the planner decides what to do with them
+        with open(track_file, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    return hashlib.sha256(data.encode()).hexdigest()
+
+def hash_files(paths: List[str]) -> str:
+    # contents of the files, and of all files below the directories, with their relative paths
+    digest = hashlib.sha256()
+    for path in paths:
+        path = os.fspath(path)
+        if os.path.isdir(path):
+            files = sorted(os.path.relpath(os.path.join(root, file_name), path)
+                           for root, _, file_names in os.walk(path) for file_name in file_names)
+        elif os.path.isfile(path):
+            path, files = os.path.dirname(path), [os.path.basename(path)]
+        else:
+            continue
+        for file_name in files:
+            digest.update(file_name.encode() + b'\0')
+            with open(os.path.join(path, file_name), 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+def stat_files(paths: List[str]) -> str:
+    # executables are large, a rebuild shows in size and modification time
+    stats = [(os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths if os.path.isfile(path)]
+    return hashlib.sha256(json.dumps(stats).encode()).hexdigest()
+
+def copy_file_atomic(src: str,
+                     dst: str):
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dst)),
+                                    prefix='.' + os.path.basename(dst) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_file)
+        set_new_file_mode(tmp_file, dst)
+        os.replace(tmp_file, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
+
+class PlannerCache:
+    def __init__(self,
+                 cache_dir: Optional[Union[os.PathLike, str]] = None,
+                 max_size: int = PLANNER_CACHE_SIZE):
+        self.cache_dir = os.fspath(cache_dir) if cache_dir is not None else PLANNER_CACHE_DIR
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def get_key(self,
+                planner: List[str],
+                config_path: Union[os.PathLike, str],
+                quad_name: str,
+                track_file: Union[os.PathLike, str]) -> str:
+        # a rebuilt planner or a changed config file gives a new key
+        key = {
+            'version': PLANNER_CACHE_VERSION,
+            'track': hash_track(track_file),
+            'config': hash_files([config_path]),
+            'quad_name': quad_name,
+            'planner': stat_files(planner),
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def get_entry_path(self,
+                       key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def load(self,
+             key: str,
+             traj_file: Union[os.PathLike, str],
+             wpt_file: Union[os.PathLike, str]) -> Optional[str]:
+        # copies the cached outputs to traj_file and wpt_file, returns the planner stdout or None on a miss
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(os.path.join(entry_path, STDOUT_FILE), 'r') as f:
+                stdout = f.read()
+            copy_file_atomic(os.path.join(entry_path, TRAJ_FILE), os.fspath(traj_file))
+            copy_file_atomic(os.path.join(entry_path, WPT_FILE), os.fspath(wpt_file))
+            os.utime(os.path.join(entry_path, META_FILE))
+        except OSError:
+            # missing, or evicted by another process in the meantime
+            return None
+        return stdout
+
+    def save(self,
+             key: str,
+             traj_file: Union[os.PathLike, str],
+             wpt_file: Union[os.PathLike, str],
+             stdout: str,
+             meta: Optional[dict] = None):
+        # write into a temporary directory first so readers never see a partial entry
+        entry_path = self.get_entry_path(key)
+        parent = os.path.dirname(entry_path)
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(dir=parent)
+        try:
+            shutil.copyfile(traj_file, os.path.join(tmp_path, TRAJ_FILE))
+            shutil.copyfile(wpt_file, os.path.join(tmp_path, WPT_FILE))
+            with open(os.path.join(tmp_path, STDOUT_FILE), 'w') as f:
+                f.write(stdout)
+            with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+                json.dump(meta or {}, f)
+            os.rename(tmp_path, entry_path)
+        except OSError:
+            # another worker may have stored the same entry in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(entry_path):
+                raise
+        self.evict()
+
+    def get_entries(self) -> List[Tuple[float, int, str]]:
+        # (last use, size, path) of every entry
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for prefix in os.listdir(self.cache_dir):
+            prefix_path = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for key in os.listdir(prefix_path):
+                entry_path = os.path.join(prefix_path, key)
+                try:
+                    last_use = os.stat(os.path.join(entry_path, META_FILE)).st_mtime
+                    size = sum(os.path.getsize(os.path.join(entry_path, file_name)) for file_name in os.listdir(entry_path))
+                except OSError:
+                    # a temporary directory or an entry that is being removed
+                    continue
+                entries.append((last_use, size, entry_path))
+        return entries
+
+    def evict(self):
+        # removes the least recently used entries until the cache fits into max_size
+        with self.lock:
+            entries = sorted(self.get_entries())
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, entry_path in entries:
+                if total_size <= self.max_size:
+                    break
+                shutil.rmtree(entry_path, ignore_errors=True)
+                total_size -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
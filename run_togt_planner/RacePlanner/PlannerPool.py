@@ -0,0 +1,236 @@
+import os
+import subprocess
+import threading
+import time
+import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Union
+from run_togt_planner.RacePlanner.PlannerCache import PlannerCache
+
+# returncode of jobs that were never started or were killed by cancel()
+CANCELLED = -1
+
+class PlannerJob:
+    def __init__(self,
+                 name: str,
+                 config_path: str,
+                 quad_name: str,
+                 track_file: str,
+                 traj_file: str,
+                 wpt_file: str,
+                 timeout: Optional[float] = None,
+                 retries: Optional[int] = None):
+        # timeout and retries override the defaults of the pool
+        self.name = name
+        self.config_path = config_path
+        self.quad_name = quad_name
+        self.track_file = track_file
+        self.traj_file = traj_file
+        self.wpt_file = wpt_file
+        self.timeout = timeout
+        self.retries = retries
+
+    def get_command(self,
+                    planner: List[str]) -> List[str]:
+        # <config_path> <quad_name> <track_path> <traj_path> <wpt_path>, as in traj_planner_togt.cpp
+        return planner + [os.fspath(self.config_path), self.quad_name, os.fspath(self.track_file),
+                          os.fspath(self.traj_file), os.fspath(self.wpt_file)]
+
+class PlannerResult:
+    def __init__(self,
+                 name: str,
+                 success: bool,
+                 returncode: Optional[int],
+                 stdout: str = '',
+                 stderr: str = '',
+                 attempts: int = 0,
+                 elapsed: float = 0.0,
+                 timed_out: bool = False,
+                 cancelled: bool = False,
+                 error: Optional[str] = None,
+                 traj_file: Optional[str] = None,
+                 wpt_file: Optional[str] = None,
+                 cached: bool = False):
+        self.name = name
+        self.success = success
+        self.returncode = returncode
+        self.stdout = stdout        # the TrajExtremum printed by the planner on success
+        self.stderr = stderr
+        self.attempts = attempts
+        self.elapsed = elapsed      # seconds over all attempts
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+        self.error = error          # why the job failed, None on success
+        self.traj_file = traj_file
+        self.wpt_file = wpt_file
+        self.cached = cached        # the outputs were restored from the cache, attempts is 0
+
+    def __repr__(self) -> str:
+        if self.success:
+            status = 'cached' if self.cached else 'ok'
+        elif self.cancelled:
+            status = 'cancelled'
+        elif self.timed_out:
+            status = 'timed out'
+        else:
+            status = 'failed'
+        return f"PlannerResult({self.name}, {status}, {self.attempts} attempts, {self.elapsed:.2f}s)"
+
+class PlannerPool:
+    def __init__(self,
+                 planner: Union[str, List[str]],
+                 num_workers: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 retries: int = 0,
+                 retry_delay: float = 0.0,
+                 cache: Optional[PlannerCache] = None):
+        # planner is the path of build/planners, or a command prefix like [python, stand_in.py]
+        self.planner = [os.fspath(planner)] if isinstance(planner, (str, os.PathLike)) else list(planner)
+        self.num_workers = num_workers if num_workers is not None else (os.cpu_count() or 1)
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cache = cache
+        # every job runs one planner process, the threads only wait for them
+        self.executor = ThreadPoolExecutor(max_workers=self.num_workers)
+        self.cancel_event = threading.Event()
+        self.processes = set()
+        self.lock = threading.Lock()
+
+    def submit(self,
+               job: PlannerJob) -> Future:
+        # the future always holds a PlannerResult, failures are not raised
+        # the job belongs to the current cancel event, a later cancel() does not affect jobs submitted after it
+        return self.executor.submit(self.run_job, job, self.cancel_event)
+
+    def run(self,
+            jobs: List[PlannerJob],
+            print_output: bool = False) -> List[PlannerResult]:
+        # results in the order of jobs
+        results = [future.result() for future in [self.submit(job) for job in jobs]]
+        if print_output:
+            for result in results:
+                print_result(result)
+        return results
+
+    def cancel(self):
+        # jobs that have not started return cancelled results, running planners are killed
+        # the pool gets a new event, so it can run further jobs afterwards
+        with self.lock:
+            cancel_event, self.cancel_event = self.cancel_event, threading.Event()
+            cancel_event.set()
+            for process in self.processes:
+                process.kill()
+
+    def close(self,
+              cancel: bool = False):
+        if cancel:
+            self.cancel()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'PlannerPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # an exception or KeyboardInterrupt in the with block stops the remaining jobs
+        self.close(cancel=exc_type is not None)
+
+    def run_job(self,
+                job: PlannerJob,
+                cancel_event: Optional[threading.Event] = None) -> PlannerResult:
+        cancel_event = cancel_event if cancel_event is not None else self.cancel_event
+        timeout = job.timeout if job.timeout is not None else self.timeout
+        retries = job.retries if job.retries is not None else self.retries
+        command = job.get_command(self.planner)
+        for file in (job.traj_file, job.wpt_file):
+            os.makedirs(os.path.dirname(os.path.abspath(file)), exist_ok=True)
+
+        start = time.perf_counter()
+        cache_key = None
+        if self.cache is not None and not cancel_event.is_set():
+            try:
+                cache_key = self.cache.get_key(self.planner, job.config_path, job.quad_name, job.track_file)
+                stdout = self.cache.load(cache_key, job.traj_file, job.wpt_file)
+            except Exception as e:
+                # e.g. a missing or unreadable track file, the planner runs as without a cache and reports it
+                warnings.warn(f"Planner cache lookup failed for {job.name}: {e}")
+                cache_key = stdout = None
+            if stdout is not None:
+                return PlannerResult(job.name, True, 0, stdout, attempts=0, elapsed=time.perf_counter() - start,
+                                     traj_file=job.traj_file, wpt_file=job.wpt_file, cached=True)
+
+        attempts = 0
+        while True:
+            if cancel_event.is_set():
+                return PlannerResult(job.name, False, CANCELLED, attempts=attempts, elapsed=time.perf_counter() - start,
+                                     cancelled=True, error="cancelled", traj_file=job.traj_file, wpt_file=job.wpt_file)
+            attempts += 1
+            try:
+                returncode, stdout, stderr, timed_out = self.run_process(command, timeout, cancel_event)
+            except OSError as e:
+                # a missing or broken executable fails every attempt the same way
+                return PlannerResult(job.name, False, None, attempts=attempts, elapsed=time.perf_counter() - start,
+                                     error=f"Failed to start {command[0]}: {e}", traj_file=job.traj_file, wpt_file=job.wpt_file)
+
+            cancelled = cancel_event.is_set()
+            if returncode == 0 and not timed_out:
+                error = None
+            elif cancelled:
+                error = "cancelled"
+            elif timed_out:
+                error = f"timed out after {timeout}s"
+            else:
+                error = f"exited with code {returncode}: {stderr.strip()}"
+            if error is None and cache_key is not None:
+                try:
+                    self.cache.save(cache_key, job.traj_file, job.wpt_file, stdout, meta={'track_file': os.path.abspath(job.track_file)})
+                except Exception as e:
+                    warnings.warn(f"Failed to cache planner outputs of {job.name}: {e}")
+            if error is None or cancelled or attempts > retries:
+                return PlannerResult(job.name, error is None, CANCELLED if cancelled else returncode, stdout, stderr,
+                                     attempts=attempts, elapsed=time.perf_counter() - start, timed_out=timed_out,
+                                     cancelled=cancelled, error=error, traj_file=job.traj_file, wpt_file=job.wpt_file)
+            cancel_event.wait(self.retry_delay)
+
+    def run_process(self,
+                    command: List[str],
+                    timeout: Optional[float],
+                    cancel_event: threading.Event) -> tuple:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        with self.lock:
+            self.processes.add(process)
+        # cancel() may have run between the check in run_job and the registration
+        if cancel_event.is_set():
+            process.kill()
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            timed_out = True
+        finally:
+            with self.lock:
+                self.processes.discard(process)
+        return process.returncode, stdout, stderr, timed_out
+
+def print_result(result: PlannerResult):
+    # the output of the former run_traj_planner helpers
+    if result.success:
+        print(f"{result.stdout}")
+    else:
+        print(f"Error running traj_planner_togt ({result.name}): {result.error}")
+
+def run_planner(planner: Union[str, List[str]],
+                config_path: str,
+                quad_name: str,
+                track_file: str,
+                traj_file: str,
+                wpt_file: str,
+                timeout: Optional[float] = None,
+                print_output: bool = True,
+                cache: Optional[PlannerCache] = None) -> PlannerResult:
+    # a single blocking job, as used by the examples
+    job = PlannerJob(os.path.splitext(os.path.basename(track_file))[0], config_path, quad_name, track_file, traj_file, wpt_file)
+    with PlannerPool(planner, num_workers=1, timeout=timeout, cache=cache) as pool:
+        return pool.run([job], print_output=print_output)[0]
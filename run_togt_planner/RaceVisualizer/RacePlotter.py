@@ -4,10 +4,14 @@ import matplotlib.pyplot as plt
 from matplotlib.colors import Colormap, ListedColormap
 import matplotlib.ticker as ticker
 from matplotlib.transforms import Bbox
-from run_togt_planner.RaceVisualizer.track import plot_track, plot_track_3d
-from typing import Union, Optional, Tuple
-import yaml
-
+from matplotlib.backend_bases import FigureCanvasBase
+from run_togt_planner.RaceGenerator.GateGeometry import get_gate_distances
+from run_togt_planner.RaceVisualizer.track import plot_track, plot_track_3d, get_polygon_normals, shade_colors
+from run_togt_planner.RaceVisualizer.tube import estimate_tangents, get_tube_mesh, get_tube_lod, get_cell_edges, get_surface_polygons
+from run_togt_planner.RaceVisualizer.animation import export_playback
+from run_togt_planner.RaceVisualizer.loader import TRAJ_COLUMNS, PLOT_COLUMNS, load_trajectory, load_yaml
+from run_togt_planner.RaceVisualizer.resample import get_uniform_samples, get_adaptive_samples
+from typing import List, Union, Optional, Tuple
 import os
 import warnings
 
@@ -18,37 +22,67 @@ matplotlib.rc('font', **{'size': 26})
 matplotlib.rcParams['pdf.fonttype'] = 42
 matplotlib.rcParams['ps.fonttype'] = 42
 
+# vector formats, the trajectory scatter and the tubes are rasterized when saved to these
+VECTOR_FORMATS = ['.pdf', '.svg', '.svgz', '.eps', '.ps']
+
+def get_fig_file(fig_name: str) -> str:
+    # keep a known extension, png otherwise
+    ext = os.path.splitext(fig_name)[1].lower()
+    if ext[1:] in FigureCanvasBase.get_supported_filetypes():
+        return fig_name
+    return fig_name + '.png'
+
 class RacePlotter:
     def __init__(self,
                  traj_file: Union[os.PathLike, str],
                  track_file: Union[os.PathLike, str],
-                 wpt_path: Optional[Union[os.PathLike, str]] = None):
-        self.traj_file = os.fspath(traj_file)
+                 wpt_path: Optional[Union[os.PathLike, str]] = None,
+                 resample: str = 'uniform',
+                 num_samples: int = 5000,
+                 tolerance: float = 0.01,
+                 max_step: Optional[float] = None,
+                 use_cache: bool = True,
+                 cache_dir: Optional[Union[os.PathLike, str]] = None,
+                 columns: Optional[List[str]] = PLOT_COLUMNS,
+                 dtype: type = np.float64):
         self.track_file = os.fspath(track_file)
-        if wpt_path is not None:
-            self.wpt_path = os.fspath(wpt_path)
-
-        data_ocp = np.genfromtxt(traj_file, dtype=float, delimiter=',', names=True)
-        self.t = data_ocp['t']
-        self.p_x = data_ocp['p_x']
-        self.p_y = data_ocp['p_y']
-        self.p_z = data_ocp['p_z']
-        self.q_w = data_ocp['q_w']
-        self.q_x = data_ocp['q_x']
-        self.q_y = data_ocp['q_y']
-        self.q_z = data_ocp['q_z']
-        self.v_x = data_ocp['v_x']
-        self.v_y = data_ocp['v_y']
-        self.v_z = data_ocp['v_z']
-        self.w_x = data_ocp['w_x']
-        self.w_y = data_ocp['w_y']
-        self.w_z = data_ocp['w_z']
-        self.u_1 = data_ocp['u_1']
-        self.u_2 = data_ocp['u_2']
-        self.u_3 = data_ocp['u_3']
-        self.u_4 = data_ocp['u_4']
-
-        ts = np.linspace(self.t[0], self.t[-1], 5000)
+        self.resample = resample
+        self.num_samples = num_samples
+        self.tolerance = tolerance
+        self.max_step = max_step
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.columns = columns
+        self.dtype = dtype
+
+        # artists of the last plot()/plot3d() call, updated in place by update_plot()/update_plot3d()
+        self.scatter_2d = None
+        self.scatter_3d = None
+        self.tubes_2d = []
+        self.tubes_3d = []
+
+        self.set_trajectory(traj_file, wpt_path)
+
+    def set_trajectory(self,
+                       traj_file: Union[os.PathLike, str],
+                       wpt_path: Optional[Union[os.PathLike, str]] = None):
+        self.traj_file = os.fspath(traj_file)
+        self.wpt_path = os.fspath(wpt_path) if wpt_path is not None else None
+
+        # parsed once, then loaded from the binary column cache
+        # only the columns in self.columns are loaded (all of them for None), the others are set to None
+        data_ocp = load_trajectory(self.traj_file, columns=self.columns, dtype=self.dtype, use_cache=self.use_cache, cache_dir=self.cache_dir)
+        for name in TRAJ_COLUMNS:
+            setattr(self, name, data_ocp.get(name))
+
+        # uniform samples in time, or adaptive samples by arc length and curvature
+        if self.resample == 'uniform':
+            ts = get_uniform_samples(self.t, self.num_samples)
+        elif self.resample == 'adaptive':
+            raw_ps = np.array([self.p_x, self.p_y, self.p_z]).T
+            ts = get_adaptive_samples(self.t, raw_ps, tolerance=self.tolerance, max_step=self.max_step, max_samples=self.num_samples)
+        else:
+            raise ValueError("Unrecognized resample mode: " + self.resample)
         ps = np.array([
             np.interp(ts, self.t, self.p_x),
             np.interp(ts, self.t, self.p_y),
@@ -70,14 +104,7 @@ class RacePlotter:
 
     def estimate_tangents(self, 
                           ps : np.ndarray) -> np.ndarray:
-        # compute tangents
-        dp_x = np.gradient(ps[:, 0])
-        dp_y = np.gradient(ps[:, 1])
-        dp_z = np.gradient(ps[:, 2])
-        tangents = np.vstack((dp_x, dp_y, dp_z)).T
-        # normalize tangents
-        tangents /= np.linalg.norm(tangents, axis=1).reshape(-1, 1)
-        return tangents
+        return estimate_tangents(ps)
     
     def sigmoid(self, 
                 x : np.ndarray, 
@@ -92,40 +119,11 @@ class RacePlotter:
 
     def get_line_tube(self, 
                       ps : np.ndarray, 
-                      tube_radius : float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        # create tube parameters
-        num_points = len(ps)
-        theta = np.linspace(0, 2 * np.pi, 20)
-        circle_x = tube_radius * np.cos(theta)
-        circle_y = tube_radius * np.sin(theta)
-        tangent = self.estimate_tangents(ps)
-
-        # initialize tube coordinates array
-        tube_x = np.zeros((num_points, len(theta)))
-        tube_y = np.zeros((num_points, len(theta)))
-        tube_z = np.zeros((num_points, len(theta)))
-
-        # compute tangents and normals for building tube cross-section
-        for i in range(num_points):
-            # choose an arbitrary vector not parallel to the tangent
-            arbitrary_vector = np.array([1, 0, 0]) if not np.allclose(tangent[i], [1, 0, 0]) else np.array([0, 1, 0])
-
-            normal = np.cross(tangent[i], arbitrary_vector)
-            normal /= np.linalg.norm(normal)
-            binormal = np.cross(tangent[i], normal)
-
-            # construct orthogonal basis matrix
-            TNB = np.column_stack((normal, binormal, tangent[i]))
-
-            # for each cross-section, compute points on the circle
-            for j in range(len(theta)):
-                local_point = np.array([circle_x[j], circle_y[j], 0])
-                global_point = ps[i] + TNB @ local_point
-                tube_x[i, j] = global_point[0]
-                tube_y[i, j] = global_point[1]
-                tube_z[i, j] = global_point[2]
-        
-        return tube_x, tube_y, tube_z
+                      tube_radius : float,
+                      num_theta : int = 20,
+                      frame : str = 'fixed') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # build all cross-sections of the tube at once
+        return get_tube_mesh(ps, tube_radius, num_theta=num_theta, frame=frame)
     
     def get_sig_tube(self, 
                      ts : np.ndarray,
@@ -134,59 +132,79 @@ class RacePlotter:
                      inner_radius : float,
                      outer_radius : float,
                      rate : float,
-                     scale: float = 1.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+                     scale: float = 1.0,
+                     num_theta: int = 20,
+                     frame: str = 'fixed') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         if self.wpt_path is None:
-            raise ValueError("wpt_path is not provided.")
-        with open(self.wpt_path, 'r') as file:
-            wpt_data = yaml.safe_load(file)
-        with open(self.track_file, 'r') as file:
-            track_data = yaml.safe_load(file)
-        
-        wps = np.array([wpt_data['waypoints']]).reshape(-1, 3)
-        wps_t = np.array([wpt_data['timestamps']]).flatten()
+            # exact distance to the closest gate opening, from the track alone
+            min_distances = get_gate_distances(load_yaml(self.track_file), ps)
+        else:
+            wpt_data = load_yaml(self.wpt_path)
 
-        # search for the next waypoints
-        indices = np.searchsorted(wps_t[:-1], ts, side='right').astype(int)
-        dist1 = np.linalg.norm(ps - wps[indices - 1], axis=1)
-        dist2 = np.linalg.norm(ps - wps[indices], axis=1)
-        min_distances = np.minimum(dist1, dist2)
+            wps = np.array([wpt_data['waypoints']]).reshape(-1, 3)
+            wps_t = np.array([wpt_data['timestamps']]).flatten()
+
+            # search for the next waypoints
+            indices = np.searchsorted(wps_t[:-1], ts, side='right').astype(int)
+            dist1 = np.linalg.norm(ps - wps[indices - 1], axis=1)
+            dist2 = np.linalg.norm(ps - wps[indices], axis=1)
+            min_distances = np.minimum(dist1, dist2)
 
         tube_size = self.sigmoid(min_distances, bias, inner_radius, outer_radius, rate)  # 根据距离计算 tube 半径
         tube_size = tube_size * scale  # 缩放 tube 半径
         
-        theta = np.linspace(0, 2 * np.pi, 20)
-        tangent = self.estimate_tangents(ps)
-
-        # initialize tube coordinates array
-        num_points = len(ps)
-        tube_x = np.zeros((num_points, len(theta)))
-        tube_y = np.zeros((num_points, len(theta)))
-        tube_z = np.zeros((num_points, len(theta)))
-
-        # compute tangents and normals for building tube cross-section
-        for i in range(num_points):
-            # compute circle points
-            circle_x = tube_size[i] * np.cos(theta)
-            circle_y = tube_size[i] * np.sin(theta)
-            # choose an arbitrary vector not parallel to the tangent
-            arbitrary_vector = np.array([1, 0, 0]) if not np.allclose(tangent[i], [1, 0, 0]) else np.array([0, 1, 0])
-
-            normal = np.cross(tangent[i], arbitrary_vector)
-            normal /= np.linalg.norm(normal)
-            binormal = np.cross(tangent[i], normal)
-
-            # construct orthogonal basis matrix
-            TNB = np.column_stack((normal, binormal, tangent[i]))
-
-            # for each cross-section, compute points on the circle
-            for j in range(len(theta)):
-                local_point = np.array([circle_x[j], circle_y[j], 0])
-                global_point = ps[i] + TNB @ local_point
-                tube_x[i, j] = global_point[0]
-                tube_y[i, j] = global_point[1]
-                tube_z[i, j] = global_point[2]
-        
-        return tube_x, tube_y, tube_z
+        # build all cross-sections of the tube at once
+        return get_tube_mesh(ps, tube_size, num_theta=num_theta, frame=frame)
+
+    def get_tube_samples(self,
+                         num_samples: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if num_samples is None or num_samples >= len(self.ts):
+            return self.ts, self.ps
+        # resample the trajectory with fewer points for the tube
+        ts = np.linspace(self.ts[0], self.ts[-1], num_samples)
+        ps = np.array([np.interp(ts, self.ts, self.ps[:, i]) for i in range(3)]).T
+        return ts, ps
+
+    def get_tube3d_samples(self,
+                           num_samples: Optional[int] = None,
+                           lod: bool = False,
+                           lod_dpi: Optional[float] = None,
+                           max_polygons: int = 20000,
+                           sig_tube: bool = False,
+                           tube_radius: float = 1.0,
+                           inner_radius: float = 0.5,
+                           outer_radius: float = 2.0,
+                           scale: float = 1.0,
+                           num_theta: int = 20,
+                           **kwargs) -> Tuple[np.ndarray, np.ndarray, int]:
+        # samples and ring resolution of plot3d_tube(), the level of detail follows the figure size, dpi and track extent
+        ts, ps = self.get_tube_samples(num_samples)
+        if lod:
+            fig = self.ax_3d.figure
+            dpi = fig.dpi if lod_dpi is None else lod_dpi
+            pixels_per_meter = min(fig.get_size_inches()) * dpi / max(np.ptp(ps, axis=0).max(), 1e-9)
+            radius = tube_radius if not sig_tube else (inner_radius + outer_radius) * scale
+            indices, num_theta = get_tube_lod(ps, radius, pixels_per_meter, max_polygons=max_polygons)
+            ts, ps = ts[indices], ps[indices]
+        return ts, ps, num_theta
+
+    def get_tube(self,
+                 ts: np.ndarray,
+                 ps: np.ndarray,
+                 scale: float = 1.0,
+                 sig_tube: bool = False,
+                 tube_radius: float = 1.0,
+                 bias: float = 1.0,
+                 inner_radius: float = 0.5,
+                 outer_radius: float = 2.0,
+                 rate: float = 6,
+                 num_theta: int = 20,
+                 frame: str = 'fixed',
+                 **kwargs) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # tube coordinates for the arguments of plot_tube()/plot3d_tube(), the other arguments only style the artist
+        if not sig_tube:
+            return self.get_line_tube(ps, tube_radius, num_theta=num_theta, frame=frame)
+        return self.get_sig_tube(ts, ps, bias=bias, inner_radius=inner_radius, outer_radius=outer_radius, rate=rate, scale=scale, num_theta=num_theta, frame=frame)
 
     def plot(self,
              cmap: Colormap = plt.cm.winter.reversed(),
@@ -206,6 +224,7 @@ class RacePlotter:
         fig = plt.figure(figsize=(8, 6))
         ax = plt.gca()
         self.ax_2d = ax
+        self.tubes_2d = []
 
         ps = self.ps
         vt = self.vt
@@ -216,8 +235,8 @@ class RacePlotter:
             else:
                 self.plot_tube(sig_tube=sig_tube, tube_color=tube_color, alpha=alpha, bias=1.5*radius, inner_radius=radius/2, outer_radius=1.5*radius, rate=tube_rate)
 
-        plt.scatter(ps[:, 0], ps[:, 1], s=5,
-                    c=vt, cmap=cmap)
+        self.scatter_2d = plt.scatter(ps[:, 0], ps[:, 1], s=5,
+                                      c=vt, cmap=cmap)
         plt.colorbar(pad=0.01).ax.set_ylabel('Speed [m/s]')
 
         plot_track(plt.gca(), self.track_file, set_radius=radius, set_width=width, set_height=height, set_margin=margin)
@@ -230,8 +249,8 @@ class RacePlotter:
         if save_fig:
             save_path = os.fspath(save_path) if save_path is not None else os.path.join(ROOTPATH, "Run-TOGT-Planner/resources/figure/")
             os.makedirs(save_path, exist_ok=True)
-            fig_name = (fig_name + '.png') if fig_name is not None else 'togt_traj.png'
-            plt.savefig(os.path.join(save_path, fig_name), dpi=dpi, bbox_inches='tight')
+            fig_name = get_fig_file(fig_name) if fig_name is not None else 'togt_traj.png'
+            self.save_fig(fig, os.path.join(save_path, fig_name), dpi=dpi, bbox_inches='tight')
 
     def plot_tube(self,
                   scale: float = 1.0,
@@ -243,11 +262,14 @@ class RacePlotter:
                   bias: float = 1.0,
                   inner_radius: float = 0.5,
                   outer_radius: float = 2.0,
-                  rate: float = 6):
+                  rate: float = 6,
+                  num_samples: Optional[int] = None,
+                  num_theta: int = 20,
+                  frame: str = 'fixed'):
+        tube_kwargs = {k: v for k, v in locals().items() if k != 'self'}
 
         ax = self.ax_2d
-        ts = self.ts
-        ps = self.ps
+        ts, ps = self.get_tube_samples(num_samples)
 
         # set tube color
         if tube_color is None:
@@ -256,16 +278,14 @@ class RacePlotter:
             tube_edge_color = tube_color
 
         # compute tube coordinates
-        if not sig_tube:
-            tube_x, tube_y, tube_z = self.get_line_tube(ps, tube_radius)
-        else:
-            tube_x, tube_y, tube_z = self.get_sig_tube(ts, ps, bias=bias, inner_radius=inner_radius, outer_radius=outer_radius, rate=rate, scale=scale)
+        tube_x, tube_y, tube_z = self.get_tube(ts, ps, **tube_kwargs)
 
         # plot tube
         single_color_map = ListedColormap([tube_color])
         with warnings.catch_warnings():
             warnings.simplefilter("ignore", UserWarning)
-            ax.pcolormesh(tube_x, tube_y, tube_z, cmap=single_color_map, shading='auto', color=tube_color, edgecolor='none', alpha=alpha, antialiased=True)
+            tube = ax.pcolormesh(tube_x, tube_y, tube_z, cmap=single_color_map, shading='auto', color=tube_color, edgecolor='none', alpha=alpha, antialiased=True)
+        self.tubes_2d.append((tube, tube_kwargs))
 
     def plot3d(self,
                cmap: Colormap = plt.cm.winter.reversed(),
@@ -309,6 +329,7 @@ class RacePlotter:
         self.set_nice_ticks(ax, z_range, z_ticks_count, 'z')
 
         self.ax_3d = ax
+        self.tubes_3d = []
 
         ps = self.ps
         vt = self.vt
@@ -322,6 +343,7 @@ class RacePlotter:
 
         # plot trajectory
         sc = ax.scatter(ps[:, 0], ps[:, 1], ps[:, 2], s=5, c=vt, cmap=cmap)
+        self.scatter_3d = sc
         shrink_factor = min(0.8, max(0.6, 0.6 * y_range / x_range))
         colorbar_aspect = 20 * shrink_factor
         cbar = plt.colorbar(sc, shrink=shrink_factor, aspect=colorbar_aspect, pad=0.1)
@@ -338,8 +360,8 @@ class RacePlotter:
         if save_fig:
             save_path = os.fspath(save_path) if save_path is not None else os.path.join(ROOTPATH, "Run-TOGT-Planner/resources/figure/")
             os.makedirs(save_path, exist_ok=True)
-            fig_name = (fig_name + '.png') if fig_name is not None else 'togt_traj.png'
-            plt.savefig(os.path.join(save_path, fig_name), dpi=dpi, bbox_inches='tight')
+            fig_name = get_fig_file(fig_name) if fig_name is not None else 'togt_traj.png'
+            self.save_fig(fig, os.path.join(save_path, fig_name), dpi=dpi, bbox_inches='tight')
 
     def plot3d_tube(self,
                     scale: float = 1.0,
@@ -352,11 +374,17 @@ class RacePlotter:
                     inner_radius: float = 0.5,
                     outer_radius: float = 2.0,
                     rate: float = 6,
-                    shade: bool = True):
+                    shade: bool = True,
+                    num_samples: Optional[int] = None,
+                    num_theta: int = 20,
+                    frame: str = 'fixed',
+                    lod: bool = False,
+                    lod_dpi: Optional[float] = None,
+                    max_polygons: int = 20000):
+        tube_kwargs = {k: v for k, v in locals().items() if k != 'self'}
 
         ax = self.ax_3d
-        ts = self.ts
-        ps = self.ps
+        ts, ps, num_theta = self.get_tube3d_samples(**tube_kwargs)
 
         # set tube color
         if tube_color is None:
@@ -365,13 +393,89 @@ class RacePlotter:
             tube_edge_color = tube_color
 
         # compute tube coordinates
-        if not sig_tube:
-            tube_x, tube_y, tube_z = self.get_line_tube(ps, tube_radius)
+        tube_x, tube_y, tube_z = self.get_tube(ts, ps, **{**tube_kwargs, 'num_theta': num_theta})
+
+        # plot tube, the LOD rings are drawn as they are instead of being strided down to the default 50 x 50 patches
+        rcount, ccount = tube_x.shape if lod else (50, 50)
+        tube = ax.plot_surface(tube_x, tube_y, tube_z, rcount=rcount, ccount=ccount, color=tube_color, alpha=alpha,
+                               edgecolor=tube_edge_color, shade=shade, antialiased=True)
+        self.tubes_3d.append((tube, tube_kwargs))
+
+    def update_plot(self):
+        # reuse the figure, axes and gates of the last plot() call for the current trajectory
+        if self.scatter_2d is None:
+            raise RuntimeError("plot() must be called before update_plot().")
+        self.scatter_2d.set_offsets(self.ps[:, :2])
+        self.scatter_2d.set_array(self.vt)
+        self.scatter_2d.set_clim(np.amin(self.vt), np.amax(self.vt))
+
+        # the axes limits of the first figure are kept, the tube meshes are moved in place with the same arguments
+        for tube, tube_kwargs in self.tubes_2d:
+            coordinates = tube.get_coordinates()
+            # the mesh keeps its number of rings, resampled along the new samples
+            num_rings = coordinates.shape[0] - 1
+            if num_rings == len(self.ts):
+                ts, ps = self.ts, self.ps
+            else:
+                ts = np.interp(np.linspace(0, len(self.ts) - 1, num_rings), np.arange(len(self.ts)), self.ts)
+                ps = np.array([np.interp(ts, self.ts, self.ps[:, i]) for i in range(3)]).T
+            tube_x, tube_y, tube_z = self.get_tube(ts, ps, **tube_kwargs)
+            coordinates[..., 0] = get_cell_edges(tube_x)
+            coordinates[..., 1] = get_cell_edges(tube_y)
+            # a QuadMesh draws straight from its coordinates, set_paths() would build one path per cell
+            tube.stale = True
+            tube.set_array(np.ma.masked_invalid(tube_z))
+
+    def update_plot3d(self):
+        # reuse the figure, axes and gates of the last plot3d() call for the current trajectory
+        if self.scatter_3d is None:
+            raise RuntimeError("plot3d() must be called before update_plot3d().")
+        self.scatter_3d.set_offsets(self.ps[:, :2])
+        self.scatter_3d.set_3d_properties(self.ps[:, 2], 'z')
+        self.scatter_3d.set_array(self.vt)
+        self.scatter_3d.set_clim(np.amin(self.vt), np.amax(self.vt))
+
+        # the axes limits of the first figure are kept, the tube surfaces get the polygons of the new trajectory in place
+        self.ax_3d.set_autoscale_on(False)
+        for tube, tube_kwargs in self.tubes_3d:
+            ts, ps, num_theta = self.get_tube3d_samples(**tube_kwargs)
+            tube_x, tube_y, tube_z = self.get_tube(ts, ps, **{**tube_kwargs, 'num_theta': num_theta})
+            rcount, ccount = tube_x.shape if tube_kwargs['lod'] else (50, 50)
+            polygons = get_surface_polygons(tube_x, tube_y, tube_z, rcount=rcount, ccount=ccount)
+            tube.set_verts(polygons)
+            if tube_kwargs['shade']:
+                # the shading depends on the polygon normals, the alpha of the surface is applied by set_facecolor
+                color = tube_kwargs['tube_color'] if tube_kwargs['tube_color'] is not None else 'purple'
+                tube.set_facecolor(shade_colors(color, get_polygon_normals(polygons)))
+
+    def animate(self,
+                save_path: Union[os.PathLike, str],
+                fig_name: str,
+                dim: str = '3d',
+                fps: float = 30,
+                speed: float = 1.0,
+                trail_time: Optional[float] = 1.0,
+                dpi: Optional[float] = 100,
+                marker_color: str = 'red',
+                trail_color: str = 'black',
+                print_output: bool = True) -> dict:
+        # play the trajectory over the figure of the last plot()/plot3d() call
+        # fig_name with a video extension (.mp4, .gif, ...) is encoded by ffmpeg, otherwise a png sequence is written
+        if dim == '3d':
+            ax = self.ax_3d
+        elif dim == '2d':
+            ax = self.ax_2d
         else:
-            tube_x, tube_y, tube_z = self.get_sig_tube(ts, ps, bias=bias, inner_radius=inner_radius, outer_radius=outer_radius, rate=rate, scale=scale)
+            raise ValueError("Unrecognized dim: " + dim)
 
-        # plot tube
-        ax.plot_surface(tube_x, tube_y, tube_z, color=tube_color, alpha=alpha, edgecolor=tube_edge_color, shade=shade, antialiased=True)
+        save_path = os.fspath(save_path)
+        os.makedirs(save_path, exist_ok=True)
+        stats = export_playback(ax, self.ts, self.ps, self.vs, os.path.join(save_path, fig_name),
+                                fps=fps, speed=speed, trail_time=trail_time, dpi=dpi,
+                                marker_color=marker_color, trail_color=trail_color)
+        if print_output:
+            print(f"Rendered {stats['frames']} frames in {stats['seconds']:.2f}s ({stats['fps']:.1f} frames/sec)")
+        return stats
 
     def set_nice_ticks(self, ax, range_val, ticks_count, axis='x'):
         ticks_interval = range_val / (ticks_count - 1)
@@ -397,26 +501,53 @@ class RacePlotter:
         else:  # 'z'
             ax.zaxis.set_major_locator(locator)
 
+    def get_heavy_artists(self, fig) -> list:
+        # trajectory scatters and tube meshes of the figure, thousands of primitives each
+        artists = [self.scatter_2d, self.scatter_3d] + [tube for tube, _ in self.tubes_2d + self.tubes_3d]
+        return [artist for artist in artists if artist is not None and artist.figure is fig]
+
+    def save_fig(self,
+                 fig,
+                 fig_file: str,
+                 dpi: int = 300,
+                 bbox_inches: Union[str, Bbox] = 'tight',
+                 rasterize: Optional[bool] = None):
+        # by default the heavy artists are rasterized at dpi in vector formats, gates, axes and text stay vector
+        if rasterize is None:
+            rasterize = os.path.splitext(fig_file)[1].lower() in VECTOR_FORMATS
+        artists = self.get_heavy_artists(fig) if rasterize else []
+        rasterized = [artist.get_rasterized() for artist in artists]
+        with warnings.catch_warnings():
+            # the 3d scatter rasterizes through its base class draw, mpl still warns about it
+            warnings.simplefilter("ignore", UserWarning)
+            for artist in artists:
+                artist.set_rasterized(True)
+        try:
+            fig.savefig(fig_file, dpi=dpi, bbox_inches=bbox_inches)
+        finally:
+            for artist, value in zip(artists, rasterized):
+                artist.set_rasterized(value)
+
     def save_2d_fig(self,
                  save_path: Union[os.PathLike, str],
                  fig_name: str,
-                 dpi: int = 300):
+                 dpi: int = 300,
+                 rasterize: Optional[bool] = None):
         save_path = os.fspath(save_path)
         os.makedirs(save_path, exist_ok=True)
-        if not fig_name.endswith('.png'):
-            fig_name = fig_name + '.png'
-        self.ax_2d.figure.savefig(os.path.join(save_path, fig_name), dpi=dpi, bbox_inches='tight')
+        fig_name = get_fig_file(fig_name)
+        self.save_fig(self.ax_2d.figure, os.path.join(save_path, fig_name), dpi=dpi, bbox_inches='tight', rasterize=rasterize)
 
     def save_3d_fig(self,
                  save_path: Union[os.PathLike, str],
                  fig_name: str,
                  dpi: int = 300,
                  hide_background: bool = False,
-                 hide_ground: bool = False):
+                 hide_ground: bool = False,
+                 rasterize: Optional[bool] = None):
         save_path = os.fspath(save_path)
         os.makedirs(save_path, exist_ok=True)
-        if not fig_name.endswith('.png'):
-            fig_name = fig_name + '.png'
+        fig_name = get_fig_file(fig_name)
 
         if hide_background:
             fig = self.ax_3d.figure
@@ -481,4 +612,4 @@ class RacePlotter:
         else:
             bbox = 'tight'
         
-        self.ax_3d.figure.savefig(os.path.join(save_path, fig_name), dpi=dpi, bbox_inches=bbox)
\ No newline at end of file
+        self.save_fig(self.ax_3d.figure, os.path.join(save_path, fig_name), dpi=dpi, bbox_inches=bbox, rasterize=rasterize)
\ No newline at end of file
@@ -0,0 +1,140 @@
+import numpy as np
+import matplotlib
+import matplotlib.image as mimage
+from typing import Optional
+import os
+import shutil
+import subprocess
+import time
+
+VIDEO_EXTENSIONS = ['.mp4', '.mkv', '.avi', '.mov', '.gif']
+
+########################################
+############ FRAME WRITERS #############
+########################################
+
+class FrameSequenceWriter:
+    def __init__(self,
+                 save_path: str,
+                 fig_name: str):
+        self.save_path = save_path
+        self.fig_name = fig_name
+        self.frame_num = 0
+        os.makedirs(save_path, exist_ok=True)
+
+    def write(self, frame: np.ndarray):
+        mimage.imsave(os.path.join(self.save_path, f"{self.fig_name}_{self.frame_num:05d}.png"), frame)
+        self.frame_num += 1
+
+    def close(self):
+        pass
+
+class VideoWriter:
+    def __init__(self,
+                 save_file: str,
+                 fps: float,
+                 width: int,
+                 height: int):
+        ffmpeg_path = matplotlib.rcParams['animation.ffmpeg_path']
+        if shutil.which(ffmpeg_path) is None:
+            raise RuntimeError(f"ffmpeg is required to export videos, '{ffmpeg_path}' was not found.")
+        os.makedirs(os.path.dirname(save_file) or '.', exist_ok=True)
+        # raw RGBA frames are piped straight from the canvas buffer
+        command = [ffmpeg_path, '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f"{width}x{height}", '-r', str(fps), '-i', '-']
+        if not save_file.endswith('.gif'):
+            command += ['-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        self.process = subprocess.Popen(command + [save_file], stdin=subprocess.PIPE)
+
+    def write(self, frame: np.ndarray):
+        self.process.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError("ffmpeg failed to write the video.")
+
+########################################
+########### BLITTED PLAYBACK ###########
+########################################
+
+def get_frame_times(t_start: float,
+                    t_end: float,
+                    fps: float,
+                    speed: float = 1.0) -> np.ndarray:
+    # trajectory time of every frame, speed > 1 plays faster than real time
+    num_frames = max(int(np.floor((t_end - t_start) / speed * fps)) + 1, 1)
+    return t_start + np.arange(num_frames) * speed / fps
+
+def export_playback(ax,
+                    ts: np.ndarray,
+                    ps: np.ndarray,
+                    vs: np.ndarray,
+                    save_file: str,
+                    fps: float = 30,
+                    speed: float = 1.0,
+                    trail_time: Optional[float] = 1.0,
+                    dpi: Optional[float] = None,
+                    marker_color: str = 'red',
+                    trail_color: str = 'black') -> dict:
+    fig = ax.figure
+    canvas = fig.canvas
+    is_3d = hasattr(ax, 'get_zlim')
+    # the frames are rendered at dpi, the figure gets its own dpi back afterwards
+    fig_dpi = fig.get_dpi()
+    if dpi is not None:
+        fig.set_dpi(dpi)
+
+    # moving artists are animated, so they are left out of the static background
+    if is_3d:
+        trail, = ax.plot([], [], [], '-', color=trail_color, linewidth=2.0, animated=True)
+        marker, = ax.plot([], [], [], 'o', color=marker_color, markersize=10.0, animated=True)
+        text = ax.text2D(0.02, 0.95, '', transform=ax.transAxes, animated=True)
+    else:
+        trail, = ax.plot([], [], '-', color=trail_color, linewidth=2.0, animated=True)
+        marker, = ax.plot([], [], 'o', color=marker_color, markersize=10.0, animated=True)
+        text = ax.text(0.02, 0.95, '', transform=ax.transAxes, animated=True)
+
+    try:
+        # draw gates, tube and axes once and keep them as the background
+        canvas.draw()
+        background = canvas.copy_from_bbox(fig.bbox)
+        height, width = np.asarray(canvas.buffer_rgba()).shape[:2]
+
+        save_file = os.fspath(save_file)
+        if os.path.splitext(save_file)[1].lower() in VIDEO_EXTENSIONS:
+            writer = VideoWriter(save_file, fps, width, height)
+        else:
+            writer = FrameSequenceWriter(os.path.dirname(save_file) or '.', os.path.basename(save_file))
+
+        frame_times = get_frame_times(ts[0], ts[-1], fps, speed)
+        frame_indices = np.minimum(np.searchsorted(ts, frame_times), len(ts) - 1)
+        trail_indices = np.zeros_like(frame_indices) if trail_time is None else np.searchsorted(ts, frame_times - trail_time)
+
+        start = time.perf_counter()
+        try:
+            for t, i, j in zip(frame_times, frame_indices, trail_indices):
+                canvas.restore_region(background)
+                if is_3d:
+                    trail.set_data_3d(ps[j:i+1, 0], ps[j:i+1, 1], ps[j:i+1, 2])
+                    marker.set_data_3d(ps[i:i+1, 0], ps[i:i+1, 1], ps[i:i+1, 2])
+                else:
+                    trail.set_data(ps[j:i+1, 0], ps[j:i+1, 1])
+                    marker.set_data(ps[i:i+1, 0], ps[i:i+1, 1])
+                text.set_text(f"t = {t:.2f} s, v = {vs[i]:.2f} m/s")
+                ax.draw_artist(trail)
+                ax.draw_artist(marker)
+                ax.draw_artist(text)
+                writer.write(np.asarray(canvas.buffer_rgba()))
+        finally:
+            writer.close()
+    finally:
+        trail.remove()
+        marker.remove()
+        text.remove()
+        fig.set_dpi(fig_dpi)
+    elapsed = time.perf_counter() - start
+
+    return {'frames': len(frame_times),
+            'seconds': elapsed,
+            'fps': len(frame_times) / elapsed if elapsed > 0 else float('inf')}
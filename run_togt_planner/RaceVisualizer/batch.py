@@ -0,0 +1,157 @@
+import matplotlib
+from typing import List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import time
+import traceback
+
+
+class RenderJob:
+    def __init__(self,
+                 name: str,
+                 track_file: str,
+                 traj_file: str,
+                 fig_path: str,
+                 wpt_path: Optional[str] = None,
+                 plot_kwargs: Optional[dict] = None,
+                 plot3d_kwargs: Optional[dict] = None,
+                 dpi: int = 300,
+                 fig_format: str = 'png'):
+        self.name = name
+        self.track_file = track_file
+        self.traj_file = traj_file
+        self.fig_path = fig_path
+        self.wpt_path = wpt_path
+        self.plot_kwargs = {} if plot_kwargs is None else plot_kwargs
+        self.plot3d_kwargs = {} if plot3d_kwargs is None else plot3d_kwargs
+        self.dpi = dpi
+        self.fig_format = fig_format
+
+class RenderResult:
+    def __init__(self,
+                 name: str,
+                 success: bool,
+                 fig_files: List[str],
+                 load_time: float = 0.0,
+                 plot_time: float = 0.0,
+                 save_time: float = 0.0,
+                 error: Optional[str] = None):
+        self.name = name
+        self.success = success
+        self.fig_files = fig_files
+        self.load_time = load_time
+        self.plot_time = plot_time
+        self.save_time = save_time
+        self.total_time = load_time + plot_time + save_time
+        self.error = error
+
+    def __repr__(self) -> str:
+        status = 'ok' if self.success else 'failed'
+        return f"RenderResult({self.name}, {status}, {self.total_time:.2f}s)"
+
+def find_render_jobs(track_dir: Union[os.PathLike, str],
+                     traj_dir: Union[os.PathLike, str],
+                     fig_dir: Union[os.PathLike, str],
+                     plot_kwargs: Optional[dict] = None,
+                     plot3d_kwargs: Optional[dict] = None,
+                     dpi: int = 300,
+                     fig_format: str = 'png') -> List[RenderJob]:
+    # pair <name>.yaml tracks with <name>.csv trajectories, <name>.yaml next to the csv is the waypoint file
+    track_dir, traj_dir, fig_dir = os.fspath(track_dir), os.fspath(traj_dir), os.fspath(fig_dir)
+    jobs = []
+    for file_name in sorted(os.listdir(track_dir)):
+        name, ext = os.path.splitext(file_name)
+        traj_file = os.path.join(traj_dir, name + '.csv')
+        if ext != '.yaml' or not os.path.isfile(traj_file):
+            continue
+        track_file = os.path.join(track_dir, file_name)
+        wpt_path = os.path.join(traj_dir, name + '.yaml')
+        # with the tracks in traj_dir the waypoint file name is the track file itself
+        if not os.path.isfile(wpt_path) or os.path.samefile(wpt_path, track_file):
+            wpt_path = None
+        jobs.append(RenderJob(name=name,
+                              track_file=track_file,
+                              traj_file=traj_file,
+                              fig_path=fig_dir,
+                              wpt_path=wpt_path,
+                              plot_kwargs=plot_kwargs,
+                              plot3d_kwargs=plot3d_kwargs,
+                              dpi=dpi,
+                              fig_format=fig_format))
+    return jobs
+
+def init_render_worker():
+    # no display in the workers, the figures are only saved
+    matplotlib.use('Agg')
+
+def render_job(job: RenderJob) -> RenderResult:
+    # runs in the caller's process with num_workers=1, its backend and figures are left alone
+    import matplotlib.pyplot as plt
+    from run_togt_planner.RaceVisualizer.RacePlotter import RacePlotter
+
+    load_time = plot_time = save_time = 0.0
+    plotter = None
+    try:
+        start = time.perf_counter()
+        plotter = RacePlotter(job.traj_file, job.track_file, job.wpt_path)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        plotter.plot(**job.plot_kwargs)
+        plotter.plot3d(**job.plot3d_kwargs)
+        plot_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fig_names = [f"{job.name}_2d.{job.fig_format}", f"{job.name}_3d.{job.fig_format}"]
+        plotter.save_2d_fig(save_path=job.fig_path, fig_name=fig_names[0], dpi=job.dpi)
+        plotter.save_3d_fig(save_path=job.fig_path, fig_name=fig_names[1], dpi=job.dpi)
+        fig_files = [os.path.join(job.fig_path, fig_name) for fig_name in fig_names]
+        save_time = time.perf_counter() - start
+        return RenderResult(job.name, True, fig_files, load_time, plot_time, save_time)
+    except Exception:
+        return RenderResult(job.name, False, [], load_time, plot_time, save_time, error=traceback.format_exc())
+    finally:
+        if plotter is not None:
+            for ax in (getattr(plotter, 'ax_2d', None), getattr(plotter, 'ax_3d', None)):
+                if ax is not None:
+                    plt.close(ax.figure)
+
+def render_batch(jobs: List[RenderJob],
+                 num_workers: Optional[int] = None,
+                 print_output: bool = True) -> List[RenderResult]:
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    if num_workers <= 1:
+        results = list(map(render_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=init_render_worker) as executor:
+            results = list(executor.map(render_job, jobs))
+
+    if print_output:
+        for result in results:
+            if result.success:
+                print(f"{result.name}: load {result.load_time:.2f}s, plot {result.plot_time:.2f}s, save {result.save_time:.2f}s")
+            else:
+                print(f"{result.name}: failed\n{result.error}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Render 2D/3D figures for every track/trajectory pair in a directory.")
+    parser.add_argument('track_dir', help="directory with <name>.yaml race tracks")
+    parser.add_argument('traj_dir', help="directory with <name>.csv trajectories and <name>.yaml waypoints")
+    parser.add_argument('fig_dir', help="output directory for <name>_2d.<format> and <name>_3d.<format>")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--dpi', type=int, default=300, help="resolution, also of the rasterized trajectory and tubes in vector formats")
+    parser.add_argument('--format', default='png', help="figure format, pdf and svg keep gates, axes and text as vectors")
+    args = parser.parse_args()
+
+    jobs = find_render_jobs(args.track_dir, args.traj_dir, args.fig_dir, dpi=args.dpi, fig_format=args.format)
+    start = time.perf_counter()
+    results = render_batch(jobs, num_workers=args.workers)
+    num_success = sum(result.success for result in results)
+    print(f"Rendered {num_success}/{len(results)} trajectories in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
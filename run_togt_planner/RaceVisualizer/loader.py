@@ -0,0 +1,254 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+import copy
+import fnmatch
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import warnings
+import yaml
+
+TRAJ_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'run_togt_planner', 'trajectory')
+TRAJ_CACHE_VERSION = 2
+TRAJ_CACHE_SIZE = 1024 * 1024 * 1024    # bytes
+TRAJ_COLUMNS = ['t', 'p_x', 'p_y', 'p_z', 'q_w', 'q_x', 'q_y', 'q_z', 'v_x', 'v_y', 'v_z',
+                'w_x', 'w_y', 'w_z', 'u_1', 'u_2', 'u_3', 'u_4']
+# the columns RacePlotter uses
+PLOT_COLUMNS = ['t', 'p_*', 'v_*']
+YAML_CACHE_SIZE = 32
+
+_yaml_cache = OrderedDict()
+_yaml_cache_lock = threading.Lock()
+
+def select_columns(header: List[str],
+                   columns: Optional[List[str]] = None) -> List[str]:
+    if columns is None:
+        return list(header)
+    # keep the file order, columns may be given as glob patterns like 'p_*'
+    selected = [name for name in header if any(fnmatch.fnmatchcase(name, pattern) for pattern in columns)]
+    missing = [pattern for pattern in columns if not any(fnmatch.fnmatchcase(name, pattern) for name in header)]
+    if missing:
+        raise ValueError(f"Missing columns in trajectory: {', '.join(missing)}")
+    return selected
+
+def read_trajectory_header(traj_file: Union[os.PathLike, str]) -> List[str]:
+    with open(traj_file, 'r') as f:
+        return [name.strip() for name in f.readline().split(',')]
+
+def count_lines(traj_file: Union[os.PathLike, str],
+                block_size: int = 1 << 20) -> int:
+    # number of lines, the last one may lack its newline
+    num_lines, last_block = 0, b''
+    with open(traj_file, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            num_lines += block.count(b'\n')
+            last_block = block
+    return num_lines + (len(last_block) > 0 and not last_block.endswith(b'\n'))
+
+def read_trajectory_csv(traj_file: Union[os.PathLike, str],
+                        columns: Optional[List[str]] = None,
+                        dtype: type = np.float64,
+                        chunk_size: int = 65536) -> Dict[str, np.ndarray]:
+    # the output is allocated once from the line count and filled chunk by chunk
+    num_rows = max(count_lines(traj_file) - 1, 0)
+    with open(traj_file, 'r') as f:
+        header = [name.strip() for name in f.readline().split(',')]
+        names = select_columns(header, columns)
+        usecols = [header.index(name) for name in names]
+        data = {name: np.empty(num_rows, dtype=dtype) for name in names}
+
+        # parse a bounded number of lines at a time and keep only the selected columns
+        row = 0
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            chunk = np.loadtxt(lines, dtype=dtype, delimiter=',', usecols=usecols, ndmin=2)
+            for i, name in enumerate(names):
+                data[name][row:row + len(chunk)] = chunk[:, i]
+            row += len(chunk)
+
+    # blank lines are counted but not parsed
+    if row < num_rows:
+        data = {name: values[:row].copy() for name, values in data.items()}
+    return data
+
+def get_cache_key(traj_file: Union[os.PathLike, str]) -> str:
+    # the key changes whenever the file is moved, rewritten or touched
+    traj_file = os.path.abspath(os.fspath(traj_file))
+    stat = os.stat(traj_file)
+    key = f"{TRAJ_CACHE_VERSION}:{traj_file}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def get_column_file(cache_path: str,
+                    name: str,
+                    dtype: type) -> str:
+    # every column is cached per dtype, e.g. p_x.float32.npy
+    return os.path.join(cache_path, f"{name}.{np.dtype(dtype).name}.npy")
+
+def load_cached_header(cache_path: str) -> Optional[List[str]]:
+    meta_file = os.path.join(cache_path, 'meta.json')
+    try:
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # the modification time of meta.json orders the entries for eviction
+    try:
+        os.utime(meta_file)
+    except OSError:
+        pass
+    return meta['header']
+
+def load_cached_columns(cache_path: str,
+                        names: List[str],
+                        dtype: type = np.float64,
+                        mmap: bool = True) -> Dict[str, np.ndarray]:
+    # the cached ones of the columns in names, the others are parsed and added on demand
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for name in names:
+        column_file = get_column_file(cache_path, name, dtype)
+        if os.path.isfile(column_file):
+            data[name] = np.load(column_file, mmap_mode=mmap_mode)
+    return data
+
+def save_cached_columns(cache_path: str,
+                        columns: Dict[str, np.ndarray],
+                        header: List[str],
+                        traj_file: str):
+    # a new entry is written into a temporary directory first so readers never see a partial cache
+    if not os.path.isdir(cache_path):
+        parent = os.path.dirname(cache_path)
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(dir=parent)
+        try:
+            for name, values in columns.items():
+                np.save(get_column_file(tmp_path, name, values.dtype), values)
+            with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+                json.dump({'source': traj_file, 'header': header}, f)
+            os.rename(tmp_path, cache_path)
+            return
+        except OSError:
+            # another process may have filled the same cache entry in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(cache_path):
+                raise
+
+    # columns added to an existing entry appear one complete file at a time
+    for name, values in columns.items():
+        fd, tmp_file = tempfile.mkstemp(dir=cache_path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_file, get_column_file(cache_path, name, values.dtype))
+        except BaseException:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+            raise
+
+def get_cache_entries(cache_dir: str) -> List[tuple]:
+    # (last use, size, path, source file) of every entry
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for key in os.listdir(cache_dir):
+        cache_path = os.path.join(cache_dir, key)
+        meta_file = os.path.join(cache_path, 'meta.json')
+        try:
+            last_use = os.stat(meta_file).st_mtime
+            with open(meta_file, 'r') as f:
+                source = json.load(f).get('source')
+            size = sum(os.path.getsize(os.path.join(cache_path, file_name)) for file_name in os.listdir(cache_path))
+        except (OSError, ValueError):
+            # a temporary directory or an entry that is being removed
+            continue
+        entries.append((last_use, size, cache_path, source))
+    return entries
+
+def evict_trajectory_cache(cache_dir: str,
+                           max_size: int = TRAJ_CACHE_SIZE,
+                           keep: Optional[str] = None):
+    # entries of older versions of the file in keep are stale, then the least recently used ones go until max_size fits
+    entries = sorted(get_cache_entries(cache_dir))
+    keep_source = next((source for _, _, cache_path, source in entries if cache_path == keep), None)
+    total_size = sum(size for _, size, _, _ in entries)
+    for _, size, cache_path, source in entries:
+        if cache_path == keep:
+            continue
+        if source != keep_source and total_size <= max_size:
+            continue
+        shutil.rmtree(cache_path, ignore_errors=True)
+        total_size -= size
+
+def load_trajectory(traj_file: Union[os.PathLike, str],
+                    columns: Optional[List[str]] = None,
+                    dtype: type = np.float64,
+                    use_cache: bool = True,
+                    cache_dir: Optional[Union[os.PathLike, str]] = None,
+                    mmap: bool = True,
+                    max_cache_size: int = TRAJ_CACHE_SIZE) -> Dict[str, np.ndarray]:
+    traj_file = os.fspath(traj_file)
+    if not use_cache:
+        return read_trajectory_csv(traj_file, columns=columns, dtype=dtype)
+
+    cache_dir = os.fspath(cache_dir) if cache_dir is not None else TRAJ_CACHE_DIR
+    cache_path = os.path.join(cache_dir, get_cache_key(traj_file))
+    header = load_cached_header(cache_path)
+    if header is None:
+        header = read_trajectory_header(traj_file)
+    names = select_columns(header, columns)
+    data = load_cached_columns(cache_path, names, dtype, mmap=mmap)
+
+    # only the requested columns are parsed, at the requested dtype, and added to the entry
+    missing = [name for name in names if name not in data]
+    if missing:
+        parsed = read_trajectory_csv(traj_file, columns=missing, dtype=dtype)
+        try:
+            save_cached_columns(cache_path, parsed, header, os.path.abspath(traj_file))
+            evict_trajectory_cache(cache_dir, max_cache_size, keep=cache_path)
+            # memory-mapped where the entry still has them
+            parsed.update(load_cached_columns(cache_path, missing, dtype, mmap=mmap))
+        except OSError as e:
+            warnings.warn(f"Failed to cache trajectory {traj_file}: {e}")
+        data.update(parsed)
+    return {name: data[name] for name in names}
+
+def clear_trajectory_cache(cache_dir: Optional[Union[os.PathLike, str]] = None):
+    cache_dir = os.fspath(cache_dir) if cache_dir is not None else TRAJ_CACHE_DIR
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+def load_yaml(yaml_file: Union[os.PathLike, str]) -> Any:
+    # every caller gets its own copy, changing it does not change later loads
+    yaml_file = os.path.abspath(os.fspath(yaml_file))
+    key = (yaml_file, os.stat(yaml_file).st_mtime_ns)
+    with _yaml_cache_lock:
+        if key in _yaml_cache:
+            _yaml_cache.move_to_end(key)
+            return copy.deepcopy(_yaml_cache[key])
+
+    with open(yaml_file, 'r') as f:
+        data = yaml.safe_load(f)
+
+    with _yaml_cache_lock:
+        # drop stale entries of the same file, then the least recently used ones
+        for stale_key in [k for k in _yaml_cache if k[0] == yaml_file]:
+            del _yaml_cache[stale_key]
+        _yaml_cache[key] = data
+        while len(_yaml_cache) > YAML_CACHE_SIZE:
+            _yaml_cache.popitem(last=False)
+    return copy.deepcopy(data)
+
+def clear_yaml_cache():
+    with _yaml_cache_lock:
+        _yaml_cache.clear()
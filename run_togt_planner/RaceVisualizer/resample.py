@@ -0,0 +1,47 @@
+import numpy as np
+from typing import Optional
+
+
+def get_uniform_samples(t: np.ndarray,
+                        num_samples: int = 5000) -> np.ndarray:
+    return np.linspace(t[0], t[-1], num_samples)
+
+def get_adaptive_samples(t: np.ndarray,
+                         ps: np.ndarray,
+                         tolerance: float = 0.01,
+                         max_step: Optional[float] = None,
+                         max_samples: int = 5000) -> np.ndarray:
+    if tolerance <= 0:
+        raise ValueError("tolerance must be positive.")
+
+    # repeated timestamps would divide by zero in the derivatives, keep the first sample of each
+    keep = np.concatenate(([True], np.diff(t) > 0))
+    t, ps = t[keep], ps[keep]
+    if len(t) < 2:
+        return np.array([t[0], t[-1]])
+
+    # arc length along the raw trajectory
+    ds = np.linalg.norm(np.diff(ps, axis=0), axis=1)
+    s = np.concatenate(([0.0], np.cumsum(ds)))
+    if s[-1] <= 0.0:
+        return np.array([t[0], t[-1]])
+    if max_step is None:
+        max_step = s[-1] / 500
+
+    # curvature k = |p' x p''| / |p'|^3
+    dp = np.gradient(ps, t, axis=0)
+    ddp = np.gradient(dp, t, axis=0)
+    speed = np.maximum(np.linalg.norm(dp, axis=1), 1e-9)
+    curvature = np.linalg.norm(np.cross(dp, ddp), axis=1) / speed**3
+
+    # a chord of length h on a circle of curvature k deviates by k * h^2 / 8
+    step = np.sqrt(8 * tolerance / np.maximum(curvature, 1e-12))
+    step = np.minimum(step, max_step)
+
+    # integrate the sample density over arc length and invert it
+    density = 1 / step
+    u = np.concatenate(([0.0], np.cumsum(0.5 * (density[1:] + density[:-1]) * ds)))
+    num_samples = int(np.clip(np.ceil(u[-1]) + 1, 2, max_samples))
+    u_samples = np.linspace(0.0, u[-1], num_samples)
+    # u is non-decreasing, so the inverse maps sample indices back to time
+    return np.interp(u_samples, u, t)
@@ -1,246 +1,101 @@
 import numpy as np
-import yaml
-
-
-def rpy_to_rotation_matrix(rpy):
-    r, p, y = np.array(rpy) * np.pi/180
-    cos, sin = np.cos, np.sin
-    R = np.eye(3)
-    R[0, 0] = cos(y) * cos(p)
-    R[1, 0] = sin(y) * cos(p)
-    R[2, 0] = -sin(p)
-    R[0, 1] = cos(y) * sin(p) * sin(r) - sin(y) * cos(r)
-    R[1, 1] = sin(y) * sin(p) * sin(r) + cos(y) * cos(r)
-    R[2, 1] = cos(p) * sin(r)
-    R[0, 2] = cos(y) * sin(p) * cos(r) + sin(y) * sin(r)
-    R[1, 2] = sin(y) * sin(p) * cos(r) - cos(y) * sin(r)
-    R[2, 2] = cos(p) * cos(r)
-    return R
+import matplotlib.colors as mcolors
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection, Poly3DCollection
+from run_togt_planner.RaceGenerator.GateGeometry import get_gate_geometry
+from run_togt_planner.RaceVisualizer.loader import load_yaml
+
+GATE_LINE_ARGS = {
+    'linewidth': 3.0,
+    'markersize': 5.0,
+    'color': 'black'
+}
+
+
+def get_gate_outlines(track, set_radius=None, set_width=None, set_height=None, set_margin=0):
+    # closed opening polygons of the prisma gates, center and radius of the ball gates
+    geometry = get_gate_geometry(track, set_radius, set_width, set_height, set_margin)
+    is_ball = geometry.num_vertices == 0
+    outlines = [geometry.get_polygon(i) for i in np.flatnonzero(~is_ball)]
+    return outlines, geometry.centers[is_ball], geometry.radii[is_ball]
+
+def get_sphere_faces(centers, radii):
+    # quads of all ball gates as one (num_faces, 4, 3) array
+    u, v = np.mgrid[0:2*np.pi:20j, 0:np.pi:10j]
+    unit = np.stack((np.cos(u) * np.sin(v), np.sin(u) * np.sin(v), np.cos(v)), axis=-1)
+    grid = centers[:, None, None, :] + radii[:, None, None, None] * unit[None]
+    # vertices in the order of the plot_surface patches, which decides the side that is lit
+    faces = np.stack((grid[:, :-1, :-1], grid[:, :-1, 1:], grid[:, 1:, 1:], grid[:, 1:, :-1]), axis=3)
+    return faces.reshape(-1, 4, 3)
+
+def get_polygon_normals(polygons):
+    # from the three vertices plot_surface uses, 0 for collapsed polygons
+    # (M, N, 3) polygons at once, a list of polygons of different sizes by size
+    if not isinstance(polygons, np.ndarray):
+        normals = np.zeros((len(polygons), 3))
+        sizes = np.array([len(polygon) for polygon in polygons])
+        for size in np.unique(sizes):
+            indices = np.flatnonzero(sizes == size)
+            normals[indices] = get_polygon_normals(np.array([polygons[i] for i in indices]))
+        return normals
+    n = polygons.shape[1]
+    return np.cross(polygons[:, 0] - polygons[:, n // 3], polygons[:, n // 3] - polygons[:, 2 * n // 3])
+
+def shade_colors(color, normals):
+    # same lighting as plot_surface(shade=True), which leaves the colors alone when no normal is valid
+    lightsource = mcolors.LightSource(azdeg=225, altdeg=19.4712)
+    with np.errstate(invalid='ignore'):
+        shade = (normals / np.linalg.norm(normals, axis=1, keepdims=True)) @ lightsource.direction
+    valid = ~np.isnan(shade)
+    color = mcolors.to_rgba_array(color)
+    if not np.any(valid):
+        return np.broadcast_to(color, (len(normals), 4)).copy()
+    shade[~valid] = 0
+    colors = (0.3 + 0.7 * (shade + 1) / 2)[:, None] * color
+    colors[:, 3] = color[:, 3]
+    return colors
 
 def plot_track(ax, track_file, set_radius=None, set_width=None, set_height=None, set_margin=0):
-    with open(track_file) as fp:
-        track = yaml.safe_load(fp)
-
-    for g in track['orders']:
-        g = track[g]
-
-        if g['type'] == 'FreeCorridor':
-            raise NotImplementedError("Not support plotting FreeCorridor gate")
-
-        args = {
-            'linewidth': 3.0,
-            'markersize': 5.0,
-            'color': 'black'
-        }
-
-        if g['type'] == 'SingleBall':
-            position = g['position']
-            r = g['radius'] - g['margin']
-            if set_radius is not None:
-                r = set_radius - set_margin
-            a = np.linspace(0, 2*np.pi)
-            ax.plot(position[0]+r*np.cos(a),
-                    position[1]+r*np.sin(a), '-', **args)
-            # draw center
-            ax.scatter(position[0], position[1], color='black', s=50)
-
-        elif g['type'] == 'TrianglePrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            hw = 0.5*(g['width']-g['margin'])
-            hh = 0.5*(g['height']-g['margin'])
-            if set_width is not None:
-                hw = 0.5*(set_width - set_margin)
-            if set_height is not None:
-                hh = 0.5*(set_height - set_margin)
-            drift = 0.0
-            verts = [
-                [-hh, hw, drift],
-                [hh, 0.0, drift],
-                [-hh, -hw, drift],
-                [-hh, hw, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], 'o-', **args)
-
-        elif g['type'] == 'RectanglePrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            hw = 0.5*(g['width']-g['marginW'])
-            hh = 0.5*(g['height']-g['marginH'])
-            if set_width is not None:
-                hw = 0.5*(set_width - set_margin)
-            if set_height is not None:
-                hh = 0.5*(set_height - set_margin)
-            drift = 0.0
-            verts = [
-                [-hh, hw, drift],
-                [-hh, -hw, drift],
-                [hh, -hw, drift],
-                [hh, hw, drift],
-                [-hh, hw, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], 'o-', **args)
-
-        elif g['type'] == 'PentagonPrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            ar = g['radius'] - g['margin']
-            if set_radius is not None:
-                ar = set_radius - set_margin
-            cos54 = np.cos(0.3*np.pi)
-            sin54 = np.sin(0.3*np.pi)
-            nd, on = ar * cos54, ar * sin54
-            bc = 2 * nd
-            fc = bc * sin54
-            of = ar - bc * cos54
-            drift = 0.0
-            verts = [
-                [-on, nd, drift],
-                [of, fc, drift],
-                [ar, 0.0, drift],
-                [of, -fc, drift],
-                [-on, -nd, drift],
-                [-on, nd, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], 'o-', **args)
-
-        elif g['type'] == 'HexagonPrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            aside = g['side'] - g['margin']
-            if set_radius is not None:
-                aside = set_radius - set_margin
-            hside = 0.5 * aside
-            height = hside * np.tan(np.pi/3.0)
-            drift = 0.0
-            verts = [
-                [-height, hside, drift],
-                [0.0, aside, drift],
-                [height, hside, drift],
-                [height, -hside, drift],
-                [0.0, -aside, drift],
-                [-height, -hside, drift],
-                [-height, hside, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], 'o-', **args)
+    track = load_yaml(track_file)
+    outlines, centers, radii = get_gate_outlines(track, set_radius, set_width, set_height, set_margin)
+
+    # ball gates are drawn as circles in the xy-plane
+    a = np.linspace(0, 2*np.pi)
+    circles = centers[:, None, :2] + radii[:, None, None] * np.stack((np.cos(a), np.sin(a)), axis=-1)
+    segments = [verts[:, :2] for verts in outlines] + list(circles)
+
+    # one artist per style instead of one per gate
+    if segments:
+        ax.add_collection(LineCollection(segments, linewidths=GATE_LINE_ARGS['linewidth'],
+                                         colors=GATE_LINE_ARGS['color'], zorder=2))
+        ax.autoscale_view()
+    if outlines:
+        verts = np.concatenate(outlines)
+        ax.plot(verts[:,0], verts[:,1], 'o', **GATE_LINE_ARGS)
+    if len(centers):
+        ax.scatter(centers[:,0], centers[:,1], color='black', s=50)
 
-        else:
-            raise ValueError('Unrecognized gate: ' + g['type'])
-        
 def plot_track_3d(ax, track_file, set_radius=None, set_width=None, set_height=None, set_margin=0, color=None):
     if color is None:
         color = 'r'
 
-    with open(track_file) as fp:
-        track = yaml.safe_load(fp)
-
-    for g in track['orders']:
-        g = track[g]
-
-        if g['type'] == 'FreeCorridor':
-            raise NotImplementedError("Not support plotting FreeCorridor gate")
-
-        args = {
-            'linewidth': 3.0,
-            'markersize': 5.0,
-            'color': 'black'
-        }
-
-        if g['type'] == 'SingleBall':
-            position = g['position']
-            r = g['radius'] - g['margin']
-            if set_radius is not None:
-                r = set_radius - set_margin
-
-            # create sphere
-            u, v = np.mgrid[0:2*np.pi:20j, 0:np.pi:10j]
-            x = position[0] + r * np.cos(u) * np.sin(v)
-            y = position[1] + r * np.sin(u) * np.sin(v)
-            z = position[2] + r * np.cos(v)
-            # draw sphere
-            ax.plot_surface(x, y, z, color=color, alpha=0.3, edgecolor='none')
-            # draw center
-            ax.scatter(position[0], position[1], position[2], color='black', s=50)
-            
-        elif g['type'] == 'TrianglePrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            hw = 0.5*(g['width']-g['margin'])
-            hh = 0.5*(g['height']-g['margin'])
-            if set_width is not None:
-                hw = 0.5*(set_width - set_margin)
-            if set_height is not None:
-                hh = 0.5*(set_height - set_margin)
-            drift = 0.0
-            verts = [
-                [-hh, hw, drift],
-                [hh, 0.0, drift],
-                [-hh, -hw, drift],
-                [-hh, hw, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], verts[:,2], 'o-', **args)
-
-        elif g['type'] == 'RectanglePrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            hw = 0.5*(g['width']-g['marginW'])
-            hh = 0.5*(g['height']-g['marginH'])
-            if set_width is not None:
-                hw = 0.5*(set_width - set_margin)
-            if set_height is not None:
-                hh = 0.5*(set_height - set_margin)
-            drift = 0.0
-            verts = [
-                [-hh, hw, drift],
-                [-hh, -hw, drift],
-                [hh, -hw, drift],
-                [hh, hw, drift],
-                [-hh, hw, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], verts[:,2], 'o-', **args)
-
-        elif g['type'] == 'PentagonPrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            ar = g['radius'] - g['margin']
-            if set_radius is not None:
-                ar = set_radius - set_margin
-            cos54 = np.cos(0.3*np.pi)
-            sin54 = np.sin(0.3*np.pi)
-            nd, on = ar * cos54, ar * sin54
-            bc = 2 * nd
-            fc = bc * sin54
-            of = ar - bc * cos54
-            drift = 0.0
-            verts = [
-                [-on, nd, drift],
-                [of, fc, drift],
-                [ar, 0.0, drift],
-                [of, -fc, drift],
-                [-on, -nd, drift],
-                [-on, nd, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], verts[:,2], 'o-', **args)
-
-        elif g['type'] == 'HexagonPrisma':
-            position = g['position']
-            R = rpy_to_rotation_matrix(g['rpy'])
-            aside = g['side'] - g['margin']
-            if set_radius is not None:
-                aside = set_radius - set_margin
-            hside = 0.5 * aside
-            height = hside * np.tan(np.pi/3.0)
-            drift = 0.0
-            verts = [
-                [-height, hside, drift],
-                [0.0, aside, drift],
-                [height, hside, drift],
-                [height, -hside, drift],
-                [0.0, -aside, drift],
-                [-height, -hside, drift],
-                [-height, hside, drift]
-            ] @ R.T + np.array(position).reshape((1,3))
-            ax.plot(verts[:,0], verts[:,1], verts[:,2], 'o-', **args)
-
-        else:
-            raise ValueError('Unrecognized gate: ' + g['type'])
+    track = load_yaml(track_file)
+    outlines, centers, radii = get_gate_outlines(track, set_radius, set_width, set_height, set_margin)
+
+    # one artist per style instead of one per gate
+    if len(centers):
+        faces = get_sphere_faces(centers, radii)
+        normals = get_polygon_normals(faces)
+        colors = shade_colors(color, normals)
+        # like plot_surface, a sphere without any valid normal (radius 0) is not shaded
+        flat = ~np.any(np.linalg.norm(normals, axis=1).reshape(len(centers), -1) > 0, axis=1)
+        colors.reshape(len(centers), -1, 4)[flat] = mcolors.to_rgba(color)
+        spheres = Poly3DCollection(faces, facecolors=colors, edgecolor='none', alpha=0.3)
+        ax.add_collection3d(spheres)
+        ax.auto_scale_xyz(faces[..., 0], faces[..., 1], faces[..., 2], had_data=True)
+        ax.scatter(centers[:,0], centers[:,1], centers[:,2], color='black', s=50)
+    if outlines:
+        ax.add_collection3d(Line3DCollection(outlines, linewidths=GATE_LINE_ARGS['linewidth'],
+                                             colors=GATE_LINE_ARGS['color']))
+        verts = np.concatenate(outlines)
+        ax.plot(verts[:,0], verts[:,1], verts[:,2], 'o', **GATE_LINE_ARGS)
@@ -0,0 +1,197 @@
+import numpy as np
+from typing import Optional, Tuple, Union
+
+
+def estimate_tangents(ps: np.ndarray) -> np.ndarray:
+    # compute tangents
+    tangents = np.gradient(ps, axis=0)
+    # normalize tangents
+    tangents /= np.linalg.norm(tangents, axis=1).reshape(-1, 1)
+    return tangents
+
+def get_fixed_frames(tangents: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # choose an arbitrary vector not parallel to the tangent, for all samples at once
+    arbitrary_vectors = np.zeros_like(tangents)
+    parallel = np.all(np.isclose(tangents, [1.0, 0.0, 0.0]), axis=1)
+    arbitrary_vectors[~parallel, 0] = 1.0
+    arbitrary_vectors[parallel, 1] = 1.0
+
+    normals = np.cross(tangents, arbitrary_vectors)
+    normals /= np.linalg.norm(normals, axis=1).reshape(-1, 1)
+    binormals = np.cross(tangents, normals)
+    return normals, binormals
+
+def fill_degenerate_tangents(tangents: np.ndarray) -> np.ndarray:
+    # repeated points give zero gradients and NaN tangents, those samples take the previous valid tangent
+    valid = np.all(np.isfinite(tangents), axis=1) & (np.linalg.norm(np.nan_to_num(tangents), axis=1) > 0.5)
+    if np.all(valid):
+        return tangents
+    if not np.any(valid):
+        return np.tile([1.0, 0.0, 0.0], (len(tangents), 1))
+    indices = np.maximum.accumulate(np.where(valid, np.arange(len(tangents)), 0))
+    # leading degenerate samples take the first valid tangent
+    indices[:np.argmax(valid)] = np.argmax(valid)
+    return tangents[indices]
+
+def get_rotation_minimizing_frames(tangents: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # a single degenerate step would be carried into every later frame by the prefix scan
+    tangents = fill_degenerate_tangents(tangents)
+    num_points = len(tangents)
+    normals_0, _ = get_fixed_frames(tangents[:1])
+    if num_points == 1:
+        return normals_0, np.cross(tangents, normals_0)
+
+    # minimal rotation between consecutive tangents: R = I + [v]x + [v]x^2 / (1 + c)
+    a, b = tangents[:-1], tangents[1:]
+    v = np.cross(a, b)
+    c = np.einsum('ij,ij->i', a, b)
+    vx = np.zeros((num_points - 1, 3, 3))
+    vx[:, 0, 1], vx[:, 0, 2] = -v[:, 2], v[:, 1]
+    vx[:, 1, 0], vx[:, 1, 2] = v[:, 2], -v[:, 0]
+    vx[:, 2, 0], vx[:, 2, 1] = -v[:, 1], v[:, 0]
+    reversed_ = (1 + c) < 1e-9
+    k = np.where(reversed_, 0.0, 1 / np.maximum(1 + c, 1e-9))
+    rotations = np.eye(3) + vx + (vx @ vx) * k[:, None, None]
+    # a half turn about any axis normal to the tangent when the tangent flips
+    if np.any(reversed_):
+        axes, _ = get_fixed_frames(a[reversed_])
+        rotations[reversed_] = 2 * axes[:, :, None] * axes[:, None, :] - np.eye(3)
+
+    # accumulate rotations with a log-depth prefix scan of batched matmuls
+    step = 1
+    while step < len(rotations):
+        rotations[step:] = rotations[step:] @ rotations[:-step]
+        step *= 2
+
+    # transport the initial normal and re-orthonormalize against drift
+    normals = np.empty_like(tangents)
+    normals[0] = normals_0[0]
+    normals[1:] = rotations @ normals_0[0]
+    normals -= np.einsum('ij,ij->i', normals, tangents)[:, None] * tangents
+    normals /= np.linalg.norm(normals, axis=1).reshape(-1, 1)
+    binormals = np.cross(tangents, normals)
+    return normals, binormals
+
+def get_tube_mesh(ps: np.ndarray,
+                  radius: Union[float, np.ndarray],
+                  num_theta: int = 20,
+                  tangents: Optional[np.ndarray] = None,
+                  normals: Optional[np.ndarray] = None,
+                  binormals: Optional[np.ndarray] = None,
+                  frame: str = 'fixed') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if num_theta < 3:
+        raise ValueError("num_theta must be at least 3.")
+
+    if normals is None or binormals is None:
+        if tangents is None:
+            tangents = estimate_tangents(ps)
+        if frame == 'fixed':
+            normals, binormals = get_fixed_frames(tangents)
+        elif frame == 'rmf':
+            normals, binormals = get_rotation_minimizing_frames(tangents)
+        else:
+            raise ValueError("Unrecognized frame: " + frame)
+
+    # radius is either a scalar or one value per sample
+    radius = np.asarray(radius, dtype=float)
+    if radius.ndim == 0:
+        radius = np.full(len(ps), float(radius))
+    elif radius.shape != (len(ps),):
+        raise ValueError("radius must be a scalar or have one value per point.")
+
+    # circle points of every cross-section, shape (num_points, num_theta)
+    theta = np.linspace(0, 2 * np.pi, num_theta)
+    circle_x = radius[:, None] * np.cos(theta)[None, :]
+    circle_y = radius[:, None] * np.sin(theta)[None, :]
+
+    # global points = ps + normal * circle_x + binormal * circle_y
+    tube = (ps[:, None, :]
+            + normals[:, None, :] * circle_x[:, :, None]
+            + binormals[:, None, :] * circle_y[:, :, None])
+    return tube[:, :, 0], tube[:, :, 1], tube[:, :, 2]
+
+def get_lod_indices(ps: np.ndarray,
+                    max_segment: float,
+                    max_angle: float) -> np.ndarray:
+    # merge near-collinear segments: a new sample starts whenever the accumulated
+    # turning angle or arc length crosses the next multiple of its tolerance
+    if len(ps) <= 2:
+        return np.arange(len(ps))
+    segments = np.diff(ps, axis=0)
+    lengths = np.linalg.norm(segments, axis=1)
+    directions = segments / np.maximum(lengths, 1e-12).reshape(-1, 1)
+    cos_turn = np.clip(np.einsum('ij,ij->i', directions[:-1], directions[1:]), -1.0, 1.0)
+    turning = np.concatenate(([0.0, 0.0], np.cumsum(np.arccos(cos_turn))))
+    arc_length = np.concatenate(([0.0], np.cumsum(lengths)))
+
+    bins = np.floor(turning / max_angle) + np.floor(arc_length / max_segment)
+    keep = np.concatenate(([True], np.diff(bins) > 0))
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+def get_tube_lod(ps: np.ndarray,
+                 radius: float,
+                 pixels_per_meter: float,
+                 pixel_tolerance: float = 3.0,
+                 max_polygons: int = 20000,
+                 min_theta: int = 6,
+                 max_theta: int = 20) -> Tuple[np.ndarray, int]:
+    # ring resolution from the on-screen tube circumference
+    circumference = 2 * np.pi * radius * pixels_per_meter
+    num_theta = int(np.clip(np.ceil(circumference / (4 * pixel_tolerance)), min_theta, max_theta))
+
+    # segments may be long on straights, bends are split once they deviate by a few pixels
+    extent = np.ptp(ps, axis=0).max()
+    max_angle = np.clip(2 * np.sqrt(2 * pixel_tolerance / max(radius * pixels_per_meter, pixel_tolerance)), np.deg2rad(2), np.deg2rad(30))
+    indices = get_lod_indices(ps, max_segment=max(extent / 20, 1e-9), max_angle=max_angle)
+
+    # keep the polygon count bounded however long the trajectory is
+    max_rings = max(max_polygons // (num_theta - 1) + 1, 2)
+    if len(indices) > max_rings:
+        indices = indices[np.round(np.linspace(0, len(indices) - 1, max_rings)).astype(int)]
+    return indices, num_theta
+
+def get_cell_edges(values: np.ndarray) -> np.ndarray:
+    # (N, M) mesh points -> (N + 1, M + 1) corners of the cells centered on them,
+    # where pcolormesh(shading='auto') puts the corners of a mesh of the same shape as its colors
+    def expand_columns(a: np.ndarray) -> np.ndarray:
+        if a.shape[1] == 1:
+            return np.hstack((a, a))
+        d = np.diff(a, axis=1) * 0.5
+        return np.hstack((a[:, [0]] - d[:, [0]], a[:, :-1] + d, a[:, [-1]] + d[:, [-1]]))
+    return expand_columns(expand_columns(values).T).T
+
+def get_surface_polygons(x: np.ndarray,
+                         y: np.ndarray,
+                         z: np.ndarray,
+                         rcount: Optional[int] = None,
+                         ccount: Optional[int] = None) -> list:
+    # the patches of plot_surface with the same rcount and ccount, every row and column for None
+    # points that are not finite are dropped
+    rows, cols = z.shape
+    rcount = rows if rcount is None else rcount
+    ccount = cols if ccount is None else ccount
+    rstride = int(max(np.ceil(rows / rcount), 1))
+    cstride = int(max(np.ceil(cols / ccount), 1))
+    row_indices = np.array(list(range(0, rows - 1, rstride)) + [rows - 1])
+    col_indices = np.array(list(range(0, cols - 1, cstride)) + [cols - 1])
+    heights, widths = np.diff(row_indices), np.diff(col_indices)
+    points = np.stack((x, y, z), axis=-1)
+
+    # blocks of the same size are gathered at once, only the last row and column of blocks may be smaller
+    polygons = [None] * (len(heights) * len(widths))
+    for h in np.unique(heights):
+        for w in np.unique(widths):
+            # perimeter of an (h + 1, w + 1) block, corners once: top, right, bottom and left edge
+            rr = np.concatenate((np.zeros(w, dtype=int), np.arange(h), np.full(w, h), np.arange(h, 0, -1)))
+            cc = np.concatenate((np.arange(w), np.full(h, w), np.arange(w, 0, -1), np.zeros(h, dtype=int)))
+            block_rows, block_cols = np.flatnonzero(heights == h), np.flatnonzero(widths == w)
+            perimeters = points[row_indices[block_rows][:, None, None] + rr, col_indices[block_cols][None, :, None] + cc]
+            for i, r in enumerate(block_rows):
+                for j, c in enumerate(block_cols):
+                    polygons[r * len(widths) + c] = perimeters[i, j]
+
+    if not np.all(np.isfinite(points)):
+        polygons = [polygon[np.all(np.isfinite(polygon), axis=1)] for polygon in polygons]
+        polygons = [polygon for polygon in polygons if len(polygon)]
+    return polygons
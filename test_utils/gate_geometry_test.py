@@ -0,0 +1,174 @@
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import yaml
+from run_togt_planner.RaceGenerator.GateGeometry import (get_gate_geometry, rpy_to_rotation_matrix, GateDistanceField,
+                                                         get_gate_distances, GateParams, GATE_TYPES, PARAM_KEYS)
+from yaml_emitter_test import TRACK_PATH, get_test_tracks
+
+def get_baseline_outline(g, set_radius=None, set_width=None, set_height=None, set_margin=0):
+    # the vertices the former per-gate loop of track.plot_track drew, the radius for a SingleBall
+    if g['type'] == 'SingleBall':
+        return g['radius'] - g['margin'] if set_radius is None else set_radius - set_margin
+    R = rpy_to_rotation_matrix(g['rpy'])
+    if g['type'] in ('TrianglePrisma', 'RectanglePrisma'):
+        margin_w, margin_h = (g['margin'], g['margin']) if g['type'] == 'TrianglePrisma' else (g['marginW'], g['marginH'])
+        hw = 0.5*(g['width'] - margin_w) if set_width is None else 0.5*(set_width - set_margin)
+        hh = 0.5*(g['height'] - margin_h) if set_height is None else 0.5*(set_height - set_margin)
+        if g['type'] == 'TrianglePrisma':
+            verts = [[-hh, hw, 0.0], [hh, 0.0, 0.0], [-hh, -hw, 0.0], [-hh, hw, 0.0]]
+        else:
+            verts = [[-hh, hw, 0.0], [-hh, -hw, 0.0], [hh, -hw, 0.0], [hh, hw, 0.0], [-hh, hw, 0.0]]
+    elif g['type'] == 'PentagonPrisma':
+        ar = g['radius'] - g['margin'] if set_radius is None else set_radius - set_margin
+        cos54, sin54 = np.cos(0.3*np.pi), np.sin(0.3*np.pi)
+        nd, on = ar * cos54, ar * sin54
+        bc = 2 * nd
+        fc = bc * sin54
+        of = ar - bc * cos54
+        verts = [[-on, nd, 0.0], [of, fc, 0.0], [ar, 0.0, 0.0], [of, -fc, 0.0], [-on, -nd, 0.0], [-on, nd, 0.0]]
+    else:
+        aside = g['side'] - g['margin'] if set_radius is None else set_radius - set_margin
+        hside = 0.5 * aside
+        height = hside * np.tan(np.pi/3.0)
+        verts = [[-height, hside, 0.0], [0.0, aside, 0.0], [height, hside, 0.0], [height, -hside, 0.0],
+                 [0.0, -aside, 0.0], [-height, -hside, 0.0], [-height, hside, 0.0]]
+    return np.array(verts) @ R.T + np.array(g['position']).reshape((1, 3))
+
+def check_parity(track, **overrides):
+    geometry = get_gate_geometry(track, **overrides)
+    assert geometry.names == list(track['orders'])
+    for i, name in enumerate(track['orders']):
+        outline = get_baseline_outline(track[name], **overrides)
+        if track[name]['type'] == 'SingleBall':
+            assert geometry.num_vertices[i] == 0 and np.isclose(geometry.radii[i], outline), name
+            assert np.allclose(geometry.bboxes[i], [np.subtract(track[name]['position'], outline), np.add(track[name]['position'], outline)])
+        else:
+            assert np.allclose(geometry.get_polygon(i), outline, atol=1e-12), name
+            assert np.allclose(geometry.bboxes[i], [outline.min(axis=0), outline.max(axis=0)])
+
+def get_tracks():
+    # the bundled tracks and a few generated ones
+    tracks = []
+    for file_name in sorted(os.listdir(TRACK_PATH)):
+        with open(os.path.join(TRACK_PATH, file_name)) as f:
+            tracks.append(yaml.safe_load(f))
+    return tracks + [race.to_dict() for race in get_test_tracks()[:5]]
+
+def test_gate_geometry():
+    for track in get_tracks():
+        check_parity(track)
+        check_parity(track, set_radius=1.2, set_width=2.0, set_height=1.5, set_margin=0.1)
+
+    # tracks without a ball, and without any gate
+    track = get_test_tracks()[0].to_dict()
+    track['orders'] = [name for name in track['orders'] if track[name]['type'] != 'SingleBall']
+    assert track['orders']
+    check_parity(track)
+    track['orders'] = []
+    assert len(get_gate_geometry(track)) == 0
+    print("gate geometry matches the per-gate outlines")
+
+def get_filled_samples(polygon, num_steps=60):
+    # dense points of the filled opening, a fan of triangles from the first vertex
+    u, v = np.meshgrid(np.linspace(0, 1, num_steps + 1), np.linspace(0, 1, num_steps + 1))
+    u, v = u[u + v <= 1], v[u + v <= 1]
+    return np.concatenate([polygon[0] + u[:, None] * (b - polygon[0]) + v[:, None] * (c - polygon[0])
+                           for b, c in zip(polygon[1:-2], polygon[2:-1])])
+
+def get_brute_force_distances(geometry, points):
+    distances = np.full(len(points), np.inf)
+    for i in range(len(geometry)):
+        if geometry.num_vertices[i] == 0:
+            gate_distances = np.maximum(np.linalg.norm(points - geometry.centers[i], axis=1) - geometry.radii[i], 0.0)
+        else:
+            samples = get_filled_samples(geometry.get_polygon(i))
+            gate_distances = np.min(np.linalg.norm(points[:, None] - samples[None], axis=2), axis=1)
+        distances = np.minimum(distances, gate_distances)
+    return distances
+
+def test_distance_field():
+    rng = np.random.default_rng(0)
+    for track in get_tracks():
+        geometry = get_gate_geometry(track)
+        lower, upper = geometry.bboxes[:, 0].min(axis=0) - 2.0, geometry.bboxes[:, 1].max(axis=0) + 2.0
+        points = rng.uniform(lower, upper, (200, 3))
+        # the pruned query matches all pairs exactly, and dense samples of the openings up to their spacing
+        field = GateDistanceField(geometry, chunk_size=128)
+        distances, gate_indices = field.query(points)
+        all_pairs = np.stack([field.get_exact_distances(points, np.full(len(points), i)) for i in range(len(geometry))], axis=1)
+        assert np.array_equal(distances, all_pairs.min(axis=1))
+        assert np.array_equal(distances, all_pairs[np.arange(len(points)), gate_indices])
+        assert np.allclose(distances, get_brute_force_distances(geometry, points), atol=0.05)
+        assert np.array_equal(get_gate_distances(track, points), distances)
+
+        # in front of an opening the distance is the plane distance
+        for i in np.flatnonzero(geometry.num_vertices > 0)[:3]:
+            point = geometry.centers[i] + 0.01 * geometry.normals[i]
+            assert np.isclose(field.get_exact_distances(point[None], np.array([i]))[0], 0.01)
+
+    # ball-only tracks, points inside a ball, and tracks without any gate
+    track = get_test_tracks()[0].to_dict()
+    track['orders'] = [name for name in track['orders'] if track[name]['type'] == 'SingleBall']
+    assert track['orders']
+    geometry = get_gate_geometry(track)
+    points = np.concatenate((geometry.centers, rng.uniform(-20, 20, (200, 3))))
+    distances = get_gate_distances(geometry, points)
+    assert np.all(distances[:len(geometry)] == 0.0)
+    assert np.allclose(distances, get_brute_force_distances(geometry, points))
+    track['orders'] = []
+    distances = get_gate_distances(track, points)
+    assert np.all(np.isinf(distances)) and len(get_gate_distances(track, np.zeros((0, 3)))) == 0
+    print("gate distance field matches the brute-force distances")
+
+def get_random_params(num_gates, rng, extent=200.0):
+    # many gates of every type, scattered and turned at random
+    types = [GATE_TYPES[i] for i in rng.integers(0, len(GATE_TYPES), num_gates)]
+    params = {key: np.full(num_gates, np.nan) for key in PARAM_KEYS}
+    for key in ('radius', 'width', 'height', 'side'):
+        params[key] = rng.uniform(0.5, 2.0, num_gates)
+    for key in ('margin', 'marginW', 'marginH'):
+        params[key] = rng.uniform(0.0, 0.3, num_gates)
+    rpy = rng.uniform(-180, 180, (num_gates, 3))
+    rpy[np.array(types) == 'SingleBall'] = 0.0
+    return GateParams([f'Gate{i}' for i in range(num_gates)], types, rng.uniform(-extent, extent, (num_gates, 3)), rpy, params)
+
+def test_distance_field_scaling():
+    rng = np.random.default_rng(1)
+    geometry = get_gate_geometry(get_random_params(3000, rng))
+    points = rng.uniform(-220, 220, (300, 3))
+    field = GateDistanceField(geometry, chunk_size=100)
+    distances, gate_indices = field.query(points)
+    all_pairs = np.full((len(points), len(geometry)), np.inf)
+    for start in range(0, len(geometry), 200):
+        gates = np.arange(start, min(start + 200, len(geometry)))
+        all_pairs[:, gates] = field.get_exact_distances(np.repeat(points, len(gates), axis=0),
+                                                        np.tile(gates, len(points))).reshape(len(points), -1)
+    assert np.array_equal(distances, all_pairs.min(axis=1))
+    assert np.array_equal(distances, all_pairs[np.arange(len(points)), gate_indices])
+
+    # the query memory does not grow with the number of gates, a dense chunk would take 8 * 4096 * 20000 bytes
+    geometry = get_gate_geometry(get_random_params(20000, rng, extent=1000.0))
+    field = GateDistanceField(geometry, chunk_size=4096)
+    points = rng.uniform(-1000, 1000, (8192, 3))
+    tracemalloc.start()
+    try:
+        distances = field.query(points)[0]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 8 * 4096 * 20000 // 10, peak
+    sample = rng.choice(len(points), 20, replace=False)
+    all_pairs = np.stack([field.get_exact_distances(np.repeat(points[i:i+1], len(geometry), axis=0), np.arange(len(geometry)))
+                          for i in sample])
+    assert np.array_equal(distances[sample], all_pairs.min(axis=1))
+    print("gate distance field stays exact and bounded for many gates")
+
+if __name__ == "__main__":
+    test_gate_geometry()
+    test_distance_field()
+    test_distance_field_scaling()
@@ -0,0 +1,130 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from run_togt_planner.RaceGenerator.GateStore import GateStore, COLUMN_KEYS
+from yaml_emitter_test import TRACK_PATH, get_test_tracks, load_track
+
+def check_store(store, expected):
+    # every per-gate list and the row index agree with the columns, rows past the end are cleared
+    assert len(store) == len(store.gate_names) == len(store.names) == len(expected)
+    assert store.rows == {gate_name: i for i, gate_name in enumerate(store.gate_names)}
+    assert np.all(np.isnan(store.param_data[len(store):]))
+    for gate_name, data in expected.items():
+        view = store.get(gate_name)
+        assert view.to_dict() == data, gate_name
+        assert store.names[view.index] == data.get('name')
+
+def test_swap_remove():
+    for race in get_test_tracks()[:3] + [load_track(os.path.join(TRACK_PATH, 'figure8.yaml'), fast=False)]:
+        store = race.gates
+        expected = {gate_name: store.get(gate_name).to_dict() for gate_name in store.gate_names}
+        assert len(store) >= 3
+        check_store(store, expected)
+
+        # the last row moves into the gap of a middle gate, with its name
+        middle, last = store.gate_names[1], store.gate_names[-1]
+        columns = {key: getattr(store, key)[len(store) - 1].copy() for key in COLUMN_KEYS}
+        store.remove(middle)
+        del expected[middle]
+        assert store.gate_names[1] == last and store.rows[last] == 1
+        assert all(np.array_equal(getattr(store, key)[1], columns[key], equal_nan=True) for key in COLUMN_KEYS)
+        check_store(store, expected)
+
+        # the last and the first gate, then a new gate in the freed rows
+        for gate_name in (store.gate_names[-1], store.gate_names[0]):
+            store.remove(gate_name)
+            del expected[gate_name]
+            check_store(store, expected)
+        gate_name = next(iter(expected))
+        store.append('added', store.get(gate_name))
+        expected['added'] = expected[gate_name]
+        check_store(store, expected)
+
+        # removing every gate leaves an empty store
+        for gate_name in list(expected):
+            store.remove(gate_name)
+            del expected[gate_name]
+            check_store(store, expected)
+        assert len(store) == 0 and store.rows == {}
+
+    # a removed track gate disappears from orders, the others keep their order
+    race = get_test_tracks()[0]
+    orders = list(race.orders)
+    dicts = race.to_dict()
+    race.remove_gate(orders[1])
+    assert race.orders == orders[:1] + orders[2:]
+    track = race.to_dict()
+    assert all(track[gate_name] == dicts[gate_name] for gate_name in race.orders)
+    try:
+        race.gates.remove(orders[1])
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+
+    # growing past the capacity keeps the filled rows
+    store = GateStore(capacity=1)
+    gates = [view for view in get_test_tracks()[0].gates]
+    for i, view in enumerate(gates):
+        store.append(f"g{i}", view)
+    check_store(store, {f"g{i}": view.to_dict() for i, view in enumerate(gates)})
+    print("gate store keeps its rows consistent when gates are removed")
+
+def test_gate_views():
+    race = get_test_tracks()[0]
+    orders = list(race.orders)
+    first, middle, last = orders[0], orders[1], orders[-1]
+    views = {gate_name: race.get_gate(gate_name) for gate_name in orders}
+    dicts = {gate_name: view.to_dict() for gate_name, view in views.items()}
+
+    # the last gate moves into the row of a removed one, its view follows it, the removed one raises
+    race.remove_gate(middle)
+    assert race.gates.rows[last] == 1 and views[last].index == 1 and views[last].to_dict() == dicts[last]
+    assert all(views[gate_name].to_dict() == dicts[gate_name] for gate_name in race.orders)
+    try:
+        views[middle].position
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+
+    # inserting and moving change the race order, not the rows the views point to
+    race.insert_gate(1, views[first], 'copy')
+    assert race.orders[:3] == [first, 'copy', orders[2]] and race.get_gate('copy').to_dict() == dicts[first]
+    race.move_gate(last, 0)
+    assert race.orders[0] == last and race.orders[1:3] == [first, 'copy']
+    assert all(views[gate_name].to_dict() == dicts[gate_name] for gate_name in race.orders if gate_name != 'copy')
+    try:
+        race.insert_gate(0, views[first], 'copy')
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+
+    # a replaced gate keeps its row, old views see the new values
+    race.replace_gate(first, views[last])
+    assert views[first].to_dict() == dicts[last] and race.orders.index(first) == 1
+    views[first].position = [1, 2.5, 3]
+    assert race.to_dict()[first]['position'] == [1, 2.5, 3] and views[last].to_dict() == dicts[last]
+
+    # the inserted copy does not depend on the gate it was copied from
+    copied = race.get_gate('copy')
+    race.remove_gate(first)
+    assert copied.to_dict() == dicts[first] and repr(copied).startswith("GateView(copy,")
+
+    # after set_columns the views find their gate by name again, after a clear they raise
+    view = race.get_gate('copy')
+    columns, gate_names, names = race.gates.get_columns(), list(race.gates.gate_names), list(race.gates.names)
+    race.gates.set_columns(gate_names, names, {key: values.copy() for key, values in columns.items()})
+    assert view.to_dict() == dicts[first]
+    race.clear_gates()
+    try:
+        view.to_dict()
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+    print("gate views follow their gate by name")
+
+if __name__ == "__main__":
+    test_swap_remove()
+    test_gate_views()
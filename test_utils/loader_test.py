@@ -0,0 +1,134 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import yaml
+from run_togt_planner.RaceVisualizer import loader
+from run_togt_planner.RaceVisualizer.loader import (TRAJ_COLUMNS, PLOT_COLUMNS, get_cache_entries, load_trajectory,
+                                                    read_trajectory_csv, load_yaml, clear_yaml_cache)
+
+def write_trajectory(traj_file, num_rows=1000, offset=0.0):
+    data = np.arange(num_rows * len(TRAJ_COLUMNS), dtype=float).reshape(num_rows, len(TRAJ_COLUMNS)) / 7 + offset
+    np.savetxt(traj_file, data, delimiter=',', header=','.join(TRAJ_COLUMNS), comments='')
+    return data
+
+def test_trajectory_cache():
+    with tempfile.TemporaryDirectory() as save_dir:
+        cache_dir = os.path.join(save_dir, 'cache')
+        traj_file = os.path.join(save_dir, 'traj.csv')
+        data = write_trajectory(traj_file)
+
+        # only the requested columns are parsed and cached, at the requested dtype
+        plot_data = load_trajectory(traj_file, columns=PLOT_COLUMNS, dtype=np.float32, cache_dir=cache_dir)
+        assert list(plot_data) == ['t', 'p_x', 'p_y', 'p_z', 'v_x', 'v_y', 'v_z']
+        assert isinstance(plot_data['t'], np.memmap) and plot_data['t'].dtype == np.float32
+        assert np.array_equal(plot_data['v_z'], data[:, 10].astype(np.float32))
+        cache_path = get_cache_entries(cache_dir)[0][2]
+        assert sorted(os.listdir(cache_path)) == sorted([name + '.float32.npy' for name in plot_data] + ['meta.json'])
+
+        # the cached columns are memory-mapped and equal to the parsed csv, missing ones are added to the entry
+        first = load_trajectory(traj_file, cache_dir=cache_dir)
+        second = load_trajectory(traj_file, columns=['t', 'p_*'], cache_dir=cache_dir)
+        assert isinstance(second['p_x'], np.memmap) and list(second) == ['t', 'p_x', 'p_y', 'p_z']
+        for i, name in enumerate(TRAJ_COLUMNS):
+            assert np.array_equal(first[name], data[:, i])
+        assert np.array_equal(load_trajectory(traj_file, columns=['v_*'], use_cache=False)['v_y'],
+                              read_trajectory_csv(traj_file)['v_y'])
+        assert load_trajectory(traj_file, dtype=np.float32, cache_dir=cache_dir)['u_1'].dtype == np.float32
+        assert len(get_cache_entries(cache_dir)) == 1 and len(os.listdir(cache_path)) == 2 * len(TRAJ_COLUMNS) + 1
+
+        # a rewritten file replaces its old entry instead of adding one per planner run
+        for i in range(3):
+            time.sleep(0.01)
+            data = write_trajectory(traj_file, offset=i + 1.0)
+            assert np.array_equal(load_trajectory(traj_file, cache_dir=cache_dir)['u_4'], data[:, -1])
+        assert len(get_cache_entries(cache_dir)) == 1
+
+        # beyond max_cache_size the least recently used entries of other files go
+        traj_files = [os.path.join(save_dir, f'traj_{i}.csv') for i in range(4)]
+        for file_name in traj_files:
+            write_trajectory(file_name)
+        entry_size = get_cache_entries(cache_dir)[0][1]
+        for file_name in traj_files:
+            time.sleep(0.01)
+            load_trajectory(file_name, cache_dir=cache_dir, max_cache_size=3 * entry_size + entry_size // 2)
+        sources = sorted(source for _, _, _, source in get_cache_entries(cache_dir))
+        assert sources == [os.path.abspath(file_name) for file_name in traj_files[1:]]
+    print("trajectory cache entries are reused and bounded")
+
+def test_read_csv():
+    # the preallocated output across chunk boundaries, with blank lines and without a final newline
+    with tempfile.TemporaryDirectory() as save_dir:
+        traj_file = os.path.join(save_dir, 'traj.csv')
+        data = write_trajectory(traj_file, num_rows=250)
+        for chunk_size in (1, 7, 250, 1000):
+            columns = read_trajectory_csv(traj_file, chunk_size=chunk_size)
+            assert all(np.array_equal(columns[name], data[:, i]) for i, name in enumerate(TRAJ_COLUMNS))
+            assert all(values.flags['C_CONTIGUOUS'] for values in columns.values())
+        with open(traj_file) as f:
+            text = f.read()
+        with open(traj_file, 'w') as f:
+            f.write(text.rstrip('\n') + '\n\n\n')
+        assert len(read_trajectory_csv(traj_file, chunk_size=7)['t']) == 250
+        with open(traj_file, 'w') as f:
+            f.write(text.rstrip('\n'))
+        columns = read_trajectory_csv(traj_file, columns=['u_*'], dtype=np.float32, chunk_size=7)
+        assert list(columns) == ['u_1', 'u_2', 'u_3', 'u_4'] and np.array_equal(columns['u_4'], data[:, -1].astype(np.float32))
+        with open(traj_file, 'w') as f:
+            f.write(','.join(TRAJ_COLUMNS) + '\n')
+        assert len(read_trajectory_csv(traj_file)['t']) == 0
+    print("csv columns are parsed into preallocated arrays")
+
+def test_yaml_cache():
+    with tempfile.TemporaryDirectory() as save_dir:
+        yaml_file = os.path.join(save_dir, 'track.yaml')
+        with open(yaml_file, 'w') as f:
+            f.write("orders: [Gate1]\nGate1: {position: [1.0, 2.0, 3.0]}\n")
+        clear_yaml_cache()
+
+        # hits are not parsed again, every caller gets its own copy
+        parse_count = [0]
+        safe_load = yaml.safe_load
+        def counting_load(stream):
+            parse_count[0] += 1
+            return safe_load(stream)
+        loader.yaml.safe_load = counting_load
+        try:
+            first = load_yaml(yaml_file)
+            first['Gate1']['position'][0] = -1.0
+            first['orders'].append('Gate2')
+            second = load_yaml(yaml_file)
+            assert parse_count[0] == 1 and second is not first
+            assert second == {'orders': ['Gate1'], 'Gate1': {'position': [1.0, 2.0, 3.0]}}
+
+            # a rewritten file is parsed again and replaces its stale entry
+            mtime_ns = os.stat(yaml_file).st_mtime_ns
+            with open(yaml_file, 'w') as f:
+                f.write("orders: [Gate2]\n")
+            os.utime(yaml_file, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+            assert load_yaml(yaml_file) == {'orders': ['Gate2']} and parse_count[0] == 2
+            assert [key[0] for key in loader._yaml_cache].count(os.path.abspath(yaml_file)) == 1
+
+            # the least recently used files go beyond YAML_CACHE_SIZE
+            yaml_files = [os.path.join(save_dir, f'{i}.yaml') for i in range(loader.YAML_CACHE_SIZE + 1)]
+            for i, file_name in enumerate(yaml_files):
+                with open(file_name, 'w') as f:
+                    f.write(f"value: {i}\n")
+                load_yaml(file_name)
+            assert len(loader._yaml_cache) == loader.YAML_CACHE_SIZE
+            parse_count[0] = 0
+            assert load_yaml(yaml_files[-1]) == {'value': loader.YAML_CACHE_SIZE} and parse_count[0] == 0
+            assert load_yaml(yaml_file) == {'orders': ['Gate2']} and parse_count[0] == 1
+        finally:
+            loader.yaml.safe_load = safe_load
+            clear_yaml_cache()
+    print("yaml cache hits are copies and follow the file")
+
+if __name__ == "__main__":
+    test_yaml_cache()
+    test_read_csv()
+    test_trajectory_cache()
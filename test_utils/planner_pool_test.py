@@ -0,0 +1,139 @@
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from run_togt_planner.RacePlanner.PlannerCache import PlannerCache, hash_track
+from run_togt_planner.RacePlanner.PlannerPool import PlannerJob, PlannerPool
+from yaml_emitter_test import TRACK_PATH
+
+STAND_IN = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stand_in_planner.py')]
+
+def make_jobs(save_dir, names):
+    jobs = []
+    for name in names:
+        track_file = os.path.join(save_dir, 'racetrack', name + '.yaml')
+        shutil.copy(os.path.join(TRACK_PATH, 'example.yaml'), track_file)
+        jobs.append(PlannerJob(name, 'parameters/cpc', 'cpc', track_file,
+                               os.path.join(save_dir, 'trajectory', name + '.csv'),
+                               os.path.join(save_dir, 'trajectory', name + '.yaml')))
+    return jobs
+
+@contextlib.contextmanager
+def set_env(key, value):
+    # the planners inherit the environment, it is restored for the tests that follow
+    old = os.environ.get(key)
+    os.environ[key] = value
+    try:
+        yield
+    finally:
+        if old is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = old
+
+def test_pool():
+    with set_env('STAND_IN_PLANNER_SLEEP', '30'), tempfile.TemporaryDirectory() as save_dir:
+        os.makedirs(os.path.join(save_dir, 'racetrack'))
+        jobs = make_jobs(save_dir, ['ok_1', 'ok_2', 'fail', 'flaky', 'slow'])
+        jobs[4].timeout = 1.0
+        with PlannerPool(STAND_IN, num_workers=2, retries=1) as pool:
+            ok_1, ok_2, fail, flaky, slow = pool.run(jobs)
+        assert ok_1.success and ok_2.success and os.path.isfile(ok_1.traj_file) and 'TrajExtremum' in ok_1.stdout
+        assert not fail.success and fail.attempts == 2 and 'Failed to plan' in fail.error
+        assert flaky.success and flaky.attempts == 2
+        assert not slow.success and slow.timed_out and slow.attempts == 2
+        print(ok_1, fail, flaky, slow)
+
+        # cancel() kills the running planners and skips the pending jobs
+        jobs = make_jobs(save_dir, [f'slow_{i}' for i in range(6)])
+        pool = PlannerPool(STAND_IN, num_workers=2)
+        futures = [pool.submit(job) for job in jobs]
+        time.sleep(1.0)
+        start = time.perf_counter()
+        pool.cancel()
+        results = [future.result() for future in futures]
+        assert all(result.cancelled for result in results)
+        assert sum(result.attempts for result in results) == 2
+        print(f"cancelled {len(results)} jobs in {time.perf_counter() - start:.2f}s")
+
+        # the pool runs the jobs submitted after a cancel, a second cancel only stops those
+        results = pool.run(make_jobs(save_dir, ['ok_4', 'ok_5']))
+        assert all(result.success and not result.cancelled and result.attempts == 1 for result in results)
+        futures = [pool.submit(job) for job in make_jobs(save_dir, ['slow_6', 'slow_7'])]
+        time.sleep(1.0)
+        pool.close(cancel=True)
+        assert all(future.result().cancelled for future in futures)
+
+        # missing executable
+        with PlannerPool(os.path.join(save_dir, 'missing')) as pool:
+            result = pool.run(make_jobs(save_dir, ['ok_3']))[0]
+        assert not result.success and result.returncode is None and result.attempts == 1
+    print("planner pool results are as expected")
+
+def test_cache():
+    with tempfile.TemporaryDirectory() as save_dir:
+        os.makedirs(os.path.join(save_dir, 'racetrack'))
+        config_path = os.path.join(save_dir, 'config')
+        os.makedirs(config_path)
+        with open(os.path.join(config_path, 'cpc_setups.yaml'), 'w') as f:
+            f.write("mass: 1.0\n")
+        job = make_jobs(save_dir, ['cached'])[0]
+        job.config_path = config_path
+        cache = PlannerCache(os.path.join(save_dir, 'cache'))
+
+        def run():
+            with PlannerPool(STAND_IN, cache=cache) as pool:
+                return pool.run([job])[0]
+
+        first, second = run(), run()
+        assert first.success and not first.cached and second.cached and second.stdout == first.stdout
+        assert os.path.isfile(second.traj_file) and second.attempts == 0
+
+        # formatting and comments are not part of the key, gate values and config files are
+        with open(job.track_file) as f:
+            track_text = f.read()
+        with open(job.track_file, 'w') as f:
+            f.write("# reformatted\n" + track_text.replace('\n\n', '\n').replace('radius: 0.5', 'radius: 0.50'))
+        assert run().cached
+        with open(job.track_file, 'w') as f:
+            f.write(track_text.replace('margin: 0.5', 'margin: 0.6', 1))
+        assert not run().cached
+        with open(os.path.join(config_path, 'cpc_setups.yaml'), 'w') as f:
+            f.write("mass: 1.1\n")
+        assert not run().cached
+        assert run().cached
+        assert len(cache.get_entries()) == 3
+
+        # least recently used entries are evicted beyond max_size
+        cache.max_size = max(size for _, size, _ in cache.get_entries())
+        cache.evict()
+        assert len(cache.get_entries()) == 1 and run().cached
+
+        # restored outputs get the mode of a plain open()
+        old_umask = os.umask(0o022)
+        try:
+            os.remove(job.traj_file)
+            assert run().cached and os.stat(job.traj_file).st_mode & 0o777 == 0o644
+        finally:
+            os.umask(old_umask)
+
+        # keys yaml loads into dates and files that are not utf-8 still hash
+        with open(job.track_file, 'w') as f:
+            f.write("created: 2024-01-01\n" + track_text)
+        assert hash_track(job.track_file) != hash_track(os.path.join(TRACK_PATH, 'example.yaml'))
+        assert run().success
+        with open(job.track_file, 'wb') as f:
+            f.write(b"# \xff\xfe\n" + track_text.encode())
+        assert len(hash_track(job.track_file)) == 64
+        result = run()
+        assert not result.cached and result.attempts == 1
+    print("planner cache hits and misses are as expected")
+
+if __name__ == "__main__":
+    test_pool()
+    test_cache()
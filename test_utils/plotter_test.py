@@ -0,0 +1,200 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.image as mimage
+import matplotlib.pyplot as plt
+from run_togt_planner.RaceVisualizer.RacePlotter import RacePlotter, get_fig_file
+from run_togt_planner.RaceVisualizer.animation import export_playback, get_frame_times
+from run_togt_planner.RaceVisualizer.batch import find_render_jobs, render_batch
+from run_togt_planner.RaceVisualizer.loader import TRAJ_COLUMNS
+from yaml_emitter_test import TRACK_PATH
+
+# set_xlim on the equal-aspect 2d axes logs that the limits are adjusted
+logging.getLogger('matplotlib').setLevel(logging.ERROR)
+
+TRACK_FILE = os.path.join(TRACK_PATH, 'example.yaml')
+PLOT_KWARGS = {'draw_tube': True, 'radius': 0.6, 'margin': 0, 'alpha': 0.3}
+
+def write_lap(traj_file, warp=1.0, num_rows=2000):
+    # the same closed loop for every warp, flown with a different timing
+    t = np.linspace(0.0, 10.0, num_rows)
+    angle = 2 * np.pi * (t / 10.0)**warp
+    ps = np.stack([5 * np.cos(angle), 5 * np.sin(angle), 1 + 0.5 * np.sin(2 * angle)], axis=1)
+    data = np.zeros((num_rows, len(TRAJ_COLUMNS)))
+    data[:, 0], data[:, 1:4], data[:, 4], data[:, 8:11] = t, ps, 1.0, np.gradient(ps, t, axis=0)
+    np.savetxt(traj_file, data, delimiter=',', header=','.join(TRAJ_COLUMNS), comments='')
+
+def render(ax):
+    ax.figure.canvas.draw()
+    return np.asarray(ax.figure.canvas.buffer_rgba()).copy()
+
+def test_update_in_place():
+    # updating a figure moves the tubes in place and draws the same pixels as a new figure of the trajectory
+    with tempfile.TemporaryDirectory() as save_dir:
+        traj_a, traj_b = os.path.join(save_dir, 'a.csv'), os.path.join(save_dir, 'b.csv')
+        write_lap(traj_a)
+        write_lap(traj_b, warp=1.3)
+        for dim in ('2d', '3d'):
+            for sig_tube in (False, True):
+                updated = RacePlotter(traj_a, TRACK_FILE, use_cache=False)
+                fresh = RacePlotter(traj_b, TRACK_FILE, use_cache=False)
+                if dim == '2d':
+                    updated.plot(sig_tube=sig_tube, **PLOT_KWARGS)
+                    tube, collections = updated.tubes_2d[0][0], list(updated.ax_2d.collections)
+                    updated.set_trajectory(traj_b)
+                    updated.update_plot()
+                    fresh.plot(sig_tube=sig_tube, **PLOT_KWARGS)
+                    axes = [updated.ax_2d, fresh.ax_2d]
+                    assert updated.tubes_2d[0][0] is tube and list(updated.ax_2d.collections) == collections
+                else:
+                    updated.plot3d(sig_tube=sig_tube, **PLOT_KWARGS)
+                    tube, collections = updated.tubes_3d[0][0], list(updated.ax_3d.collections)
+                    updated.set_trajectory(traj_b)
+                    updated.update_plot3d()
+                    fresh.plot3d(sig_tube=sig_tube, **PLOT_KWARGS)
+                    axes = [updated.ax_3d, fresh.ax_3d]
+                    assert updated.tubes_3d[0][0] is tube and list(updated.ax_3d.collections) == collections
+                # the updated figure keeps the limits of its first trajectory
+                for ax in axes:
+                    ax.set_xlim(-7, 7)
+                    ax.set_ylim(-7, 7)
+                    if dim == '3d':
+                        ax.set_zlim(-1, 3)
+                assert np.array_equal(render(axes[0]), render(axes[1])), f"{dim} sig_tube={sig_tube} differs"
+                plt.close('all')
+    print("updated figures match new figures")
+
+def test_render_jobs():
+    with tempfile.TemporaryDirectory() as save_dir:
+        traj_dir, fig_dir = os.path.join(save_dir, 'trajectory'), os.path.join(save_dir, 'figure')
+        os.makedirs(traj_dir)
+        write_lap(os.path.join(traj_dir, 'lap.csv'))
+        with open(TRACK_FILE) as f:
+            track_text = f.read()
+        with open(os.path.join(save_dir, 'lap.yaml'), 'w') as f:
+            f.write(track_text)
+
+        # <name>.yaml next to the trajectory is its waypoint file, unless it is the track itself
+        assert find_render_jobs(save_dir, traj_dir, fig_dir)[0].wpt_path is None
+        with open(os.path.join(traj_dir, 'lap.yaml'), 'w') as f:
+            f.write("waypoints: [[5.0, 0.0, 1.0], [-5.0, 0.0, 1.0]]\ntimestamps: [0.0, 5.0]\n")
+        assert find_render_jobs(save_dir, traj_dir, fig_dir)[0].wpt_path == os.path.join(traj_dir, 'lap.yaml')
+
+        # with the track as waypoint file the sigmoid tube failed to read the waypoints
+        with open(os.path.join(traj_dir, 'lap.yaml'), 'w') as f:
+            f.write(track_text)
+        jobs = find_render_jobs(traj_dir, traj_dir, fig_dir, plot_kwargs={**PLOT_KWARGS, 'sig_tube': True}, dpi=50)
+        assert len(jobs) == 1 and jobs[0].wpt_path is None
+        # rendering in this process keeps its backend and the figures it has open
+        plt.switch_backend('svg')
+        try:
+            fig = plt.figure()
+            result = render_batch(jobs, num_workers=1, print_output=False)[0]
+            assert matplotlib.get_backend() == 'svg' and plt.get_fignums() == [fig.number]
+        finally:
+            plt.close('all')
+            plt.switch_backend('Agg')
+        assert result.success, result.error
+        assert all(os.path.isfile(fig_file) for fig_file in result.fig_files)
+    print("render jobs pair tracks, trajectories and waypoints")
+
+def test_rasterized_save():
+    # vector formats get the scatter and tubes as images at the save dpi, gates and axes stay vector
+    assert get_fig_file('lap') == 'lap.png' and get_fig_file('lap.pdf') == 'lap.pdf' and get_fig_file('lap.v2') == 'lap.v2.png'
+    with tempfile.TemporaryDirectory() as save_dir:
+        traj_file = os.path.join(save_dir, 'lap.csv')
+        write_lap(traj_file)
+        plotter = RacePlotter(traj_file, TRACK_FILE, use_cache=False)
+        plotter.plot(**PLOT_KWARGS)
+        plotter.plot3d(**PLOT_KWARGS)
+        for save_fig, ax in ((plotter.save_2d_fig, plotter.ax_2d), (plotter.save_3d_fig, plotter.ax_3d)):
+            fig = ax.figure
+            artists = plotter.get_heavy_artists(fig)
+            assert len(artists) == 2
+            svgs = {}
+            for rasterize in (False, None, True):
+                save_fig(save_dir, 'lap.svg', dpi=50, rasterize=rasterize)
+                with open(os.path.join(save_dir, 'lap.svg')) as f:
+                    svgs[rasterize] = f.read()
+                # the artists are restored after the save
+                assert not any(artist.get_rasterized() for artist in artists)
+            # the colorbar is an image either way, the heavy artists add one more and drop their paths
+            assert svgs[None].count('<image') == svgs[True].count('<image') == svgs[False].count('<image') + 1
+            assert svgs[None].count('<path') < svgs[False].count('<path') // 4
+            assert len(svgs[None]) < len(svgs[False]) // 10
+            save_fig(save_dir, 'lap', dpi=50)
+            assert os.path.isfile(os.path.join(save_dir, 'lap.png'))
+            assert not any(artist.get_rasterized() for artist in artists)
+        plt.close('all')
+    print("vector exports rasterize only the heavy artists")
+
+def test_playback():
+    # png sequences need no ffmpeg, the figure keeps its dpi and artists after the playback
+    with tempfile.TemporaryDirectory() as save_dir:
+        traj_file = os.path.join(save_dir, 'lap.csv')
+        write_lap(traj_file)
+        plotter = RacePlotter(traj_file, TRACK_FILE, use_cache=False)
+        plotter.plot(**PLOT_KWARGS)
+        plotter.plot3d(**PLOT_KWARGS)
+        for dim, ax in (('2d', plotter.ax_2d), ('3d', plotter.ax_3d)):
+            fig = ax.figure
+            fig_dpi, artists = fig.get_dpi(), list(ax.get_children())
+            frame_path = os.path.join(save_dir, dim)
+            stats = plotter.animate(frame_path, 'lap', dim=dim, fps=1, speed=5.0, dpi=40, print_output=False)
+            frame_files = sorted(os.listdir(frame_path))
+            assert stats['frames'] == len(get_frame_times(0.0, 10.0, 1, 5.0)) == len(frame_files) == 3
+            assert frame_files[0] == 'lap_00000.png'
+            frames = [mimage.imread(os.path.join(frame_path, file_name)) for file_name in frame_files]
+            width, height = fig.get_size_inches() * 40
+            assert frames[0].shape[:2] == (round(height), round(width))
+            assert not np.array_equal(frames[0], frames[-1])
+            assert fig.get_dpi() == fig_dpi and list(ax.get_children()) == artists
+
+        # a video without ffmpeg fails before the first frame and still restores the figure
+        if shutil.which(matplotlib.rcParams['animation.ffmpeg_path']) is None:
+            fig, artists = plotter.ax_2d.figure, list(plotter.ax_2d.get_children())
+            try:
+                export_playback(plotter.ax_2d, plotter.ts, plotter.ps, plotter.vs, os.path.join(save_dir, 'lap.mp4'), dpi=40)
+                assert False, "missing ffmpeg was not reported"
+            except RuntimeError:
+                pass
+            assert fig.get_dpi() == fig_dpi and list(plotter.ax_2d.get_children()) == artists
+        plt.close('all')
+    print("playback frames are written without changing the figure")
+
+def test_tube_lod():
+    # every LOD ring is drawn, plot_surface and update_plot3d do not stride them down again, within the budget
+    with tempfile.TemporaryDirectory() as save_dir:
+        traj_a, traj_b = os.path.join(save_dir, 'a.csv'), os.path.join(save_dir, 'b.csv')
+        write_lap(traj_a, num_rows=20000)
+        write_lap(traj_b, warp=1.3, num_rows=20000)
+        plotter = RacePlotter(traj_a, TRACK_FILE, num_samples=20000, use_cache=False)
+        plotter.plot3d(**{**PLOT_KWARGS, 'draw_tube': False})
+        plotter.plot3d_tube(tube_radius=0.6, alpha=0.3, lod=True, lod_dpi=300, max_polygons=3000)
+        for update in (False, True):
+            if update:
+                plotter.set_trajectory(traj_b)
+                plotter.update_plot3d()
+            tube, tube_kwargs = plotter.tubes_3d[0]
+            ts, _, num_theta = plotter.get_tube3d_samples(**tube_kwargs)
+            plotter.ax_3d.figure.canvas.draw()
+            num_polygons = len(tube.get_paths())
+            assert len(ts) > 50 and num_polygons == (len(ts) - 1) * (num_theta - 1) <= 3000
+            assert len(tube.get_facecolor()) == num_polygons
+        plt.close('all')
+    print("tube LOD rings are drawn without striding")
+
+if __name__ == "__main__":
+    test_update_in_place()
+    test_tube_lod()
+    test_render_jobs()
+    test_rasterized_save()
+    test_playback()
@@ -0,0 +1,126 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from run_togt_planner.RaceGenerator.RandomRace import (PoissonDiskSampler, create_random_racetrack, generate_random_racetracks,
+                                                      spawn_seeds, get_crowded_tracks)
+
+BALL_KWARGS = {'radius': 0.5, 'margin': 0.0}
+
+def get_min_distance(points):
+    distances = np.linalg.norm(points[:, None] - points[None], axis=2)
+    return np.min(distances[~np.eye(len(points), dtype=bool)])
+
+def test_poisson_sampler():
+    lower, upper = np.array([-8.0, -8.0, 0.0]), np.array([8.0, 8.0, 16.0])
+    fixed_points = np.array([[0.0, 0.0, 0.0], [0.5, 0.0, 0.0]])
+    sampler = PoissonDiskSampler(lower, upper, min_distance=2.0, seed=0)
+    for _ in range(50):
+        points = sampler.sample(40, fixed_points=fixed_points)
+        # separated from each other and from the fixed points, which may be close to each other
+        assert points.shape == (40, 3)
+        assert get_min_distance(points) >= 2.0
+        assert np.min(np.linalg.norm(points[:, None] - fixed_points[None], axis=2)) >= 2.0
+        assert np.all(points >= lower) and np.all(points <= upper)
+
+    # the same seed gives the same points, a new draw of the sampler does not
+    points = PoissonDiskSampler(lower, upper, 2.0, seed=7).sample(20)
+    assert np.array_equal(points, PoissonDiskSampler(lower, upper, 2.0, seed=7).sample(20))
+    sampler = PoissonDiskSampler(lower, upper, 2.0, seed=7)
+    assert not np.array_equal(sampler.sample(20), sampler.sample(20))
+
+    # dense packings near the capacity of a flat box, the grid clamps points on the upper faces
+    points = PoissonDiskSampler([0.0, 0.0, 1.0], [10.0, 10.0, 1.0], 1.0, seed=1).sample(60)
+    assert get_min_distance(points) >= 1.0 and np.all(points[:, 2] == 1.0)
+
+    # points that cannot fit raise instead of returning a crowded set
+    try:
+        PoissonDiskSampler([0.0, 0.0, 0.0], [1.0, 1.0, 1.0], 1.0, max_attempts=50, seed=0).sample(10)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    for args in (([0.0] * 3, [1.0, -1.0, 1.0], 1.0), ([0.0] * 3, [1.0] * 3, 0.0)):
+        try:
+            PoissonDiskSampler(*args)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    assert PoissonDiskSampler(lower, upper, 2.0).sample(0).shape == (0, 3)
+    print("poisson-disk points keep their distance and bounds")
+
+def test_random_racetrack():
+    init_pos, end_pos = [0.0, 0.0, 1.0], [0.0, 0.0, 1.5]
+    race = create_random_racetrack(12, BALL_KWARGS, min_distance=3.0, init_pos=init_pos, end_pos=end_pos,
+                                   name='rand', seed=3)
+    track = race.to_dict()
+    assert track['orders'] == [f"rand_Gate_{i + 1}" for i in range(12)]
+    positions = np.array([track[name]['position'] for name in track['orders']])
+    assert get_min_distance(positions) >= 3.0
+    assert np.min(np.linalg.norm(positions[:, None] - np.array([init_pos, end_pos])[None], axis=2)) >= 3.0
+    assert np.allclose(track['initState']['pos'], init_pos) and np.allclose(track['endState']['pos'], end_pos)
+
+    # sampled initial and end positions keep the distance to the gates as well
+    race = create_random_racetrack(10, BALL_KWARGS, min_distance=2.0, seed=3)
+    track = race.to_dict()
+    points = np.array([track['initState']['pos'], track['endState']['pos']]
+                      + [track[name]['position'] for name in track['orders']])
+    assert len(track['orders']) == 10 and get_min_distance(points) >= 2.0
+    assert race.to_dict() == create_random_racetrack(10, BALL_KWARGS, min_distance=2.0, seed=3).to_dict()
+    try:
+        create_random_racetrack(0, BALL_KWARGS)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("random race tracks are separated and reproducible")
+
+def get_points(track):
+    return np.array([track['initState']['pos'], track['endState']['pos']] + [track[name]['position'] for name in track['orders']])
+
+def test_random_racetracks():
+    rec_kwargs = {'rpy': [0, 0, 0], 'length': 0, 'midpoints': 0, 'width': 1.0, 'height': 1.0, 'marginW': 0.0, 'marginH': 0.0}
+    kwargs = {'rpy_range': ([-30.0] * 3, [30.0] * 3), 'shape_ranges': {'width': (1.0, 2.0)}, 'min_distance': 2.5}
+
+    # every batch size gives the same tracks, also when dense tracks are redrawn or finished by the grid sampler
+    reference = [race.to_dict() for race in generate_random_racetracks(13, 8, rec_kwargs, 'RectanglePrisma', seed=4, **kwargs)]
+    for batch_size in (1, 5, 13, 64):
+        tracks = [race.to_dict() for race in generate_random_racetracks(13, 8, rec_kwargs, 'RectanglePrisma', seed=4,
+                                                                         batch_size=batch_size, **kwargs)]
+        assert tracks == reference, batch_size
+    dense = [list(generate_random_racetracks(6, 30, BALL_KWARGS, min_distance=3.0, seed=2, batch_size=batch_size))
+             for batch_size in (1, 4)]
+    assert [race.to_dict() for race in dense[0]] == [race.to_dict() for race in dense[1]]
+    for race in dense[0]:
+        assert get_min_distance(get_points(race.to_dict())) >= 3.0
+    for track in reference:
+        assert get_min_distance(get_points(track)) >= 2.5
+
+    # an int seed equals its SeedSequence, spawn_seeds equals spawning the SeedSequence directly
+    by_sequence = [race.to_dict() for race in generate_random_racetracks(13, 8, rec_kwargs, 'RectanglePrisma',
+                                                                          seed=np.random.SeedSequence(4), **kwargs)]
+    assert by_sequence == reference
+    for worker_seed, child in zip(spawn_seeds(9, 3), np.random.SeedSequence(9).spawn(3)):
+        tracks = [race.to_dict() for race in generate_random_racetracks(4, 5, BALL_KWARGS, seed=worker_seed)]
+        assert tracks == [race.to_dict() for race in generate_random_racetracks(4, 5, BALL_KWARGS, seed=child)]
+    worker_tracks = [[get_points(race.to_dict()).tolist() for race in generate_random_racetracks(2, 5, BALL_KWARGS, seed=worker_seed)]
+                     for worker_seed in spawn_seeds(9, 3)]
+    assert worker_tracks[0] != worker_tracks[1] and worker_tracks[1] != worker_tracks[2]
+
+    # a generator seed is advanced, so two calls give different tracks
+    rng = np.random.default_rng(0)
+    first, second = [[race.to_dict()['initState'] for race in generate_random_racetracks(3, 5, BALL_KWARGS, seed=rng)]
+                     for _ in range(2)]
+    assert first != second
+
+    # the separation check compares every pair once and the fixed points
+    positions = np.array([[[0.0, 0.0, 0.0], [3.0, 0.0, 0.0], [0.0, 3.0, 0.0]],
+                          [[0.0, 0.0, 0.0], [3.0, 0.0, 0.0], [2.0, 0.0, 0.0]]])
+    assert list(get_crowded_tracks(positions, 2.5, np.empty((0, 3)))) == [False, True]
+    assert list(get_crowded_tracks(positions, 2.5, np.array([[0.0, 0.0, 2.0]]))) == [True, True]
+    print("bulk random tracks do not depend on the batch size")
+
+if __name__ == "__main__":
+    test_poisson_sampler()
+    test_random_racetrack()
+    test_random_racetracks()
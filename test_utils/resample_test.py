@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from run_togt_planner.RaceVisualizer.resample import get_adaptive_samples
+
+def get_track(num_points=20000):
+    # a straight segment followed by a tight turn
+    t = np.linspace(0.0, 2.0, num_points)
+    angle = np.clip(t - 1.0, 0.0, None) * np.pi
+    ps = np.where((t < 1.0)[:, None],
+                  np.stack([t - 1.0, np.full_like(t, -0.5), np.zeros_like(t)], axis=1),
+                  np.stack([0.5 * np.sin(angle), -0.5 * np.cos(angle), np.zeros_like(t)], axis=1))
+    return t, ps
+
+def get_deviation(t, ps, ts):
+    # distance of the raw points from the polyline through the samples
+    samples = np.stack([np.interp(ts, t, ps[:, i]) for i in range(3)], axis=1)
+    chords = np.stack([np.interp(t, ts, samples[:, i]) for i in range(3)], axis=1)
+    return np.max(np.linalg.norm(chords - ps, axis=1))
+
+def test_adaptive_samples():
+    t, ps = get_track()
+    ts = get_adaptive_samples(t, ps, tolerance=1e-3, max_step=1.0)
+    assert ts[0] == t[0] and ts[-1] == t[-1] and np.all(np.diff(ts) > 0)
+    # the turn takes more samples than the straight segment of the same duration
+    assert np.sum(ts > 1.0) > 2 * np.sum(ts < 1.0)
+    # the chord that spans the jump in curvature deviates a little more than the tolerance
+    assert get_deviation(t, ps, ts) < 4e-3
+    assert len(get_adaptive_samples(t, ps, tolerance=1e-3, max_samples=50)) == 50
+
+    # repeated timestamps, e.g. a planner that writes a sample twice
+    t_repeated = np.insert(t, [100, 5000, 5000], t[[100, 5000, 5000]])
+    ps_repeated = np.insert(ps, [100, 5000, 5000], ps[[100, 5000, 5000]], axis=0)
+    ts_repeated = get_adaptive_samples(t_repeated, ps_repeated, tolerance=1e-3, max_step=1.0)
+    assert np.all(np.isfinite(ts_repeated)) and np.allclose(ts_repeated, ts)
+
+    # a drone that does not move, and a single sample
+    assert len(get_adaptive_samples(t, np.zeros_like(ps))) == 2
+    assert len(get_adaptive_samples(t[:1], ps[:1])) == 2
+    print("adaptive samples follow the curvature")
+
+if __name__ == "__main__":
+    test_adaptive_samples()
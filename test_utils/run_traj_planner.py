@@ -1,39 +1,13 @@
-import subprocess
 import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from run_togt_planner.RaceVisualizer.RacePlotter import RacePlotter
+from run_togt_planner.RacePlanner.PlannerCache import PlannerCache
+from run_togt_planner.RacePlanner.PlannerPool import run_planner
 
 ROOTPATH = os.path.abspath(__file__).split("Run-TOGT-Planner/", 1)[0]
-
-def run_traj_planner(config_path, quad_name, track_path, traj_path, wpt_path):
-    # get the path to c++ program    
-    cpp_program_path = os.path.join(ROOTPATH, 'build', 'planners')
-
-    # make sure the path exists
-    if not os.path.isfile(cpp_program_path):
-        print(f"Error: {cpp_program_path} does not exist.")
-        return
-
-    # construct the command
-    command = [
-        cpp_program_path,  # path to the C++ program
-        config_path,
-        quad_name,
-        track_path,
-        traj_path,
-        wpt_path
-    ]
-
-    # run the command
-    result = subprocess.run(command, capture_output=True, text=True)
-
-    # check if the command was successful
-    if result.returncode != 0:
-        print(f"Error running traj_planner_togt: {result.stderr}")
-    else:
-        print(f"{result.stdout}")
+PLANNER_PATH = os.path.join(ROOTPATH, 'build', 'planners')
 
 if __name__ == "__main__":
     # input parameters
@@ -53,7 +27,7 @@ if __name__ == "__main__":
     wpt_path = os.path.join(ROOTPATH, wpt_path, 'example.yaml')
 
     # use c++ to generate trajectory
-    run_traj_planner(config_path, quad_name, track_path, traj_path, wpt_path)
+    run_planner(PLANNER_PATH, config_path, quad_name, track_path, traj_path, wpt_path, cache=PlannerCache())
 
     togt_plotter = RacePlotter(traj_path, track_path)
     togt_plotter.plot(save_fig=True, fig_name="example", save_path=os.path.join(ROOTPATH, "Run-TOGT-Planner/resources/figure/"))
\ No newline at end of file
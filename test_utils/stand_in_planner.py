@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# stand-in for build/planners with the CLI of traj_planner_togt.cpp, for testing without the C++ build
+# the track file name selects the behaviour: fail*, slow*, flaky* (fails on the first attempt), anything else plans
+import os
+import sys
+import time
+import yaml
+
+TRAJ_COLUMNS = ['t', 'p_x', 'p_y', 'p_z', 'q_w', 'q_x', 'q_y', 'q_z', 'v_x', 'v_y', 'v_z',
+                'w_x', 'w_y', 'w_z', 'u_1', 'u_2', 'u_3', 'u_4']
+
+def main():
+    if len(sys.argv) != 6:
+        print(f"Usage: {sys.argv[0]} <config_path> <quad_name> <track_path> <traj_path> <wpt_path>", file=sys.stderr)
+        return 1
+    config_path, quad_name, track_path, traj_path, wpt_path = sys.argv[1:]
+    track_name = os.path.basename(track_path)
+
+    if track_name.startswith('slow'):
+        time.sleep(float(os.environ.get('STAND_IN_PLANNER_SLEEP', 60)))
+    if track_name.startswith('flaky') and not os.path.exists(traj_path + '.attempt'):
+        open(traj_path + '.attempt', 'w').close()
+        print("Failed to plan trajectory.", file=sys.stderr)
+        return 1
+    if track_name.startswith('fail'):
+        print("Failed to plan trajectory.", file=sys.stderr)
+        return 1
+
+    with open(track_path) as f:
+        track = yaml.safe_load(f)
+    # straight segments of one second from the initial state through the gates to the end state
+    points = [track['initState']['pos']] + [track[name]['position'] for name in track['orders']] + [track['endState']['pos']]
+    with open(traj_path, 'w') as f:
+        f.write(','.join(TRAJ_COLUMNS) + '\n')
+        for i in range(len(points) - 1):
+            for s in (0.0, 0.5):
+                p = [a + s * (b - a) for a, b in zip(points[i], points[i + 1])]
+                v = [b - a for a, b in zip(points[i], points[i + 1])]
+                f.write(','.join(str(x) for x in [i + s] + p + [1.0, 0.0, 0.0, 0.0] + v + [0.0] * 7) + '\n')
+    with open(wpt_path, 'w') as f:
+        yaml.safe_dump({'waypoints': points[1:-1], 'timestamps': list(range(1, len(points) - 1))}, f)
+
+    print(f"TrajExtremum: duration {len(points) - 1}.0")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
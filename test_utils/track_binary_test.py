@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from run_togt_planner.RaceGenerator.GenerationTools import create_state
+from run_togt_planner.RaceGenerator.RaceTrack import RaceTrack
+from run_togt_planner.RaceGenerator.TrackArchive import TrackArchive
+from run_togt_planner.RaceGenerator.TrackExport import save_many
+from yaml_emitter_test import TRACK_PATH, get_test_tracks
+
+def new_track():
+    return RaceTrack(init_state=create_state({'pos': [0.0, 0.0, 0.0]}), end_state=create_state({'pos': [0.0, 0.0, 0.0]}))
+
+def check_roundtrip(race_track, save_dir):
+    # YAML -> NPZ -> YAML gives the same bytes
+    name = race_track.race_name
+    race_track.save_to_yaml(save_dir=save_dir, overwrite=True, save_output=False)
+    race_track.save_to_npz(save_dir=save_dir, overwrite=True, save_output=False)
+    loaded = new_track()
+    loaded.load_from_npz(os.path.join(save_dir, name + '.npz'))
+    assert loaded.race_name == name
+    assert loaded.to_dict() == race_track.to_dict(), f"{name} differs"
+    loaded.race_name = name + '_npz'
+    loaded.save_to_yaml(save_dir=save_dir, overwrite=True, save_output=False)
+    with open(os.path.join(save_dir, name + '.yaml'), 'rb') as f:
+        yaml_bytes = f.read()
+    with open(os.path.join(save_dir, name + '_npz.yaml'), 'rb') as f:
+        assert f.read() == yaml_bytes, f"{name} yaml differs"
+
+def test_roundtrip():
+    with tempfile.TemporaryDirectory() as save_dir:
+        for file_name in sorted(os.listdir(TRACK_PATH)):
+            race = new_track()
+            race.load_from_yaml(os.path.join(TRACK_PATH, file_name))
+            check_roundtrip(race, save_dir)
+        tracks = get_test_tracks()
+        # a removed gate, a gate outside of orders and a gate that appears twice
+        tracks[0].remove_gate('Gate3')
+        tracks[0].orders.remove('Gate2')
+        tracks[0].orders.append('Gate5')
+        for race in tracks:
+            check_roundtrip(race, save_dir)
+    print("npz round trips are lossless")
+
+def test_archive():
+    tracks = get_test_tracks()
+    with tempfile.TemporaryDirectory() as save_dir:
+        archive_file = os.path.join(save_dir, 'tracks.togt')
+        with TrackArchive(archive_file, 'w') as archive:
+            names = [archive.append(race) for race in tracks]
+            # taken names get a _N suffix like save_to_yaml
+            assert archive.append(tracks[0]) == tracks[0].race_name + '_1'
+        with TrackArchive(archive_file, 'a') as archive:
+            archive.append(tracks[1], name=names[0], overwrite=True)
+        with TrackArchive(archive_file) as archive:
+            assert len(archive) == len(tracks) + 1
+            assert archive.load(names[0]).to_dict() == tracks[1].to_dict()
+            for name, race in zip(names[1:], tracks[1:]):
+                assert archive.load(name).to_dict() == race.to_dict(), f"{name} differs"
+
+        # an archive that was not closed is recovered from its records
+        archive = TrackArchive(archive_file, 'a')
+        archive.append(tracks[2], name='unclosed')
+        archive.file.close()
+        with TrackArchive(archive_file) as archive:
+            assert archive.load('unclosed').to_dict() == tracks[2].to_dict()
+    print("archive tracks load back unchanged")
+
+def get_mode(file_name):
+    return os.stat(file_name).st_mode & 0o777
+
+def test_file_mode():
+    # atomic writes get the mode of a plain open(), or keep the mode of the file they replace
+    race = get_test_tracks()[0]
+    old_umask = os.umask(0o022)
+    try:
+        with tempfile.TemporaryDirectory() as save_dir:
+            race.save_to_yaml(save_dir=save_dir, overwrite=True, save_output=False)
+            race.save_to_npz(save_dir=save_dir, overwrite=True, save_output=False)
+            results = save_many(get_test_tracks(), save_dir=os.path.join(save_dir, 'many'), num_workers=1, save_output=False)
+            files = [os.path.join(save_dir, race.race_name + extension) for extension in ('.yaml', '.npz')]
+            files += [result.save_file for result in results]
+            for file_name in files:
+                assert get_mode(file_name) == 0o644, f"{file_name} has mode {oct(get_mode(file_name))}"
+            os.chmod(files[0], 0o640)
+            race.save_to_yaml(save_dir=save_dir, overwrite=True, save_output=False)
+            assert get_mode(files[0]) == 0o640
+    finally:
+        os.umask(old_umask)
+    print("saved files have the default mode")
+
+if __name__ == "__main__":
+    test_roundtrip()
+    test_archive()
+    test_file_mode()
@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from run_togt_planner.RaceGenerator.GenerationTools import create_state
+from run_togt_planner.RaceGenerator.RaceTrack import RaceTrack
+from run_togt_planner.RaceGenerator.TrackLoader import TrackSchemaError, load_track_data, validate_track_data
+from yaml_emitter_test import TRACK_PATH
+
+VALID_TRACK = """initState:
+  pos: [0.0, 0.0, 1.0]
+endState:
+  pos: [1.0, 0.0, 1.0]
+orders: [Ball, Rect]
+Ball:
+  type: 'SingleBall'
+  radius: 0.5
+  margin: 0.1
+  position: [2.0, 0.0, 1.0]
+  stationary: true
+Rect:
+  type: 'RectanglePrisma'
+  rpy: [0.0, 0.0, 90.0]
+  length: 0.0
+  midpoints: 0
+  width: 1.5
+  height: 1.5
+  marginW: 0.0
+  marginH: 0.0
+  position: [4.0, 0.0, 1.0]
+  stationary: true
+"""
+
+def get_errors(text):
+    # every line of the TrackSchemaError raised for the file
+    with tempfile.TemporaryDirectory() as save_dir:
+        load_file = os.path.join(save_dir, 'track.yaml')
+        with open(load_file, 'w') as f:
+            f.write(text)
+        try:
+            load_track_data(load_file)
+        except TrackSchemaError as e:
+            assert str(e).startswith(f"Invalid {load_file}:")
+            return [line.strip() for line in str(e).splitlines()[1:]]
+    raise AssertionError("expected TrackSchemaError")
+
+def test_valid_tracks():
+    for file_name in sorted(os.listdir(TRACK_PATH)):
+        data = load_track_data(os.path.join(TRACK_PATH, file_name))
+        assert all(gate_name in data for gate_name in data['orders'])
+    with tempfile.TemporaryDirectory() as save_dir:
+        load_file = os.path.join(save_dir, 'track.yaml')
+        with open(load_file, 'w') as f:
+            f.write(VALID_TRACK.replace('margin: 0.1', 'margin: 1e-1'))
+        # YAML 1.2 floats like ruamel reads them
+        assert load_track_data(load_file)['Ball']['margin'] == 0.1
+    print("bundled tracks pass the schema")
+
+def test_gate_errors():
+    # every gate reports its own missing and mistyped fields, all of them at once
+    text = (VALID_TRACK.replace("  radius: 0.5\n", "  radius: big\n")
+                       .replace("  position: [2.0, 0.0, 1.0]\n", "")
+                       .replace("  rpy: [0.0, 0.0, 90.0]\n", "")
+                       .replace("  width: 1.5\n", "  width: [1.5]\n")
+                       .replace("  position: [4.0, 0.0, 1.0]\n  stationary: true\n", "  position: [4.0, 0.0]\n  stationary: 1\n"))
+    errors = get_errors(text)
+    assert errors == ["Ball: missing position",
+                      "Ball.radius: expected a number, got 'big'",
+                      "Rect.position: expected a list of 3 numbers, got [4.0, 0.0]",
+                      "Rect.stationary: expected true or false, got 1",
+                      "Rect: missing parameters for RectanglePrisma: rpy",
+                      "Rect.width: expected a number, got [1.5]"], errors
+
+    # unknown types and keys, names that are not strings, booleans as numbers
+    text = (VALID_TRACK.replace("type: 'SingleBall'", "type: 'Ring'")
+                       .replace("  width: 1.5\n", "  width: true\n  side: 1.0\n  name: 3\n"))
+    errors = get_errors(text)
+    assert errors == ["Ball.type: expected one of SingleBall, TrianglePrisma, RectanglePrisma, PentagonPrisma, HexagonPrisma, got 'Ring'",
+                      "Rect.name: expected a string, got 3",
+                      "Rect.width: expected a number, got True",
+                      "Rect: unknown key 'side' for RectanglePrisma"], errors
+
+    # gates that are not mappings, states and orders
+    text = (VALID_TRACK.replace("  pos: [0.0, 0.0, 1.0]\n", "  vel: [0.0, 0.0]\n", 1)
+                       .replace("orders: [Ball, Rect]", "orders: [Ball, Rect, Missing, 4]")
+                       .replace("Ball:\n  type: 'SingleBall'\n  radius: 0.5\n  margin: 0.1\n  position: [2.0, 0.0, 1.0]\n  stationary: true\n",
+                                "Ball: [2.0, 0.0, 1.0]\n"))
+    errors = get_errors(text)
+    assert errors == ["initState: missing pos",
+                      "initState.vel: expected a list of 3 numbers, got [0.0, 0.0]",
+                      "orders[2]: gate 'Missing' is not defined",
+                      "orders[3]: expected a gate name, got 4",
+                      "Ball: expected a mapping, got [2.0, 0.0, 1.0]"], errors
+    try:
+        validate_track_data([1, 2])
+        assert False, "expected TrackSchemaError"
+    except TrackSchemaError as e:
+        assert "expected a mapping at the top level, got list" in str(e)
+    print("schema errors name every broken gate field")
+
+def test_load_from_yaml():
+    # the default load validates the file first and leaves the track alone when it is invalid
+    race = RaceTrack(init_state=create_state({'pos': [0.0, 0.0, 0.0]}), end_state=create_state({'pos': [0.0, 0.0, 0.0]}))
+    with tempfile.TemporaryDirectory() as save_dir:
+        load_file = os.path.join(save_dir, 'track.yaml')
+        with open(load_file, 'w') as f:
+            f.write(VALID_TRACK)
+        race.load_from_yaml(load_file)
+        assert race.orders == ['Ball', 'Rect'] and race.yaml_source is None
+        track = race.to_dict()
+        with open(load_file, 'w') as f:
+            f.write(VALID_TRACK.replace("  margin: 0.1\n", ""))
+        try:
+            race.load_from_yaml(load_file)
+            assert False, "expected TrackSchemaError"
+        except TrackSchemaError as e:
+            assert "Ball: missing parameters for SingleBall: margin" in str(e)
+        assert race.to_dict() == track
+    print("invalid files do not change the loaded track")
+
+if __name__ == "__main__":
+    test_valid_tracks()
+    test_gate_errors()
+    test_load_from_yaml()
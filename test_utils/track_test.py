@@ -0,0 +1,111 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import yaml
+from run_togt_planner.RaceVisualizer.track import plot_track, plot_track_3d
+from gate_geometry_test import get_baseline_outline
+from yaml_emitter_test import TRACK_PATH
+
+ARGS = {'linewidth': 3.0, 'markersize': 5.0, 'color': 'black'}
+
+def plot_reference(ax, track, dim, color='r', **overrides):
+    # the former per-gate drawing of plot_track/plot_track_3d, one artist per gate
+    for name in track['orders']:
+        g = track[name]
+        outline = get_baseline_outline(g, **overrides)
+        position = g['position']
+        if g['type'] == 'SingleBall' and dim == '2d':
+            a = np.linspace(0, 2*np.pi)
+            ax.plot(position[0] + outline*np.cos(a), position[1] + outline*np.sin(a), '-', **ARGS)
+            ax.scatter(position[0], position[1], color='black', s=50)
+        elif g['type'] == 'SingleBall':
+            u, v = np.mgrid[0:2*np.pi:20j, 0:np.pi:10j]
+            x = position[0] + outline * np.cos(u) * np.sin(v)
+            y = position[1] + outline * np.sin(u) * np.sin(v)
+            z = position[2] + outline * np.cos(v)
+            ax.plot_surface(x, y, z, color=color, alpha=0.3, edgecolor='none')
+            ax.scatter(position[0], position[1], position[2], color='black', s=50)
+        elif dim == '2d':
+            ax.plot(outline[:, 0], outline[:, 1], 'o-', **ARGS)
+        else:
+            ax.plot(outline[:, 0], outline[:, 1], outline[:, 2], 'o-', **ARGS)
+
+def get_lines(ax):
+    # drawn segments of the line artists and line collections, and the marker positions
+    segments, markers = [], []
+    for line in ax.lines:
+        xy = np.column_stack(line.get_data_3d() if hasattr(line, 'get_data_3d') else line.get_xydata().T)
+        if line.get_linestyle() != 'None':
+            segments.append(xy)
+            assert line.get_linewidth() == ARGS['linewidth'] and line.get_color() == ARGS['color']
+        if line.get_marker() not in ('None', None, ''):
+            markers.append(xy)
+    for collection in ax.collections:
+        if isinstance(collection, matplotlib.collections.LineCollection):
+            segments += list(collection._segments3d if hasattr(collection, '_segments3d') else collection.get_segments())
+            assert np.all(collection.get_linewidth() == ARGS['linewidth'])
+    return segments, (np.concatenate(markers) if markers else np.empty((0, 3)))
+
+def get_key(points, decimals=6):
+    return tuple(sorted(map(tuple, np.round(np.asarray(points, dtype=float), decimals) + 0.0)))
+
+def get_polygons(ax):
+    # projected polygons of the drawn 3d surfaces with their face colors, in any order
+    ax.figure.canvas.draw()
+    polygons = []
+    for collection in ax.collections:
+        if isinstance(collection, matplotlib.collections.PolyCollection):
+            colors = collection.get_facecolor()
+            for i, path in enumerate(collection.get_paths()):
+                color = colors[i % len(colors)]
+                polygons.append(get_key(path.vertices, 3) + get_key([color], 6))
+    return sorted(polygons)
+
+def get_centers(ax):
+    offsets = [collection.get_offsets() for collection in ax.collections
+               if isinstance(collection, matplotlib.collections.PathCollection)]
+    return get_key(np.concatenate(offsets)) if offsets else ()
+
+def check_track(track_file, **overrides):
+    with open(track_file) as f:
+        track = yaml.safe_load(f)
+
+    # 2d: the same outlines, vertex markers and ball centers
+    axes = [plt.figure().gca() for _ in range(2)]
+    plot_track(axes[0], track_file, **overrides)
+    plot_reference(axes[1], track, '2d', **overrides)
+    (segments, markers), (ref_segments, ref_markers) = get_lines(axes[0]), get_lines(axes[1])
+    assert sorted(map(get_key, segments)) == sorted(map(get_key, ref_segments))
+    assert markers.shape == ref_markers.shape and np.allclose(markers, ref_markers, rtol=0, atol=1e-12)
+    assert get_centers(axes[0]) == get_centers(axes[1])
+
+    # 3d: the same outlines and ball centers, and the same shaded sphere faces from the same view
+    axes = [plt.figure().add_subplot(projection='3d') for _ in range(2)]
+    plot_track_3d(axes[0], track_file, color='g', **overrides)
+    plot_reference(axes[1], track, '3d', color='g', **overrides)
+    for ax in axes:
+        ax.set_xlim(axes[1].get_xlim())
+        ax.set_ylim(axes[1].get_ylim())
+        ax.set_zlim(axes[1].get_zlim())
+    (segments, markers), (ref_segments, ref_markers) = get_lines(axes[0]), get_lines(axes[1])
+    assert sorted(map(get_key, segments)) == sorted(map(get_key, ref_segments))
+    assert markers.shape == ref_markers.shape and np.allclose(markers, ref_markers, rtol=0, atol=1e-12)
+    assert get_polygons(axes[0]) == get_polygons(axes[1])
+    assert len(get_polygons(axes[0])) == 9 * 19 * sum(track[name]['type'] == 'SingleBall' for name in track['orders'])
+    plt.close('all')
+
+def test_track_drawing():
+    track_files = [os.path.join(TRACK_PATH, file_name) for file_name in sorted(os.listdir(TRACK_PATH))]
+    for track_file in track_files:
+        check_track(track_file)
+        check_track(track_file, set_radius=1.2, set_width=2.0, set_height=1.5, set_margin=0.1)
+    print("batched gate drawing matches the per-gate artists")
+
+if __name__ == "__main__":
+    test_track_drawing()
@@ -0,0 +1,121 @@
+import os
+import sys
+import warnings
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from run_togt_planner.RaceVisualizer.tube import (estimate_tangents, get_rotation_minimizing_frames, get_tube_mesh,
+                                               get_lod_indices, get_tube_lod)
+
+def get_helix(num_points=3000):
+    t = np.linspace(0, 10, num_points)
+    return np.stack([np.cos(t), np.sin(t), 0.1 * t], axis=1)
+
+def get_reference_tube(ps, radius, num_theta=20):
+    # the former per-point loop of RacePlotter.get_line_tube/get_sig_tube
+    radius = np.broadcast_to(radius, (len(ps),))
+    theta = np.linspace(0, 2 * np.pi, num_theta)
+    tangent = np.vstack((np.gradient(ps[:, 0]), np.gradient(ps[:, 1]), np.gradient(ps[:, 2]))).T
+    tangent /= np.linalg.norm(tangent, axis=1).reshape(-1, 1)
+    tube = np.zeros((len(ps), num_theta, 3))
+    for i in range(len(ps)):
+        arbitrary_vector = np.array([1, 0, 0]) if not np.allclose(tangent[i], [1, 0, 0]) else np.array([0, 1, 0])
+        normal = np.cross(tangent[i], arbitrary_vector)
+        normal /= np.linalg.norm(normal)
+        binormal = np.cross(tangent[i], normal)
+        TNB = np.column_stack((normal, binormal, tangent[i]))
+        for j in range(num_theta):
+            local_point = np.array([radius[i] * np.cos(theta[j]), radius[i] * np.sin(theta[j]), 0])
+            tube[i, j] = ps[i] + TNB @ local_point
+    return tube[..., 0], tube[..., 1], tube[..., 2]
+
+def check_frames(tangents, normals, binormals):
+    # orthonormal frames that turn only a little between samples, no seams
+    assert np.all(np.isfinite(normals)) and np.all(np.isfinite(binormals))
+    assert np.allclose(np.linalg.norm(normals, axis=1), 1.0)
+    assert np.allclose(np.einsum('ij,ij->i', normals, tangents), 0.0, atol=1e-9)
+    assert np.allclose(np.cross(tangents, normals), binormals)
+    assert np.min(np.einsum('ij,ij->i', normals[:-1], normals[1:])) > 0.99
+
+def test_rmf():
+    ps = get_helix()
+    tangents = estimate_tangents(ps)
+    normals, binormals = get_rotation_minimizing_frames(tangents)
+    check_frames(tangents, normals, binormals)
+
+    # repeated points give NaN tangents, only their own rings may be affected
+    repeats = np.where(np.arange(len(ps)) % 100 == 0, 3, 1)
+    repeated_ps = np.repeat(ps, repeats, axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        x, y, z = get_tube_mesh(repeated_ps, 0.1, frame='rmf')
+    assert np.all(np.isfinite(x)) and np.all(np.isfinite(y)) and np.all(np.isfinite(z))
+    # rings of the unique points stay where they are without the repeats
+    unique = np.cumsum(repeats) - 1
+    x_ref, _, _ = get_tube_mesh(ps, 0.1, frame='rmf')
+    assert np.allclose(x[unique][-1000:], x_ref[-1000:], atol=1e-2)
+
+    # a tangent that flips, and a curve without a single valid tangent
+    tangents = np.array([[0.0, 0.0, 1.0]] * 5 + [[0.0, 0.0, -1.0]] * 5)
+    check_frames(tangents[5:], *[frames[5:] for frames in get_rotation_minimizing_frames(tangents)])
+    normals, binormals = get_rotation_minimizing_frames(np.full((4, 3), np.nan))
+    assert np.all(np.isfinite(normals)) and np.all(np.isfinite(binormals))
+    print("rotation-minimizing frames are seamless and finite")
+
+def test_fixed_frames():
+    # the batched mesh matches the per-point loop, also where the tangent is parallel to the x-axis
+    ps = np.concatenate((get_helix(500), np.linspace([1.0, 0.0, 1.0], [5.0, 0.0, 1.0], 50)))
+    radii = 0.2 + 0.1 * np.sin(np.arange(len(ps)))
+    for radius, num_theta in ((0.3, 20), (radii, 20), (radii, 7)):
+        mesh = get_tube_mesh(ps, radius, num_theta=num_theta)
+        reference = get_reference_tube(ps, radius, num_theta=num_theta)
+        for values, reference_values in zip(mesh, reference):
+            assert values.shape == (len(ps), num_theta)
+            assert np.max(np.abs(values - reference_values)) < 1e-12
+    print("fixed-frame tube mesh matches the per-point loop")
+
+def get_deviation(ps, indices):
+    # distance of every sample to the chord between the kept samples around it
+    segment = np.searchsorted(indices, np.arange(len(ps)), side='right') - 1
+    segment = np.clip(segment, 0, len(indices) - 2)
+    a, b = ps[indices[segment]], ps[indices[segment + 1]]
+    ab = b - a
+    s = np.clip(np.einsum('ij,ij->i', ps - a, ab) / np.maximum(np.einsum('ij,ij->i', ab, ab), 1e-12), 0.0, 1.0)
+    return np.linalg.norm(ps - (a + s[:, None] * ab), axis=1)
+
+def test_lod():
+    ps = get_helix()
+    indices, num_theta = get_tube_lod(ps, radius=0.1, pixels_per_meter=100.0)
+    # first and last sample are kept, far fewer rings than samples, within the pixel tolerance
+    assert indices[0] == 0 and indices[-1] == len(ps) - 1 and np.all(np.diff(indices) > 0)
+    assert len(indices) < len(ps) // 10
+    assert np.max(get_deviation(ps, indices)) * 100.0 < 3.0
+    assert 6 <= num_theta <= 20
+
+    # a straight line only needs the arc length samples
+    line = np.linspace([0.0, 0.0, 0.0], [10.0, 0.0, 0.0], 1000)
+    indices = get_lod_indices(line, max_segment=0.5, max_angle=np.deg2rad(5))
+    assert indices[0] == 0 and indices[-1] == len(line) - 1 and len(indices) <= 22
+
+    # ring resolution follows the on-screen size, clipped to its range
+    assert get_tube_lod(ps, 0.1, pixels_per_meter=1.0)[1] == 6
+    assert get_tube_lod(ps, 0.1, pixels_per_meter=1e4)[1] == 20
+
+    # polygon count stays bounded on long trajectories
+    t = np.linspace(0, 2000, 200000)
+    long_ps = np.stack([np.cos(t), np.sin(t), 0.01 * t], axis=1)
+    indices, num_theta = get_tube_lod(long_ps, 0.1, pixels_per_meter=100.0, max_polygons=5000)
+    assert (len(indices) - 1) * (num_theta - 1) <= 5000
+    assert indices[0] == 0 and indices[-1] == len(long_ps) - 1
+
+    # degenerate inputs
+    assert list(get_lod_indices(ps[:2], 1.0, 0.1)) == [0, 1]
+    indices = get_lod_indices(np.repeat(ps[:1], 10, axis=0), 1.0, 0.1)
+    assert indices[0] == 0 and indices[-1] == 9
+    print("tube LOD keeps endpoints, tolerance and polygon budget")
+
+if __name__ == "__main__":
+    test_fixed_frames()
+    test_rmf()
+    test_lod()
@@ -0,0 +1,119 @@
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from run_togt_planner.RaceGenerator.GenerationTools import create_state, create_gate
+from run_togt_planner.RaceGenerator.RaceTrack import RaceTrack
+from run_togt_planner.RaceGenerator.RandomRace import generate_random_racetracks
+from run_togt_planner.RaceGenerator.YamlEmitter import emit_standard_yaml
+
+TRACK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources', 'racetrack')
+
+def save_both(race_track, save_dir):
+    # the same track through the template emitter and through ruamel
+    name = race_track.race_name
+    race_track.race_name = name + '_fast'
+    race_track.save_to_yaml(save_dir=save_dir, overwrite=True, standard=True, save_output=False, fast=True)
+    race_track.race_name = name + '_ruamel'
+    race_track.save_to_yaml(save_dir=save_dir, overwrite=True, standard=True, save_output=False, fast=False)
+    race_track.race_name = name
+    with open(os.path.join(save_dir, name + '_fast.yaml'), 'rb') as f:
+        fast = f.read()
+    with open(os.path.join(save_dir, name + '_ruamel.yaml'), 'rb') as f:
+        ruamel = f.read()
+    return fast, ruamel
+
+def get_test_tracks():
+    # every gate type with and without name, ints, negative zero, tiny and huge floats
+    tracks = []
+    race = RaceTrack(init_state=create_state({'pos': [0, -0.0, 1e-05], 'cthrustmass': 9.8066}),
+                     end_state=create_state({'pos': [1e16, 2.5, -3.0], 'euler': [0.0, 180, -1.5e-07]}),
+                     race_name='equivalence')
+    race.add_gate(create_gate('SingleBall', [3.0, 0.0, 0.0], True, {'radius': 0.5, 'margin': 0}, "ball's gate"))
+    race.add_gate(create_gate('SingleBall', [1, 2, 3], False, {'radius': 1, 'margin': 0.25}))
+    race.add_gate(create_gate('TrianglePrisma', [0.0, 5.0, 0.0], True,
+                              {'rpy': [0.0, -90, 0.0], 'width': 2.4, 'height': 2.4, 'margin': 0.0, 'length': 0.0, 'midpoints': 0}, 'tri_gate'))
+    race.add_gate(create_gate('RectanglePrisma', [0.0, 8.0, 0.0], True,
+                              {'rpy': [0.0, -90, 0.0], 'width': 2.4, 'height': 2.4, 'marginW': 0.0, 'marginH': 0.0, 'length': 0.0, 'midpoints': 0}))
+    race.add_gate(create_gate('PentagonPrisma', [0.0, 9.0, 0.0], True,
+                              {'rpy': [0.0, -90, 0.0], 'radius': 2.4, 'margin': 0.0, 'length': 16.0, 'midpoints': 3}, 'pen_gate'))
+    race.add_gate(create_gate('HexagonPrisma', [0.0, 18.0, 0.0], True,
+                              {'rpy': [0.1, -90.123456789, 1/3], 'side': 1.5, 'margin': 0.0, 'length': 0.0, 'midpoints': 0}, 'hex_gate'))
+    tracks.append(race)
+
+    ball_kwargs = {'radius': 0.3, 'margin': 0.3}
+    rec_kwargs = {'rpy': [0, 0, 0], 'length': 0, 'midpoints': 0, 'width': 2.0, 'height': 2.0, 'marginW': 0.4, 'marginH': 0.4}
+    tracks += list(generate_random_racetracks(20, 10, ball_kwargs, seed=0, name='ball'))
+    tracks += list(generate_random_racetracks(20, 10, rec_kwargs, gate_type='RectanglePrisma', seed=1, name='rec',
+                                              rpy_range=([-180, -90, -180], [180, 90, 180]), shape_ranges={'width': (1.0, 3.0)}))
+    return tracks
+
+def test_equivalence():
+    with tempfile.TemporaryDirectory() as save_dir:
+        for race in get_test_tracks():
+            assert emit_standard_yaml(race) is not None, f"{race.race_name} took the ruamel path"
+            fast, ruamel = save_both(race, save_dir)
+            assert fast == ruamel, f"{race.race_name} differs"
+
+        # tracks loaded by ruamel keep its scalar types and must fall back to the ruamel path
+        for file_name in sorted(os.listdir(TRACK_PATH)):
+            race = RaceTrack(init_state=create_state({'pos': [0.0, 0.0, 0.0]}), end_state=create_state({'pos': [0.0, 0.0, 0.0]}))
+            race.load_from_yaml(os.path.join(TRACK_PATH, file_name), fast=False)
+            fast, ruamel = save_both(race, save_dir)
+            assert fast == ruamel, f"{file_name} differs"
+    print("fast and ruamel outputs are byte-identical")
+
+def load_track(load_file, fast):
+    race = RaceTrack(init_state=create_state({'pos': [0.0, 0.0, 0.0]}), end_state=create_state({'pos': [0.0, 0.0, 0.0]}))
+    race.load_from_yaml(load_file, fast=fast)
+    return race
+
+def test_load_roundtrip():
+    # the ruamel load keeps flow lists and the scalar text of the file, the default fast load gives the same values
+    for file_name in sorted(os.listdir(TRACK_PATH)):
+        race, fast_race = load_track(os.path.join(TRACK_PATH, file_name), False), load_track(os.path.join(TRACK_PATH, file_name), True)
+        assert race.to_dict() == fast_race.to_dict(), f"{file_name} loads differently"
+        # the formatting stays with the track, the gate store holds the same plain columns either way
+        assert race.yaml_source is not None and fast_race.yaml_source is None
+        assert pickle.dumps(race.gates) == pickle.dumps(fast_race.gates)
+        for standard in (True, False):
+            lines = [line for line in race.to_yaml_text(standard=standard).splitlines() if line.startswith(('  position:', '  rpy:'))]
+            assert lines and all(line.endswith(']') for line in lines), f"{file_name} lost its flow lists"
+
+    with open(os.path.join(TRACK_PATH, 'example.yaml')) as f:
+        text = f.read()
+    text = text.replace('cthrustmass: 9.8066', 'cthrustmass: 1.0e-5').replace('radius: 0.5', 'radius: .1', 1).replace('margin: 0.5', 'margin: 1e1', 1)
+    with tempfile.TemporaryDirectory() as save_dir:
+        load_file = os.path.join(save_dir, 'scalars.yaml')
+        with open(load_file, 'w') as f:
+            f.write(text)
+        race = load_track(load_file, False)
+        for standard in (True, False):
+            output = race.to_yaml_text(standard=standard)
+            for scalar in ('cthrustmass: 1.0e-5', 'radius: .1', 'margin: 1e1'):
+                assert scalar in output, f"{scalar} was rewritten"
+        # a changed value is written as usual
+        race.gates.get(race.orders[0]).position = [1.5, 0.0, 0.0]
+        assert 'position: [1.5, 0.0, 0.0]' in race.to_yaml_text()
+    print("loaded tracks keep their formatting")
+
+def benchmark(num_tracks=1000, gate_num=20):
+    tracks = list(generate_random_racetracks(num_tracks, gate_num, {'radius': 0.3, 'margin': 0.3}, seed=0))
+    with tempfile.TemporaryDirectory() as save_dir:
+        for fast in (False, True):
+            start = time.perf_counter()
+            for race in tracks:
+                race.save_to_yaml(save_dir=save_dir, overwrite=True, standard=True, save_output=False, fast=fast)
+            elapsed = time.perf_counter() - start
+            print(f"{'template' if fast else 'ruamel'}: {num_tracks} tracks with {gate_num} gates in {elapsed:.2f}s "
+                  f"({elapsed / num_tracks * 1e3:.2f} ms per track)")
+
+if __name__ == "__main__":
+    test_equivalence()
+    test_load_roundtrip()
+    benchmark()